@@ -0,0 +1,83 @@
+# HRM_NEW/exports.py
+"""
+Потокові експорти таблиць у CSV / JSON Lines.
+
+Рядки читаються через QuerySet.iterator(chunk_size=...) (серверний курсор на PostgreSQL)
+і віддаються пакетами, тож пам'ять не залежить від розміру таблиці,
+а заголовок CSV відправляється ще до виконання запиту.
+Набори даних описані в EXPORTS: ім'я -> шлях до функції, що повертає (columns, rows).
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+EXPORTS = {
+    'employees': 'employees.exports.employee_rows',
+    'units': 'company.exports.unit_rows',
+    'ai_queries': 'ai_assistant.exports.ai_query_rows',
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# Скільки рядків збирається в один фрагмент відповіді
+LINES_PER_CHUNK = 500
+
+
+class _LineBuffer:
+    """Псевдофайл для csv.writer: write() повертає рядок замість запису."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(columns, rows):
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_jsonl(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + '\n'
+
+
+def iter_export(columns, rows, file_format):
+    """Рядки експорту, згруповані по LINES_PER_CHUNK; перший рядок (заголовок CSV) віддається одразу."""
+    lines = iter_csv(columns, rows) if file_format == 'csv' else iter_jsonl(columns, rows)
+    first = next(lines, None)
+    if first is None:
+        return
+    yield first
+
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= LINES_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def get_export(name):
+    """(columns, rows) набору даних name; rows — лінивий ітератор."""
+    return import_string(EXPORTS[name])(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def export_response(name, file_format):
+    columns, rows = get_export(name)
+    response = StreamingHttpResponse(
+        iter_export(columns, rows, file_format),
+        content_type=CONTENT_TYPES[file_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{name}.{file_format}"'
+    return response
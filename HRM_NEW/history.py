@@ -0,0 +1,106 @@
+# HRM_NEW/history.py
+"""Допоміжні функції для роботи з історичними записами simple_history."""
+from django.db import connection
+from django.db.models import OuterRef, Q, Subquery
+
+
+def get_previous_record(queryset, record):
+    """Запис, що передує record у порядку (history_date, history_id), одним запитом."""
+    return queryset.filter(
+        Q(history_date__lt=record.history_date) |
+        Q(history_date=record.history_date, history_id__lt=record.history_id)
+    ).order_by('-history_date', '-history_id').first()
+
+
+def diff_consecutive(records, previous=None):
+    """
+    Обчислює зміни між сусідніми записами за один прохід, без звернень до prev_record.
+
+    records — записи від новіших до старіших, previous — запис, що передує найстарішому.
+    Повертає {history_id: [{'field', 'old', 'new'}, ...]}.
+    """
+    changes = {}
+    older = previous
+    for record in reversed(records):
+        if older is None:
+            changes[record.history_id] = []
+        else:
+            changes[record.history_id] = [
+                {'field': change.field, 'old': change.old, 'new': change.new}
+                for change in record.diff_against(older).changes
+            ]
+        older = record
+    return changes
+
+
+def latest_records(history_queryset, as_of, fields):
+    """
+    Останній історичний запис кожного об'єкта на момент as_of — одним запитом до таблиці історії.
+
+    На PostgreSQL використовується DISTINCT ON (id), на інших БД — корельований підзапит.
+    Об'єкти, останній запис яких — видалення, пропускаються.
+    Повертає список dict з полями fields.
+    """
+    records = history_queryset.filter(history_date__lte=as_of)
+    if connection.features.can_distinct_on_fields:
+        records = records.order_by('id', '-history_date', '-history_id').distinct('id')
+    else:
+        latest = history_queryset.filter(
+            id=OuterRef('id'),
+            history_date__lte=as_of
+        ).order_by('-history_date', '-history_id').values('history_id')[:1]
+        records = records.filter(history_id=Subquery(latest)).order_by()
+
+    return [
+        row for row in records.values('history_type', *fields).iterator(chunk_size=2000)
+        if row.pop('history_type') != '-'
+    ]
+
+
+def with_previous_id(queryset):
+    """
+    Додає prev_history_id — id попереднього запису того самого об'єкта.
+    Корельований підзапит виконується в тому самому запиті, що й вибірка сторінки.
+    """
+    previous = queryset.model.objects.filter(id=OuterRef('id')).filter(
+        Q(history_date__lt=OuterRef('history_date')) |
+        Q(history_date=OuterRef('history_date'), history_id__lt=OuterRef('history_id'))
+    ).order_by('-history_date', '-history_id').values('history_id')[:1]
+    return queryset.annotate(prev_history_id=Subquery(previous))
+
+
+def diff_records(records, history_queryset):
+    """
+    Зміни між кожним записом сторінки та попереднім записом того самого об'єкта.
+
+    records — записи з анотацією prev_history_id (with_previous_id), можуть належати різним об'єктам.
+    Попередники, яких немає на сторінці, завантажуються одним запитом.
+    Повертає {history_id: [{'field', 'old', 'new'}, ...]}.
+    """
+    by_id = {record.history_id: record for record in records}
+    missing = {
+        record.prev_history_id for record in records
+        if record.prev_history_id is not None and record.prev_history_id not in by_id
+    }
+    if missing:
+        by_id.update(history_queryset.in_bulk(missing, field_name='history_id'))
+
+    changes = {}
+    for record in records:
+        previous = by_id.get(record.prev_history_id)
+        changes[record.history_id] = [
+            {'field': change.field, 'old': change.old, 'new': change.new}
+            for change in record.diff_against(previous).changes
+        ] if previous is not None else []
+    return changes
+
+
+def records_by_object(history_queryset, ids):
+    """
+    Історичні записи кількох об'єктів одним запитом: {id: [записи від новіших до старіших]}.
+    Для об'єктів без записів повертається порожній список.
+    """
+    grouped = {object_id: [] for object_id in ids}
+    for record in history_queryset.filter(id__in=grouped).order_by('-history_date', '-history_id'):
+        grouped[record.id].append(record)
+    return grouped
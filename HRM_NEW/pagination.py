@@ -0,0 +1,35 @@
+# HRM_NEW/pagination.py
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class DefaultCursorPagination(CursorPagination):
+    """
+    Keyset-пагінація для всіх списків (без OFFSET).
+
+    Порядок береться з атрибута `ordering` view — це має бути стабільне
+    індексоване поле (унікальне або майже унікальне), інакше первинний ключ.
+    """
+    ordering = 'pk'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'ordering', None) or self.ordering
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+
+class HistoryCursorPagination(CursorPagination):
+    """Keyset-пагінація історичних записів (simple_history) за history_date."""
+    ordering = ('-history_date', '-history_id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class RankedCursorPagination(DefaultCursorPagination):
+    """Keyset-пагінація результатів пошуку: за релевантністю (анотація rank), далі за id."""
+    ordering = ('-rank', 'id')
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
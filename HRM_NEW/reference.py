@@ -0,0 +1,63 @@
+# HRM_NEW/reference.py
+"""
+Кеш довідників (посади, типи підрозділів) у пам'яті процесу.
+
+Кожен процес тримає власну копію даних і номер версії, з яким її завантажено.
+Сама версія лежить у спільному кеші (Redis, якщо налаштовано REDIS_URL): запис довідника
+лише оновлює версію, а кожен воркер перезавантажує дані ліниво, коли помітить нову версію.
+Перевірка версії — один cache.get замість запиту до БД.
+"""
+import time
+
+from django.core.cache import cache
+from rest_framework import serializers
+
+
+class ReferenceCache:
+    def __init__(self, version_key, loader):
+        self.version_key = version_key
+        self.loader = loader
+        self._state = (None, None)  # (версія, дані) — замінюються атомарно
+
+    def version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, time.time_ns(), timeout=None)
+            version = cache.get(self.version_key)
+        return version
+
+    def get(self):
+        """Актуальні дані; завантажує їх з БД лише після зміни версії."""
+        version = self.version()
+        loaded_version, data = self._state
+        if loaded_version != version or data is None:
+            data = self.loader()
+            self._state = (version, data)
+        return data
+
+    def invalidate(self):
+        """Позначає довідник зміненим для всіх процесів."""
+        cache.set(self.version_key, time.time_ns(), timeout=None)
+
+
+class ReferenceRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField, що шукає об'єкт у ReferenceCache ({pk: об'єкт}) без запиту до БД.
+    queryset лишається для схеми та browsable API.
+    """
+
+    def __init__(self, reference, **kwargs):
+        self.reference = reference
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        instance = self.reference.get().get(pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
@@ -0,0 +1,39 @@
+# HRM_NEW/search.py
+"""
+Спільні частини пошуку.
+
+Пошук працює через підрядки (LIKE '%терм%'), тож однаковий запит виконується і на SQLite,
+і на PostgreSQL. На PostgreSQL такі запити обслуговуються GIN-індексами pg_trgm,
+які створюються після міграцій (ensure_trigram_index): міграції генеруються під час збірки,
+а розширення pg_trgm має існувати до створення індексу.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(text) -> str:
+    """Нижній регістр і одинарні пробіли — форма пошукових документів і термів."""
+    return _WHITESPACE.sub(' ', str(text or '')).strip().lower()
+
+
+def split_terms(query) -> list:
+    """Унікальні терми запиту (не більше SEARCH_MAX_TERMS), у порядку появи."""
+    terms = dict.fromkeys(normalize(query).split(' '))
+    return [term for term in terms if term][:settings.SEARCH_MAX_TERMS]
+
+
+def ensure_trigram_index(using, name, table, expression):
+    """Створює GIN-індекс pg_trgm на expression (лише PostgreSQL, ідемпотентно)."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {connection.ops.quote_name(name)} "
+            f"ON {connection.ops.quote_name(table)} USING gin (({expression}) gin_trgm_ops)"
+        )
@@ -30,14 +30,11 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt.token_blacklist',
     'mptt',
     'simple_history',
-    'graphviz',
     # my apps
     'users',
     'employees',
     'company',
     'ai_assistant',
-    'spacy',
-
 ]
 
 MIDDLEWARE = [
@@ -128,12 +125,31 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_PAGINATION_CLASS': 'HRM_NEW.pagination.DefaultCursorPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Спільний кеш воркерів: версії оргструктури та довідників, діаграми, знімки.
+# Без REDIS_URL — кеш у пам'яті процесу (достатньо для розробки з одним процесом)
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Максимальний розмір сторінки, який клієнт може запросити (?page_size=)
+MAX_PAGE_SIZE = 500
+
+# Скільки рядків за раз читається з БД під час потокового експорту
+EXPORT_CHUNK_SIZE = 2000
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "HRM API",
     "DESCRIPTION": "HR Management System",
@@ -159,6 +175,27 @@ SPECTACULAR_SETTINGS = {
 AUTH_USER_MODEL = "users.User"
 SITE_ID = 1
 
+# Кеш автентифікованих користувачів (users/authentication.py). Потребує спільного кешу:
+# інвалідація при деактивації чи зміні пароля інакше дійде лише до одного процесу
+AUTH_USER_CACHE = bool(REDIS_URL)
+AUTH_USER_CACHE_TIMEOUT = 60  # Скільки секунд користувач живе в кеші
+
+# Фільтр Блума відкликаних токенів (users/blacklist.py). Потребує спільного кешу:
+# без нього інші процеси не дізнаються про щойно відкликані токени
+TOKEN_BLACKLIST_FILTER = bool(REDIS_URL)
+TOKEN_PURGE_BATCH_SIZE = 5000  # Скільки прострочених токенів видаляється за одну транзакцію
+
+# Як часто буфер last_login записується в БД (секунд)
+LAST_LOGIN_FLUSH_INTERVAL = 5
+
+# Масове створення користувачів
+MAX_BULK_PROVISION_USERS = 5000  # Максимум рядків в одному запиті
+# Пакети до цього розміру хешуються в самому запиті (~0.5 с PBKDF2 на пароль) і мають вкластися
+# в timeout gunicorn (gunicorn.conf.py); більші виконуються фоновим завданням (відповідь 202)
+PROVISION_SYNC_USERS = 10
+PROVISION_JOB_TIMEOUT = 60 * 60  # Скільки секунд зберігається стан фонового завдання
+PASSWORD_HASH_WORKERS = os.cpu_count() or 1  # Процесів для хешування паролів у фонових завданнях і provision_users
+
 CSRF_COOKIE_HTTPONLY = True
 
 SIMPLE_JWT = {
@@ -166,7 +203,7 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
-    "UPDATE_LAST_LOGIN": True,
+    "UPDATE_LAST_LOGIN": False,  # last_login записується пакетами (users/last_login.py)
 
     "ALGORITHM": "HS256",
     "SIGNING_KEY": SECRET_KEY,
@@ -201,7 +238,7 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=7),
 
     "TOKEN_OBTAIN_SERIALIZER": "users.serializers.CustomTokenObtainPairSerializer",
-    "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.FilteredTokenRefreshSerializer",
     "TOKEN_VERIFY_SERIALIZER": "rest_framework_simplejwt.serializers.TokenVerifySerializer",
     "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
     "SLIDING_TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainSlidingSerializer",
@@ -210,12 +247,38 @@ SIMPLE_JWT = {
 
 # Для генерації графів (Linux)
 GRAPHVIZ_BIN = '/usr/bin/dot'
+DIAGRAM_RENDER_WORKERS = 2  # Одночасних рендерингів на всі воркери (слоти у спільному кеші)
+DIAGRAM_RENDER_SLOT_TIMEOUT = 60  # Через скільки секунд слот звільняється, якщо воркер зупинився під час рендерингу
+DIAGRAM_RENDER_WAIT = 5  # Скільки секунд запит чекає на рендеринг, перш ніж повернути 202
+DIAGRAM_CACHE_TIMEOUT = 60 * 60 * 24  # Час життя відрендереної діаграми в кеші (секунд)
+
+# Знімки оргструктури на минулі дати
+SNAPSHOT_CACHE_TIMEOUT = 60 * 60 * 24 * 30  # Час життя кешу знімка (секунд)
 
 # Максимальна глибина ієрархії підрозділів
 MAX_STRUCTURAL_UNIT_DEPTH = 1000
+MAX_EXPAND_DEPTH = 10  # Скільки рівнів можна розгорнути одним запитом units/{id}/expand/
+
+# Максимальна кількість операцій в одному масовому запиті по підрозділах
+MAX_BULK_UNIT_OPERATIONS = 5000
+
+# Пошук працівників і підрозділів
+SEARCH_MIN_QUERY_LENGTH = 2  # Мінімальна довжина запиту
+SEARCH_MAX_TERMS = 5  # Скільки слів запиту враховується
+
+# Аналітика персоналу
+ANALYTICS_MAX_MONTHS = 120  # Найдовший період в одному запиті (місяців)
+ANALYTICS_CACHE_TIMEOUT = 60 * 60 * 24  # Результат перераховується щонайменше раз на добу (секунд)
+
+# Максимальна кількість операцій в одному масовому запиті по працівниках
+MAX_BULK_EMPLOYEE_OPERATIONS = 5000
 
 # AI асистент
 OPENAI_API_KEY= os.getenv('OPENAI_API_KEY')
 MODEL_NAME_AI = "gpt-4o-mini"  # Назва моделі OpenAI
+NLP_MODEL_AI = "uk_core_news_sm"  # Модель spaCy для визначення запитів про структуру (завантажується ліниво)
 MAX_TOKENS_INPUT_AI = 1000  # лимит токенов для ввода пользователя
-MAX_HISTORY_AI = 20  # Максимальна кількість збережених пар в сесії
\ No newline at end of file
+MAX_HISTORY_AI = 20  # Максимальна кількість збережених пар в сесії
+MAX_STRUCTURE_LINES_AI = 500  # Максимум рядків у текстовій структурі компанії
+MAX_STRUCTURE_CHARS_AI = 20000  # Максимальний розмір текстової структури (символів)
+STRUCTURE_CACHE_TIMEOUT_AI = 60 * 60  # Час життя кешу текстової структури (секунд)
\ No newline at end of file
@@ -0,0 +1,102 @@
+# HRM_NEW/testing.py
+"""Спільні дані та перевірки для тестів кількості запитів і використання індексів."""
+import datetime
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from company.models import StructuralUnit
+from employees.models import Employee, Position
+from users.models import User
+
+
+def seed_organisation(departments=4, teams=3, employees_per_team=6):
+    """
+    Реалістичний набір даних: корінь → департаменти → відділи → групи,
+    посади, працівники (частина звільнена) та історія перейменувань.
+    Повертає dict з основними об'єктами.
+    """
+    root = StructuralUnit.objects.create(name='Головний офіс', custom_type='OFFICE')
+    positions = [Position.objects.create(name=f"Посада {i}") for i in range(8)]
+
+    units = [root]
+    leaves = []
+    for d in range(departments):
+        department = StructuralUnit.objects.create(
+            name=f"Департамент {d}", custom_type='DEPARTMENT', parent=StructuralUnit.objects.get(pk=root.pk)
+        )
+        units.append(department)
+        for t in range(teams):
+            team = StructuralUnit.objects.create(name=f"Відділ {d}.{t}", parent=department)
+            group = StructuralUnit.objects.create(name=f"Група {d}.{t}", parent=team)
+            units += [team, group]
+            leaves += [team, group]
+
+    employees = []
+    hired = datetime.date(2022, 1, 1)
+    for i in range(len(leaves) * employees_per_team):
+        user = User.objects.create(
+            email=f"employee{i}@example.com",
+            first_name=f"Ім'я{i}",
+            last_name=f"Прізвище{i}",
+            password='!'
+        )
+        employees.append(Employee.objects.create(
+            user=user,
+            structural_unit=leaves[i % len(leaves)],
+            position=positions[i % len(positions)],
+            date_hired=hired + datetime.timedelta(days=7 * i),
+            date_fired=hired + datetime.timedelta(days=7 * i + 200) if i % 5 == 0 else None
+        ))
+
+    # Кілька змін, щоб у підрозділів і працівників була історія з різницею між записами
+    for unit in units[1:4]:
+        unit.refresh_from_db()
+        unit.name += ' (оновлено)'
+        unit.save()
+    for employee in employees[:10]:
+        employee.position = positions[-1]
+        employee.save()
+
+    admin = User.objects.create(email='admin@example.com', is_staff=True, is_superuser=True, password='!')
+    return {
+        'root': StructuralUnit.objects.get(pk=root.pk),
+        'units': units,
+        'leaves': leaves,
+        'positions': positions,
+        'employees': employees,
+        'admin': admin,
+    }
+
+
+class QueryBudgetMixin:
+    """Перевірки для TestCase: верхня межа кількості запитів і використання індексу."""
+
+    def setUp(self):
+        super().setUp()
+        # Версії довідників і знімків з інших тестів не повинні впливати на кількість запитів
+        cache.clear()
+
+    def assertMaxQueries(self, limit, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            result = func(*args, **kwargs)
+            if hasattr(result, 'render'):
+                result.render()
+            if getattr(result, 'streaming', False):
+                b''.join(result.streaming_content)
+        executed = len(context)
+        self.assertLessEqual(
+            executed, limit,
+            f"{executed} запитів замість щонайбільше {limit}:\n" +
+            "\n".join(query['sql'][:200] for query in context.captured_queries)
+        )
+        return result
+
+    def assertUsesIndex(self, queryset, index_name):
+        """План запиту згадує індекс index_name (seq scan вимикається, бо тестових даних мало)."""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"Індекс {index_name} не використовується:\n{plan}")
@@ -0,0 +1,13 @@
+# ai_assistant/exports.py
+from .models import AIQuery
+
+AI_QUERY_COLUMNS = ('id', 'created_at', 'user_id', 'email', 'chat_session_id', 'session_id', 'message', 'response')
+
+
+def ai_query_rows(chunk_size):
+    """Усі запити до AI асистента в порядку id."""
+    rows = AIQuery.objects.order_by('pk').values_list(
+        'id', 'created_at', 'user_id', 'user__email', 'chat_session_id', 'chat_session__session_id',
+        'message', 'response'
+    ).iterator(chunk_size=chunk_size)
+    return AI_QUERY_COLUMNS, rows
@@ -0,0 +1,63 @@
+import statistics
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Те, що робить кожен процес під час старту: налаштування Django і завантаження всіх URL (в'юх)
+STARTUP_SCRIPT = "import django; django.setup(); import HRM_NEW.urls"
+
+
+class Command(BaseCommand):
+    help = (
+        "Вимірює час старту процесу (django.setup() + імпорт URL) в окремих інтерпретаторах "
+        "і показує пакети з найбільшим часом імпорту (python -X importtime)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Кількість запусків")
+        parser.add_argument('--top', type=int, default=10, help="Скільки найдорожчих пакетів показати")
+        parser.add_argument('--warm-up', action='store_true', help="Також виміряти warm_up() (spaCy, openai, tiktoken)")
+
+    def handle(self, *args, **options):
+        timings = []
+        imports = {}
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            process = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+                capture_output=True,
+                text=True
+            )
+            timings.append(time.perf_counter() - started)
+            if process.returncode:
+                raise CommandError(process.stderr.strip().splitlines()[-1])
+            imports = self._parse_importtime(process.stderr)
+
+        self.stdout.write(
+            f"Старт процесу: медіана {statistics.median(timings) * 1000:.0f} мс, "
+            f"мін. {min(timings) * 1000:.0f} мс ({options['runs']} запусків)"
+        )
+        self.stdout.write("Найдорожчі пакети (сукупний час імпорту, останній запуск):")
+        for package, microseconds in sorted(imports.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {package:<30} {microseconds / 1000:8.1f} мс")
+
+        if options['warm_up']:
+            from ai_assistant.openai_service import warm_up
+            started = time.perf_counter()
+            warm_up()
+            self.stdout.write(f"warm_up(): {(time.perf_counter() - started) * 1000:.0f} мс")
+
+    @staticmethod
+    def _parse_importtime(output):
+        """{пакет верхнього рівня: сукупний час імпорту, мкс} з виводу python -X importtime"""
+        packages = {}
+        for line in output.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            name = name.strip()
+            if '.' not in name:
+                packages[name] = max(packages.get(name, 0), int(cumulative))
+        return packages
@@ -13,6 +13,11 @@ class ChatSession(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     conversation = JSONField(default=list, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='chatsession_user_created_idx'),
+        ]
+
     def __str__(self):
         return self.name or f"Chat {self.id}"
 
@@ -24,5 +29,11 @@ class AIQuery(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     chat_session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='queries')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='aiquery_user_created_idx'),
+            models.Index(fields=['chat_session', 'created_at'], name='aiquery_session_created_idx'),
+        ]
+
     def __str__(self):
         return f"Запит від {self.user} в {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -1,21 +1,66 @@
-import uuid, spacy
-from openai import OpenAI
+import functools
+import importlib
+import logging
+import threading
+import uuid
 from django.conf import settings
+from django.core.cache import cache
 from .models import AIQuery, ChatSession
-from .utils import count_tokens, build_messages
+from .utils import count_tokens, build_messages, get_encoding
 from company.models import StructuralUnit  # Імпорт  моделі
+from company.cache import get_structure_version
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
 
 max_tokens = settings.MAX_TOKENS_INPUT_AI
 max_history_length = settings.MAX_HISTORY_AI
 model_name = settings.MODEL_NAME_AI
-
-# Ініціалізуємо spaCy
-try:
-    nlp = spacy.load("uk_core_news_sm")
-except Exception as e:
-    nlp = None  # Обробка помилок за потреби
+max_structure_lines = settings.MAX_STRUCTURE_LINES_AI
+max_structure_chars = settings.MAX_STRUCTURE_CHARS_AI
+structure_cache_timeout = settings.STRUCTURE_CACHE_TIMEOUT_AI
+
+# spaCy і клієнт OpenAI завантажуються при першому використанні, а не під час імпорту:
+# інакше кожна команда manage.py, міграція і запуск тестів платять за завантаження моделі
+_nlp = None
+_nlp_loaded = False
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    """Конвеєр spaCy (None, якщо модель недоступна — тоді пошук за ключовими словами)"""
+    global _nlp, _nlp_loaded
+    if not _nlp_loaded:
+        with _nlp_lock:
+            if not _nlp_loaded:
+                try:
+                    import spacy
+                    _nlp = spacy.load(settings.NLP_MODEL_AI)
+                except Exception:
+                    _nlp = None  # Обробка помилок за потреби
+                _nlp_loaded = True
+    return _nlp
+
+
+@functools.cache
+def get_client():
+    from openai import OpenAI
+    return OpenAI(api_key=settings.OPENAI_API_KEY)
+
+
+def warm_up():
+    """
+    Попереднє завантаження для веб-воркерів: модель spaCy, модуль openai і токенізатор.
+    Викликається в майстер-процесі gunicorn до fork (gunicorn.conf.py), тож воркери ділять
+    завантажене copy-on-write. Сам клієнт OpenAI не створюється: його з'єднання не можна
+    ділити між процесами, кожен воркер створює свій при першому запиті.
+    """
+    get_nlp()
+    importlib.import_module('openai')
+    try:
+        get_encoding(model_name)
+    except Exception as e:
+        # Словник tiktoken завантажується з мережі; без нього воркер спробує ще раз при першому запиті
+        logger.error("Error loading tokenizer: %s", str(e))
 
 # Ключові леми для визначення запитів про структуру
 STRUCTURE_LEMMAS = {
@@ -26,6 +71,7 @@ STRUCTURE_LEMMAS = {
 
 def is_structure_query(prompt: str) -> bool:
     """Використовуємо spaCy для визначення наміру"""
+    nlp = get_nlp()
     if not nlp:
         return any(kw in prompt.lower() for kw in ["структур", "підрозділ", "відділ"])
 
@@ -35,23 +81,49 @@ def is_structure_query(prompt: str) -> bool:
 
 
 def get_company_structure_text():
-    """Повертає структуру у вигляді тексту з відступами"""
-    units = StructuralUnit.objects.filter(is_active=True, parent=None).order_by('name')
-
-    if not units.exists():
-        return "Структура компанії не знайдена."
-
+    """Повертає структуру у вигляді тексту з відступами (з кешу, якщо структура не змінювалась)"""
+    cache_key = f"ai:company_structure:{get_structure_version()}"
+    text = cache.get(cache_key)
+    if text is None:
+        text = build_company_structure_text()
+        cache.set(cache_key, text, structure_cache_timeout)
+    return text
+
+
+def build_company_structure_text():
+    """
+    Будує текст структури одним проходом по дереву в порядку MPTT (tree_id, lft).
+    Підрозділи з неактивним предком пропускаються, розмір результату обмежено.
+    """
+    units = (
+        StructuralUnit.objects.filter(is_active=True)
+        .order_by('tree_id', 'lft')
+        .values_list('id', 'parent_id', 'level', 'name', 'custom_type')
+    )
+
+    visible = set()
     lines = []
+    size = 0
+    omitted = 0
+
+    for unit_id, parent_id, level, name, custom_type in units.iterator(chunk_size=2000):
+        # Предок неактивний — гілка не відображається
+        if parent_id is not None and parent_id not in visible:
+            continue
+        visible.add(unit_id)
+
+        line = f"{'  ' * level}{custom_type or 'Підрозділ'}: {name}"
+        if len(lines) >= max_structure_lines or size + len(line) + 1 > max_structure_chars:
+            omitted += 1
+            continue
+        lines.append(line)
+        size += len(line) + 1
+
+    if not lines:
+        return "Структура компанії не знайдена."
 
-    def add_unit(unit, level=0):
-        prefix = "  " * level
-        unit_type = unit.custom_type or "Підрозділ"
-        lines.append(f"{prefix}{unit_type}: {unit.name}")
-        for child in unit.children.filter(is_active=True).order_by('name'):
-            add_unit(child, level + 1)
-
-    for root_unit in units:
-        add_unit(root_unit)
+    if omitted:
+        lines.append(f"... та ще {omitted} підрозділів")
 
     return "\n".join(lines)
 
@@ -77,7 +149,7 @@ def ask_openai(prompt: str, user, session) -> str:
         messages = build_messages(prompt, session)
 
         # Запит до OpenAI
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model=model_name,
             messages=messages,
             temperature=0.7,
@@ -1,3 +1,74 @@
-from django.test import TestCase
+import os
+import subprocess
+import sys
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from HRM_NEW.testing import QueryBudgetMixin
+from users.models import User
+from . import openai_service
+from .models import AIQuery, ChatSession
+
+
+class ChatQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='chat@example.com', is_staff=True, password='!')
+        other = User.objects.create(email='other@example.com', password='!')
+        for owner in (cls.user, other):
+            for s in range(5):
+                session = ChatSession.objects.create(user=owner, session_id=f"{owner.id}-{s}", name=f"Чат {s}")
+                AIQuery.objects.bulk_create(
+                    AIQuery(user=owner, chat_session=session, message=f"Питання {i}", response=f"Відповідь {i}")
+                    for i in range(10)
+                )
+        cls.session = cls.user.chat_sessions.first()
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def test_history(self):
+        response = self.assertMaxQueries(1, self.client.get, '/api/ai/chat/history/')
+        self.assertEqual(len(response.data['results']), 50)
+
+    def test_sessions(self):
+        response = self.assertMaxQueries(1, self.client.get, '/api/ai/chat/sessions/')
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_session_history(self):
+        response = self.assertMaxQueries(2, self.client.get, f'/api/ai/chat/sessions/{self.session.id}/history/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_export(self):
+        response = self.assertMaxQueries(1, self.client.get, '/api/ai/chat/export/', {'file_format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_indexes(self):
+        self.assertUsesIndex(
+            AIQuery.objects.filter(user=self.user).order_by('-created_at'), 'aiquery_user_created_idx'
+        )
+        self.assertUsesIndex(
+            AIQuery.objects.filter(chat_session=self.session).order_by('created_at'), 'aiquery_session_created_idx'
+        )
+        self.assertUsesIndex(
+            ChatSession.objects.filter(user=self.user).order_by('-created_at'), 'chatsession_user_created_idx'
+        )
+
+
+class LazyLoadingTests(SimpleTestCase):
+    def test_startup_does_not_import_nlp_or_llm_client(self):
+        script = (
+            "import sys, django; django.setup(); import HRM_NEW.urls; "
+            "print(','.join(name for name in ('spacy', 'openai', 'tiktoken') if name in sys.modules))"
+        )
+        process = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, env=os.environ)
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertEqual(process.stdout.strip(), '')
+
+    def test_structure_query_falls_back_to_keywords(self):
+        with mock.patch.object(openai_service, 'get_nlp', return_value=None):
+            self.assertTrue(openai_service.is_structure_query("Покажи структуру компанії"))
+            self.assertFalse(openai_service.is_structure_query("Скільки днів відпустки?"))
@@ -6,12 +6,14 @@ from .views import (
     ChatResetSessionAPIView,
     ChatSessionListAPIView,
     ChatSessionHistoryAPIView,
-    ChatSessionRenameAPIView
+    ChatSessionRenameAPIView,
+    ChatExportAPIView
 )
 
 urlpatterns = [
     path("chat/", ChatAPIView.as_view(), name="chat"),
     path("chat/history/", ChatHistoryAPIView.as_view(), name="chat-history"),
+    path("chat/export/", ChatExportAPIView.as_view(), name="chat-export"),
     path("chat/reset/", ChatResetSessionAPIView.as_view(), name="chat-reset"),
     path("chat/sessions/", ChatSessionListAPIView.as_view(), name="chat-session-list"),
     path("chat/sessions/<int:pk>/history/", ChatSessionHistoryAPIView.as_view(), name="chat-session-history"),
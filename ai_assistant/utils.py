@@ -1,11 +1,17 @@
 # ai_assistant/utils.py
-import tiktoken
+import functools
 from typing import List, Dict
 
 
+@functools.cache
+def get_encoding(model: str):
+    # tiktoken імпортується і завантажує словник лише при першому підрахунку
+    import tiktoken
+    return tiktoken.encoding_for_model(model)
+
+
 def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
-    encoding = tiktoken.encoding_for_model(model)
-    return len(encoding.encode(text))
+    return len(get_encoding(model).encode(text))
 
 
 def build_messages(prompt: str, session) -> List[Dict[str, str]]:
@@ -3,11 +3,14 @@ import uuid
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework import status
 from rest_framework.generics import ListAPIView, RetrieveAPIView, UpdateAPIView
 
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+
+from HRM_NEW.exports import EXPORT_FORMATS, export_response
 
 from .serializers import (
     ChatRequestSerializer,
@@ -62,19 +65,49 @@ class ChatAPIView(APIView):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class ChatHistoryAPIView(APIView):
+class ChatHistoryAPIView(ListAPIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = AIQuerySerializer
+    ordering = '-created_at'
 
     @extend_schema(
-        responses={200: AIQuerySerializer(many=True)},
         tags=["AI Assistant"],
         summary="Отримати історію спілкування з AI",
         description="Повертає історію повідомлень для поточного користувача."
     )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return AIQuery.objects.none()
+        return AIQuery.objects.filter(user=self.request.user)
+
+
+class ChatExportAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        tags=["AI Assistant"],
+        summary="Експорт усіх запитів до AI",
+        description="Потоково віддає журнал запитів усіх користувачів у CSV або JSON Lines.",
+        parameters=[OpenApiParameter(
+            name='file_format',
+            type=str,
+            enum=list(EXPORT_FORMATS),
+            description='csv (за замовчуванням) або jsonl',
+            required=False
+        )],
+        responses={200: OpenApiTypes.BINARY}
+    )
     def get(self, request):
-        history = AIQuery.objects.filter(user=request.user).order_by('-created_at')
-        serializer = AIQuerySerializer(history, many=True)
-        return Response(serializer.data)
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {"detail": f"file_format має бути одним з: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return export_response('ai_queries', file_format)
 
 
 class ChatResetSessionAPIView(APIView):
@@ -103,6 +136,7 @@ class ChatResetSessionAPIView(APIView):
 class ChatSessionListAPIView(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ChatSessionSerializer
+    ordering = '-created_at'
 
     @extend_schema(
         tags=["AI Assistant"],
@@ -110,7 +144,9 @@ class ChatSessionListAPIView(ListAPIView):
         description="Повертає всі сесії, пов’язані з поточним користувачем."
     )
     def get_queryset(self):
-        return ChatSession.objects.filter(user=self.request.user).order_by('-created_at')
+        if getattr(self, 'swagger_fake_view', False):
+            return ChatSession.objects.none()
+        return ChatSession.objects.filter(user=self.request.user)
 
 
 class ChatSessionHistoryAPIView(RetrieveAPIView):
@@ -2,7 +2,7 @@
 from django.contrib import admin
 from mptt.admin import DraggableMPTTAdmin
 from simple_history.admin import SimpleHistoryAdmin
-from .models import StructuralUnit
+from .models import StructuralUnit, UnitHeadcount
 
 @admin.register(StructuralUnit)
 class StructuralUnitAdmin(DraggableMPTTAdmin, SimpleHistoryAdmin):
@@ -14,3 +14,9 @@ class StructuralUnitAdmin(DraggableMPTTAdmin, SimpleHistoryAdmin):
     def hard_delete(self, request, queryset):
         queryset.delete()
     hard_delete.short_description = "Фізичне видалення (не рекомендується)"
+
+
+@admin.register(UnitHeadcount)
+class UnitHeadcountAdmin(admin.ModelAdmin):
+    list_display = ('unit', 'direct', 'subtree')
+    readonly_fields = ('unit', 'direct', 'subtree')
@@ -0,0 +1,53 @@
+# company/cache.py
+"""
+Версії оргструктури для кешування.
+
+Версія — це час останньої зміни (time.time_ns()), тож її можна використовувати
+і як частину ключів кешу, і як основу для ETag / Last-Modified.
+"""
+import time
+
+from django.core.cache import cache
+
+STRUCTURE_VERSION_KEY = 'company:structure:version'
+FOREST_VERSION_KEY = 'company:structure:forest'
+TREE_VERSION_KEY = 'company:structure:tree:{}'
+
+
+def _get_versions(*keys) -> dict:
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        for key, value in missing.items():
+            cache.add(key, value, timeout=None)
+        versions.update(cache.get_many(missing.keys()))
+    return versions
+
+
+def get_structure_version() -> int:
+    """
+    Поточна версія оргструктури. Використовується як частина ключів кешу,
+    тому будь-яка зміна підрозділів автоматично робить старі записи недосяжними.
+    """
+    return _get_versions(STRUCTURE_VERSION_KEY)[STRUCTURE_VERSION_KEY]
+
+
+def get_tree_version(tree_id) -> int:
+    """Час останньої зміни конкретного дерева (з урахуванням змін усього лісу)."""
+    tree_key = TREE_VERSION_KEY.format(tree_id)
+    versions = _get_versions(FOREST_VERSION_KEY, tree_key)
+    return max(versions[FOREST_VERSION_KEY], versions[tree_key])
+
+
+def touch_structure(*tree_ids):
+    """
+    Позначає оргструктуру як змінену (інвалідовує всі похідні кеші).
+    Без tree_ids вважається, що змінилися всі дерева (переміщення, фізичне видалення).
+    """
+    now = time.time_ns()
+    versions = {STRUCTURE_VERSION_KEY: now}
+    if tree_ids:
+        versions.update({TREE_VERSION_KEY.format(tree_id): now for tree_id in tree_ids})
+    else:
+        versions[FOREST_VERSION_KEY] = now
+    cache.set_many(versions, timeout=None)
@@ -0,0 +1,146 @@
+# company/diagrams.py
+"""
+Рендеринг діаграм оргструктури.
+
+Готові діаграми зберігаються в кеші за ключем (підрозділ, глибина, формат, версія дерева),
+тож повторний запит до незміненого дерева не читає підрозділів і не формує DOT-джерело.
+Холодний рендеринг виконується у фоновому потоці, який лише чекає на процес `dot`.
+Одночасних рендерингів не більше DIAGRAM_RENDER_WORKERS на всі воркери: слоти
+займаються у спільному кеші, а без вільного слота запит отримує 202.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from graphviz import Digraph, pipe
+
+from .cache import get_tree_version
+
+logger = logging.getLogger(__name__)
+
+DIAGRAM_KEY = 'company:diagram:{unit_id}:{depth}:{fmt}:{version}'
+RENDER_SLOT_KEY = 'company:diagram:slot:{}'
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = {}
+
+
+class DiagramRenderError(Exception):
+    """`dot` завершився з помилкою"""
+
+
+def build_diagram_source(units) -> str:
+    """
+    Формує DOT-джерело з рядків (id, parent_id, name, custom_type, is_active),
+    впорядкованих за lft. Вузли, батька яких немає у вибірці (крім кореня), пропускаються.
+    """
+    graph = Digraph(graph_attr={'rankdir': 'TB'})
+    visible = set()
+
+    for index, (unit_id, parent_id, name, custom_type, is_active) in enumerate(units):
+        if index and parent_id not in visible:
+            continue
+        visible.add(unit_id)
+        graph.node(
+            str(unit_id),
+            f"{name}\n({custom_type or 'Без типу'})",
+            style='filled',
+            fillcolor='white' if is_active else 'lightgrey'
+        )
+        if index:
+            graph.edge(str(parent_id), str(unit_id))
+
+    return graph.source
+
+
+def render_source(source: str, fmt: str) -> bytes:
+    """Викликає `dot`. Виконується в потоці пулу."""
+    return pipe('dot', fmt, source.encode('utf-8'))
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.DIAGRAM_RENDER_WORKERS,
+            thread_name_prefix='diagram-render'
+        )
+    return _executor
+
+
+def diagram_cache_key(unit, depth, fmt) -> str:
+    """
+    Ключ діаграми. Версія дерева береться до читання підрозділів: зміна, що закомітиться
+    під час рендерингу, змінить версію, і діаграма зі старими даними стане недосяжною.
+    """
+    return DIAGRAM_KEY.format(
+        unit_id=unit.id,
+        depth='all' if depth is None else depth,
+        fmt=fmt,
+        version=get_tree_version(unit.tree_id)
+    )
+
+
+def _acquire_slot(key):
+    for slot in range(settings.DIAGRAM_RENDER_WORKERS):
+        slot_key = RENDER_SLOT_KEY.format(slot)
+        if cache.add(slot_key, key, timeout=settings.DIAGRAM_RENDER_SLOT_TIMEOUT):
+            return slot_key
+    return None
+
+
+def _finish(key, slot_key, done):
+    with _executor_lock:
+        _pending.pop(key, None)
+    cache.delete(slot_key)
+    if done.exception() is None:
+        cache.set(key, done.result(), settings.DIAGRAM_CACHE_TIMEOUT)
+
+
+def get_diagram(key: str, fmt: str, build_source):
+    """
+    Повертає байти діаграми або None, якщо рендеринг ще триває чи всі слоти зайняті.
+    build_source() (DOT-джерело) викликається лише тоді, коли діаграми немає в кеші.
+    Однакові запити під час рендерингу чекають на той самий future.
+    """
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    with _executor_lock:
+        future = _pending.get(key)
+
+    if future is None:
+        source = build_source()
+        if fmt == 'dot':
+            data = source.encode('utf-8')
+            cache.set(key, data, settings.DIAGRAM_CACHE_TIMEOUT)
+            return data
+
+        slot_key = _acquire_slot(key)
+        if slot_key is None:
+            return None
+
+        with _executor_lock:
+            future = _pending.get(key)
+            created = future is None
+            if created:
+                future = _get_executor().submit(render_source, source, fmt)
+                _pending[key] = future
+        if created:
+            future.add_done_callback(partial(_finish, key, slot_key))
+        else:
+            # Той самий рендеринг встиг запустити інший потік
+            cache.delete(slot_key)
+
+    try:
+        return future.result(timeout=settings.DIAGRAM_RENDER_WAIT)
+    except TimeoutError:
+        return None
+    except Exception as e:
+        logger.error("Error rendering diagram %s: %s", key, str(e))
+        raise DiagramRenderError(str(e)) from e
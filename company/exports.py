@@ -0,0 +1,17 @@
+# company/exports.py
+from .models import StructuralUnit
+
+UNIT_COLUMNS = ('id', 'parent_id', 'name', 'custom_type', 'is_active', 'tree_id', 'level', 'path')
+
+
+def unit_rows(chunk_size):
+    """Усі підрозділи (включно з неактивними) у порядку обходу дерев; path — повний шлях з назвою підрозділу."""
+    rows = StructuralUnit.objects.order_by('tree_id', 'lft').values_list(
+        'id', 'parent_id', 'name', 'custom_type', 'is_active', 'tree_id', 'level', 'ancestor_path'
+    ).iterator(chunk_size=chunk_size)
+
+    def generate():
+        for *unit, path in rows:
+            yield (*unit, ' > '.join([ancestor['name'] for ancestor in path] + [unit[2]]))
+
+    return UNIT_COLUMNS, generate()
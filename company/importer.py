@@ -0,0 +1,294 @@
+# company/importer.py
+"""
+Масовий імпорт оргструктури з CSV / JSON / JSON Lines.
+
+Кожен рядок описує підрозділ: key, parent_key, name, custom_type.
+key / parent_key — ідентифікатори всередині файлу (не id в БД); рядок без parent_key — корінь.
+Усі перевірки (дублікати, цикли, глибина, унікальність імен серед сусідів) виконуються
+в пам'яті, після чого підрозділи вставляються через bulk_create рівень за рівнем
+з уже обчисленими lft/rght/level/tree_id, тож перебудова дерева не потрібна.
+Порядок сусідів у пам'яті — за кодовими точками назв; колація БД (за якою MPTT порівнює
+назви при наступних вставках) може впорядковувати інакше, тому після вставки lft/rght
+звіряються з порядком БД одним запитом (_apply_database_order), а tree_id коренів
+перенумеровуються за назвою (renumber_trees).
+"""
+import csv
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from simple_history.utils import bulk_create_with_history
+
+from .cache import touch_structure
+from .models import StructuralUnit
+from .services import renumber_trees
+
+IMPORT_FORMATS = ('csv', 'json', 'jsonl')
+MAX_REPORTED_ERRORS = 100
+
+NAME_MAX_LENGTH = StructuralUnit._meta.get_field('name').max_length
+TYPE_MAX_LENGTH = StructuralUnit._meta.get_field('custom_type').max_length
+
+
+class RowError(ValueError):
+    """Рядок, який не вдалося прочитати (кодування, синтаксис, не об'єкт)."""
+
+
+def read_rows(stream, file_format):
+    """
+    Читає файл (текстовий або байтовий) потоково. Повертає пари (номер рядка, dict);
+    замість рядка, який не вдалося прочитати, повертається RowError — решта файлу читається далі.
+    """
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Непідтримуваний формат: {file_format}")
+
+    bad_lines = []  # Рядки файлу, які не декодуються як UTF-8
+
+    def lines():
+        for line_number, line in enumerate(stream, start=1):
+            if isinstance(line, bytes):
+                try:
+                    line = line.decode('utf-8-sig' if line_number == 1 else 'utf-8')
+                except UnicodeDecodeError:
+                    bad_lines.append(line_number)
+                    line = line.decode('utf-8', errors='replace')
+            yield line
+
+    def checked(line_number, row):
+        if bad_lines:
+            bad_lines.clear()
+            return line_number, RowError("Рядок не в кодуванні UTF-8")
+        if not isinstance(row, dict):
+            return line_number, RowError("Рядок має бути об'єктом з полями")
+        return line_number, row
+
+    if file_format == 'csv':
+        reader = csv.DictReader(lines())
+        try:
+            for row in reader:
+                yield checked(reader.line_num, row)
+        except csv.Error as e:
+            yield reader.line_num, RowError(f"Некоректний CSV: {e}")
+    elif file_format == 'jsonl':
+        for line_number, line in enumerate(lines(), start=1):
+            if not line.strip() and not bad_lines:
+                continue
+            try:
+                row = None if bad_lines else json.loads(line)
+            except ValueError as e:
+                yield line_number, RowError(f"Некоректний JSON: {e}")
+                continue
+            yield checked(line_number, row)
+    else:
+        text = ''.join(lines())
+        if bad_lines:
+            yield bad_lines[0], RowError("Файл не в кодуванні UTF-8")
+            return
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            yield e.lineno, RowError(f"Некоректний JSON: {e.msg}")
+            return
+        if not isinstance(rows, list):
+            yield 1, RowError("Файл має містити масив об'єктів")
+            return
+        for index, row in enumerate(rows, start=1):
+            yield checked(index, row)
+
+
+class _Node:
+    __slots__ = ('key', 'parent_key', 'name', 'custom_type', 'line', 'children',
+                 'level', 'tree_id', 'lft', 'rght', 'unit')
+
+    def __init__(self, key, parent_key, name, custom_type, line):
+        self.key = key
+        self.parent_key = parent_key
+        self.name = name
+        self.custom_type = custom_type
+        self.line = line
+        self.children = []
+        self.level = None
+
+
+def _clean(value):
+    return str(value).strip() if value is not None else ''
+
+
+def _name_key(node):
+    return node.name
+
+
+def _number_tree(root, tree_id, children):
+    """lft/rght обходом у глибину; children(node) — діти в потрібному порядку."""
+    counter = 1
+    stack = [(root, False)]
+    while stack:
+        node, visited = stack.pop()
+        if visited:
+            node.rght = counter
+            counter += 1
+            continue
+        node.tree_id = tree_id
+        node.lft = counter
+        counter += 1
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(children(node)))
+
+
+def _apply_database_order(tree_ids, batch_size):
+    """
+    Перераховує lft/rght нових дерев за порядком назв у колації БД (так сусідів
+    розставляє order_insertion_by) і записує лише рядки, де він розійшовся з порядком у пам'яті.
+    """
+    units = list(
+        StructuralUnit.objects.filter(tree_id__in=tree_ids)
+        .order_by('name', 'id')
+        .only('id', 'parent_id', 'tree_id', 'lft', 'rght')
+    )
+    children = defaultdict(list)
+    for unit in units:
+        children[unit.parent_id].append(unit)
+    stored = {unit.id: (unit.lft, unit.rght) for unit in units}
+    for root in children[None]:
+        _number_tree(root, root.tree_id, lambda unit: children[unit.id])
+
+    changed = [unit for unit in units if stored[unit.id] != (unit.lft, unit.rght)]
+    StructuralUnit.objects.bulk_update(changed, ['lft', 'rght'], batch_size=batch_size)
+    return len(changed)
+
+
+def import_structure(rows, dry_run=False, user=None, batch_size=1000, progress=None):
+    """
+    Валідує та (якщо не dry_run) створює підрозділи з рядків read_rows().
+
+    progress(stage, done, total) викликається після кожного етапу / пакета вставки.
+    Повертає звіт {'rows', 'trees', 'created', 'dry_run', 'errors'};
+    якщо є помилки — у БД нічого не записується.
+    """
+    errors = []
+
+    def error(line, message):
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'line': line, 'detail': message})
+
+    # 1. Розбір рядків
+    nodes = {}
+    for line, row in rows:
+        if isinstance(row, RowError):
+            error(line, str(row))
+            continue
+        key = _clean(row.get('key'))
+        name = _clean(row.get('name'))
+        custom_type = _clean(row.get('custom_type'))
+        if not key:
+            error(line, "Не вказано key")
+            continue
+        if key in nodes:
+            error(line, f"Повторний key '{key}' (вперше в рядку {nodes[key].line})")
+            continue
+        if not name or len(name) > NAME_MAX_LENGTH:
+            error(line, f"Назва обов'язкова і не довша за {NAME_MAX_LENGTH} символів")
+        if len(custom_type) > TYPE_MAX_LENGTH:
+            error(line, f"Тип не довший за {TYPE_MAX_LENGTH} символів")
+        nodes[key] = _Node(key, _clean(row.get('parent_key')) or None, name, custom_type, line)
+    if progress:
+        progress('parsed', len(nodes), len(nodes))
+
+    # 2. Зв'язки батько -> діти
+    roots = []
+    for node in nodes.values():
+        if node.parent_key is None:
+            roots.append(node)
+        elif node.parent_key in nodes:
+            nodes[node.parent_key].children.append(node)
+        else:
+            error(node.line, f"Батька '{node.parent_key}' немає у файлі")
+
+    # 3. Обхід від коренів: глибина та унікальність імен серед сусідів
+    roots.sort(key=_name_key)
+    levels = defaultdict(list)
+    reached = 0
+    stack = [(root, 0) for root in reversed(roots)]
+    while stack:
+        node, level = stack.pop()
+        node.level = level
+        levels[level].append(node)
+        reached += 1
+        if level > settings.MAX_STRUCTURAL_UNIT_DEPTH:
+            error(node.line, f"Максимальна глибина ієрархії: {settings.MAX_STRUCTURAL_UNIT_DEPTH} рівнів")
+
+        node.children.sort(key=_name_key)
+        seen = set()
+        for child in node.children:
+            if child.name in seen:
+                error(child.line, f"Підрозділ з ім'ям '{child.name}' вже існує у цього батька")
+            seen.add(child.name)
+        stack.extend((child, level + 1) for child in reversed(node.children))
+
+    # Вузли, недосяжні з коренів: або під вузлом без батька (вже є помилка), або в циклі
+    if reached < len(nodes):
+        for node in nodes.values():
+            if node.level is not None or node.parent_key not in nodes:
+                continue
+            seen = set()
+            current = node
+            while current is not None and current.key not in seen:
+                seen.add(current.key)
+                current = nodes.get(current.parent_key) if current.parent_key else None
+            if current is not None:
+                error(node.line, f"Циклічний зв'язок для key '{node.key}'")
+    if progress:
+        progress('validated', reached, len(nodes))
+
+    report = {
+        'rows': len(nodes),
+        'trees': len(roots),
+        'created': 0,
+        'dry_run': dry_run,
+        'errors': errors,
+    }
+    if errors or dry_run:
+        return report
+
+    # 4. lft/rght/tree_id у пам'яті (порядок дітей — за назвою, як order_insertion_by)
+    with transaction.atomic():
+        next_tree_id = (StructuralUnit.objects.aggregate(Max('tree_id'))['tree_id__max'] or 0) + 1
+        for tree_id, root in enumerate(roots, start=next_tree_id):
+            _number_tree(root, tree_id, lambda node: node.children)
+
+        # 5. Вставка рівень за рівнем: id батьків відомі до вставки дітей
+        created = 0
+        for level in sorted(levels):
+            for start in range(0, len(levels[level]), batch_size):
+                batch = levels[level][start:start + batch_size]
+                for node in batch:
+                    parent = nodes[node.parent_key].unit if node.parent_key else None
+                    node.unit = StructuralUnit(
+                        name=node.name,
+                        custom_type=node.custom_type,
+                        parent=parent,
+                        tree_id=node.tree_id,
+                        lft=node.lft,
+                        rght=node.rght,
+                        level=node.level,
+                        ancestor_path=parent.get_path(include_self=True) if parent else [],
+                    )
+                bulk_create_with_history(
+                    [node.unit for node in batch],
+                    StructuralUnit,
+                    batch_size=batch_size,
+                    default_user=user
+                )
+                created += len(batch)
+                if progress:
+                    progress('created', created, len(nodes))
+
+        # Сусіди — за колацією БД, нові дерева вставлено після наявних — розставляємо корені за назвою
+        _apply_database_order(range(next_tree_id, next_tree_id + len(roots)), batch_size)
+        renumber_trees()
+
+    touch_structure()
+    report['created'] = created
+    return report
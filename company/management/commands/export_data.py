@@ -0,0 +1,26 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from HRM_NEW.exports import EXPORT_FORMATS, EXPORTS, get_export, iter_export
+
+
+class Command(BaseCommand):
+    help = "Потоково експортує працівників, підрозділи або журнал AI-запитів у CSV / JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORTS), help="Набір даних")
+        parser.add_argument('--format', dest='file_format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', help="Файл для запису (за замовчуванням stdout)")
+
+    def handle(self, *args, **options):
+        columns, rows = get_export(options['dataset'])
+        chunks = iter_export(columns, rows, options['file_format'])
+
+        if options['output']:
+            with Path(options['output']).open('w', encoding='utf-8', newline='') as stream:
+                stream.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Експорт записано у {options['output']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from company.importer import IMPORT_FORMATS, import_structure, read_rows
+
+
+class Command(BaseCommand):
+    help = "Імпортує оргструктуру з CSV / JSON / JSON Lines (колонки: key, parent_key, name, custom_type)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Шлях до файлу")
+        parser.add_argument(
+            '--format',
+            dest='file_format',
+            choices=IMPORT_FORMATS,
+            help="Формат файлу (за замовчуванням — з розширення)"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Лише перевірити файл, нічого не створювати")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Розмір пакета bulk_create")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['file_format'] or path.suffix.lstrip('.').lower()
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError(f"Невідомий формат файлу: {file_format}")
+
+        def progress(stage, done, total):
+            self.stdout.write(f"{stage}: {done}/{total}")
+
+        # Файл читається як байти: read_rows сам повідомляє про рядки не в UTF-8
+        with path.open('rb') as stream:
+            report = import_structure(
+                read_rows(stream, file_format),
+                dry_run=options['dry_run'],
+                batch_size=options['batch_size'],
+                progress=progress
+            )
+
+        for error in report['errors']:
+            self.stderr.write(f"Рядок {error['line']}: {error['detail']}")
+        if report['errors']:
+            raise CommandError("Імпорт не виконано: файл містить помилки")
+
+        if report['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Перевірка пройдена: {report['rows']} підрозділів, {report['trees']} дерев"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Створено {report['created']} підрозділів у {report['trees']} деревах"
+            ))
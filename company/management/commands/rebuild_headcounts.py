@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from company.models import rebuild_headcounts
+
+
+class Command(BaseCommand):
+    help = "Перераховує лічильники активних працівників (UnitHeadcount) для всіх підрозділів"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            units = rebuild_headcounts()
+        self.stdout.write(self.style.SUCCESS(f"Перераховано підрозділів: {units}"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from company.models import StructuralUnit, update_ancestor_paths
+
+
+class Command(BaseCommand):
+    help = "Перераховує денормалізовані шляхи предків (ancestor_path) для всіх підрозділів"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = update_ancestor_paths(StructuralUnit.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Оновлено шляхів: {updated}"))
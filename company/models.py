@@ -1,9 +1,21 @@
 # company/models.py
-from django.db import models
+from collections import defaultdict
+
+from django.db import models, transaction
+from django.db.models import Count, F, Q
+from django.dispatch import Signal
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from mptt.models import MPTTModel, TreeForeignKey
 from simple_history.models import HistoricalRecords
+from simple_history.utils import bulk_update_with_history
+
+from .cache import touch_structure
+from .tree import compute_ancestor_paths, path_entry
+
+
+# Надсилається після зміни шляху (назви предків) підрозділів: unit_ids — їхні id
+unit_paths_changed = Signal()
 
 
 class StructuralUnit(MPTTModel):
@@ -21,8 +33,14 @@ class StructuralUnit(MPTTModel):
         related_name='children'
     )
     is_active = models.BooleanField(default=True)
+    ancestor_path = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+        help_text="Денормалізований шлях предків: [{'id', 'name', 'type'}, ...] від кореня"
+    )
     history = HistoricalRecords(
-        excluded_fields=['lft', 'rght', 'tree_id', 'level'],
+        excluded_fields=['lft', 'rght', 'tree_id', 'level', 'ancestor_path'],
         inherit=True
     )
 
@@ -30,6 +48,15 @@ class StructuralUnit(MPTTModel):
         db_table = 'company_structuralunit'
         order_insertion_by = ['name']
 
+    class Meta:
+        # Майже всі запити працюють лише з активними підрозділами, тож індекси часткові.
+        # Діти батька віддаються за іменем — без name індекс дублював би FK-індекс parent
+        indexes = [
+            models.Index(fields=['parent', 'name'], condition=Q(is_active=True), name='unit_active_parent_idx'),
+            models.Index(fields=['tree_id', 'lft'], condition=Q(is_active=True), name='unit_active_tree_idx'),
+            models.Index(fields=['custom_type'], condition=Q(is_active=True), name='unit_active_type_idx'),
+        ]
+
     def clean(self):
         super().clean()
 
@@ -49,11 +76,59 @@ class StructuralUnit(MPTTModel):
         if self.get_level() > settings.MAX_STRUCTURAL_UNIT_DEPTH:
             raise ValidationError(f"Максимальна глибина ієрархії: {settings.MAX_STRUCTURAL_UNIT_DEPTH} рівнів")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_path_state = instance._path_state()
+        return instance
+
+    def _path_state(self):
+        return tuple(self.__dict__.get(field) for field in ('parent_id', 'name', 'custom_type'))
+
+    def save(self, *args, **kwargs):
+        """Підтримує ancestor_path і лічильники працівників актуальними при переміщенні та перейменуванні"""
+        loaded_state = getattr(self, '_loaded_path_state', None)
+        moved = loaded_state is not None and loaded_state[0] != self.parent_id
+        old_path_ids = [ancestor['id'] for ancestor in self.ancestor_path]
+
+        self.ancestor_path = self.parent.get_path(include_self=True) if self.parent_id else []
+        descendants_stale = self.pk is not None and loaded_state != self._path_state()
+
+        super().save(*args, **kwargs)
+
+        self._loaded_path_state = self._path_state()
+        if descendants_stale:
+            update_ancestor_paths(
+                self.get_descendants(),
+                known={self.id: self.get_path(include_self=True)}
+            )
+            unit_paths_changed.send(sender=StructuralUnit, unit_ids=[self.id])
+        if moved:
+            shift_subtree_headcount(self.id, old_path_ids, [ancestor['id'] for ancestor in self.ancestor_path])
+
+    def get_path(self, include_self=False):
+        """Хлібні крихти без запитів до БД"""
+        path = list(self.ancestor_path)
+        if include_self:
+            path.append(path_entry(self.id, self.name, self.custom_type))
+        return path
+
     def delete(self, *args, **kwargs):
-        """Soft delete з каскадуванням"""
-        self.is_active = False
-        self.save()
-        self.get_descendants().update(is_active=False)
+        """
+        Soft delete з каскадуванням. Одна транзакція: версія структури змінюється після коміту,
+        коли неактивні вже і підрозділ, і всі його нащадки.
+        """
+        with transaction.atomic():
+            self.is_active = False
+            self.save()
+
+            # bulk_update_with_history замість update(), щоб нащадки теж отримали записи в історії
+            descendants = list(self.get_descendants().filter(is_active=True))
+            for descendant in descendants:
+                descendant.is_active = False
+            bulk_update_with_history(descendants, StructuralUnit, ['is_active'], batch_size=500)
+            tree_id = self.tree_id
+            transaction.on_commit(lambda: touch_structure(tree_id))
 
     def get_lowest_level_descendants(self):
         """
@@ -63,3 +138,130 @@ class StructuralUnit(MPTTModel):
 
     def __str__(self):
         return f"{self.custom_type}: {self.name}" if self.custom_type else self.name
+
+
+def with_children_count(queryset):
+    """Додає children_count — кількість активних дітей кожного підрозділу"""
+    return queryset.annotate(children_count=Count('children', filter=Q(children__is_active=True)))
+
+
+def update_ancestor_paths(units, known=None):
+    """
+    Перераховує ancestor_path для вибірки підрозділів одним запитом на читання
+    і записує лише змінені рядки.
+    """
+    rows = list(
+        units.order_by('tree_id', 'lft')
+        .values_list('id', 'parent_id', 'name', 'custom_type', 'ancestor_path')
+    )
+    paths = compute_ancestor_paths((row[:4] for row in rows), known=known)
+    changed = [
+        StructuralUnit(id=unit_id, ancestor_path=paths[unit_id])
+        for unit_id, *_, old_path in rows
+        if paths[unit_id] != old_path
+    ]
+    StructuralUnit.objects.bulk_update(changed, ['ancestor_path'], batch_size=1000)
+    if changed:
+        unit_paths_changed.send(sender=StructuralUnit, unit_ids=[unit.id for unit in changed])
+    return len(changed)
+
+
+class UnitHeadcount(models.Model):
+    """
+    Лічильники активних працівників (без date_fired): безпосередньо в підрозділі
+    та в усьому піддереві. Підтримуються інкрементально, rebuild_headcounts виправляє розбіжності.
+    """
+    unit = models.OneToOneField(
+        StructuralUnit,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='headcount'
+    )
+    direct = models.IntegerField(default=0)
+    subtree = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.unit_id}: {self.direct} / {self.subtree}"
+
+
+def _add_to_headcounts(unit_ids, field, delta):
+    if not unit_ids or not delta:
+        return
+    UnitHeadcount.objects.bulk_create(
+        [UnitHeadcount(unit_id=unit_id) for unit_id in unit_ids],
+        ignore_conflicts=True
+    )
+    UnitHeadcount.objects.filter(unit_id__in=unit_ids).update(**{field: F(field) + delta})
+
+
+def adjust_headcount(unit_id, delta):
+    """Змінює лічильники підрозділу та всіх його предків на delta (найм, звільнення, переведення)"""
+    apply_headcount_deltas({unit_id: delta})
+
+
+def apply_headcount_deltas(deltas):
+    """
+    Застосовує зміни {unit_id: delta} до лічильників підрозділів і їхніх предків.
+    Оновлення групуються за величиною зміни, тож кількість запитів не залежить від кількості підрозділів.
+    Уже видалені підрозділи (каскадне видалення працівників) пропускаються.
+    """
+    deltas = {unit_id: delta for unit_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    direct = defaultdict(int)
+    subtree = defaultdict(int)
+    for unit_id, path in StructuralUnit.objects.filter(id__in=deltas).values_list('id', 'ancestor_path'):
+        direct[unit_id] += deltas[unit_id]
+        for ancestor_id in [ancestor['id'] for ancestor in path] + [unit_id]:
+            subtree[ancestor_id] += deltas[unit_id]
+
+    for field, changes in (('direct', direct), ('subtree', subtree)):
+        by_delta = defaultdict(list)
+        for unit_id, delta in changes.items():
+            if delta:
+                by_delta[delta].append(unit_id)
+        for delta, unit_ids in by_delta.items():
+            _add_to_headcounts(unit_ids, field, delta)
+
+
+def shift_subtree_headcount(unit_id, old_path_ids, new_path_ids):
+    """Переносить піддерево з лічильниками від старих предків до нових"""
+    count = UnitHeadcount.objects.filter(unit_id=unit_id).values_list('subtree', flat=True).first()
+    if not count:
+        return
+    old_ids, new_ids = set(old_path_ids), set(new_path_ids)
+    _add_to_headcounts(list(old_ids - new_ids), 'subtree', -count)
+    _add_to_headcounts(list(new_ids - old_ids), 'subtree', count)
+
+
+def rebuild_headcounts(units=None):
+    """
+    Перераховує лічильники з нуля для вибірки підрозділів (за замовчуванням — усіх).
+    Вибірка має містити цілі дерева, щоб суми для предків були повними.
+    """
+    if units is None:
+        units = StructuralUnit.objects.all()
+    rows = units.annotate(
+        active_employees=Count('employees_su', filter=Q(employees_su__date_fired__isnull=True))
+    ).values_list('id', 'ancestor_path', 'active_employees')
+
+    direct = {}
+    subtree = {}
+    for unit_id, path, count in rows.iterator(chunk_size=2000):
+        direct[unit_id] = count
+        subtree.setdefault(unit_id, 0)
+        if count:
+            for ancestor_id in [ancestor['id'] for ancestor in path] + [unit_id]:
+                subtree[ancestor_id] = subtree.get(ancestor_id, 0) + count
+
+    UnitHeadcount.objects.filter(unit__in=units).delete()
+    UnitHeadcount.objects.bulk_create(
+        [
+            UnitHeadcount(unit_id=unit_id, direct=count, subtree=subtree[unit_id])
+            for unit_id, count in direct.items()
+            if count or subtree[unit_id]
+        ],
+        batch_size=1000
+    )
+    return len(direct)
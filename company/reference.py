@@ -0,0 +1,16 @@
+# company/reference.py
+from HRM_NEW.reference import ReferenceCache
+from .cache import STRUCTURE_VERSION_KEY
+from .models import StructuralUnit
+
+
+def _load_unit_types():
+    return sorted(
+        StructuralUnit.objects.filter(is_active=True).exclude(custom_type='')
+        .values_list('custom_type', flat=True).distinct()
+    )
+
+
+# Типи активних підрозділів. Версія — версія оргструктури, яку вже оновлює
+# кожна зміна підрозділів (save, масові операції, імпорт)
+unit_types = ReferenceCache(STRUCTURE_VERSION_KEY, _load_unit_types)
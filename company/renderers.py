@@ -0,0 +1,31 @@
+# company/renderers.py
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class DiagramRenderer(BaseRenderer):
+    """Віддає готові байти діаграми; помилки та 202 (dict) віддаються як JSON з application/json."""
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = JSONRenderer.media_type
+        return JSONRenderer().render(data)
+
+
+class SVGRenderer(DiagramRenderer):
+    media_type = 'image/svg+xml'
+    format = 'svg'
+
+
+class PNGRenderer(DiagramRenderer):
+    media_type = 'image/png'
+    format = 'png'
+
+
+class DOTRenderer(DiagramRenderer):
+    media_type = 'text/vnd.graphviz'
+    format = 'dot'
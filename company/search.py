@@ -0,0 +1,33 @@
+# company/search.py
+"""Пошук підрозділів за назвою."""
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Lower
+
+from HRM_NEW.search import ensure_trigram_index, split_terms
+from .models import StructuralUnit
+
+SEARCH_INDEX_NAME = 'company_unit_name_trgm'
+
+
+def search_units(query):
+    """Активні підрозділи, назва яких містить усі терми, з анотацією rank."""
+    terms = split_terms(query)
+    units = StructuralUnit.objects.filter(is_active=True)
+    if not terms:
+        return units.none()
+
+    rank = Value(0)
+    for term in terms:
+        units = units.filter(name__icontains=term)
+        rank = rank + Case(
+            When(name_lower=term, then=Value(4)),
+            When(name_lower__startswith=term, then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField()
+        )
+    return units.alias(name_lower=Lower('name')).annotate(rank=rank)
+
+
+def create_search_index(sender, using, **kwargs):
+    """post_migrate: trigram-індекс для icontains по назві (PostgreSQL)."""
+    ensure_trigram_index(using, SEARCH_INDEX_NAME, StructuralUnit._meta.db_table, 'UPPER("name"::text)')
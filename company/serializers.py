@@ -1,8 +1,25 @@
 from typing import Optional
 from django.conf import settings
+from django.db import models
 from rest_framework import serializers
 from .models import StructuralUnit
 from drf_spectacular.utils import extend_schema_field, inline_serializer
+from HRM_NEW.history import diff_consecutive, records_by_object
+
+
+def load_unit_history(units):
+    """Історія кількох підрозділів одним запитом: {unit_id: [записи від новіших до старіших]}"""
+    return records_by_object(
+        StructuralUnit.history.select_related('history_user'),
+        [unit.id for unit in units]
+    )
+
+
+class AncestorSerializer(serializers.Serializer):
+    """Елемент ancestor_path (хлібних крихт) підрозділу"""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    type = serializers.CharField()
 
 
 class HistorySerializer(serializers.ModelSerializer):
@@ -17,10 +34,13 @@ class HistorySerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.CharField(allow_null=True))
     def get_history_user(self, obj) -> Optional[str]:
-        return obj.history_user.username if obj.history_user else "Система"
+        return obj.history_user.get_username() if obj.history_user else "Система"
 
     @extend_schema_field(serializers.ListField())
     def get_changes(self, obj) -> list:
+        # Зміни, обчислені заздалегідь для всієї сторінки (див. diff_consecutive)
+        if 'changes' in self.context:
+            return self.context['changes'].get(obj.history_id, [])
         if obj.prev_record:
             changes = obj.diff_against(obj.prev_record).changes
             return [
@@ -37,27 +57,23 @@ class HistorySerializer(serializers.ModelSerializer):
             '-': 'deleted'
         }.get(obj.history_type, 'unknown')
 
-    @extend_schema_field(
-        inline_serializer(
-            name='AncestorField',
-            fields={
-                'id': serializers.IntegerField(),
-                'name': serializers.CharField(),
-                'type': serializers.CharField()
-            },
-            many=True
-        )
-    )
+    @extend_schema_field(AncestorSerializer(many=True))
     def get_ancestors(self, obj):
-        try:
-            current = StructuralUnit.objects.get(id=obj.id)
-            ancestors = list(current.get_ancestors()) + [current]
-            return [
-                {"id": a.id, "name": a.name, "type": a.custom_type}
-                for a in ancestors
-            ]
-        except StructuralUnit.DoesNotExist:
-            return []
+        # Поточний стан підрозділу можна передати в контексті, щоб не шукати його для кожного запису
+        current = self.context.get('unit')
+        if current is None or current.id != obj.id:
+            current = StructuralUnit.objects.filter(id=obj.id).only(
+                'id', 'name', 'custom_type', 'ancestor_path'
+            ).first()
+        return current.get_path(include_self=True) if current else []
+
+
+class StructuralUnitListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Історія всієї сторінки завантажується одним запитом замість кількох на кожен підрозділ
+        units = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.child.unit_history = load_unit_history(units)
+        return super().to_representation(units)
 
 
 class StructuralUnitSerializer(serializers.ModelSerializer):
@@ -67,42 +83,48 @@ class StructuralUnitSerializer(serializers.ModelSerializer):
         allow_null=True,
         help_text="Виберіть ID батьківського підрозділу (дитину, якщо додаєте онука)"
     )
-    history = HistorySerializer(many=True, read_only=True)
+    history = serializers.SerializerMethodField()
     children_count = serializers.IntegerField(read_only=True)
 
+    @extend_schema_field(HistorySerializer(many=True))
+    def get_history(self, obj):
+        unit_history = getattr(self, 'unit_history', None)
+        records = unit_history.get(obj.id) if unit_history is not None else None
+        if records is None:
+            records = load_unit_history([obj])[obj.id]
+        context = {**self.context, 'unit': obj, 'changes': diff_consecutive(records)}
+        return HistorySerializer(records, many=True, context=context).data
+
+    @extend_schema_field(AncestorSerializer(many=True))
+    def get_ancestors(self, obj):
+        return obj.get_path()
+
+    ancestors = serializers.SerializerMethodField()
+
     @extend_schema_field(
         inline_serializer(
-            name='AncestorField',
+            name='HeadcountField',
             fields={
-                'id': serializers.IntegerField(),
-                'name': serializers.CharField(),
-                'type': serializers.CharField()
-            },
-            many=True
+                'direct': serializers.IntegerField(),
+                'subtree': serializers.IntegerField()
+            }
         )
     )
-    def get_ancestors(self, obj):
-        current = None
-
-        # Якщо це історичний об’єкт — пробуємо знайти активний
-        if hasattr(obj, 'instance') and isinstance(obj.instance, StructuralUnit):
-            current = StructuralUnit.objects.filter(id=obj.id).first()
-        elif isinstance(obj, StructuralUnit):
-            current = obj
-
-        if current:
-            return [
-                {"id": a.id, "name": a.name, "type": a.custom_type}
-                for a in current.get_ancestors()
-            ]
-        return []
+    def get_headcount(self, obj):
+        # Лічильники з UnitHeadcount (select_related('headcount') у в'юсеті)
+        headcount = getattr(obj, 'headcount', None)
+        return {
+            'direct': headcount.direct if headcount else 0,
+            'subtree': headcount.subtree if headcount else 0
+        }
 
-    ancestors = serializers.SerializerMethodField()
+    headcount = serializers.SerializerMethodField()
 
     class Meta:
         model = StructuralUnit
-        fields = '__all__'
+        exclude = ['ancestor_path']
         read_only_fields = ('is_active', 'history', 'lft', 'rght', 'tree_id', 'level')
+        list_serializer_class = StructuralUnitListSerializer
 
     def validate_parent(self, value):
         if value and not value.is_active:
@@ -118,3 +140,70 @@ class StructuralUnitSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     f"Максимальна глибина ієрархії: {settings.MAX_STRUCTURAL_UNIT_DEPTH} рівнів")
         return data
+
+
+class UnitSearchResultSerializer(serializers.ModelSerializer):
+    ancestors = serializers.SerializerMethodField()
+
+    class Meta:
+        model = StructuralUnit
+        fields = ['id', 'name', 'custom_type', 'ancestors']
+
+    @extend_schema_field(AncestorSerializer(many=True))
+    def get_ancestors(self, obj):
+        return obj.get_path()
+
+
+class BulkUnitOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['move', 'deactivate', 'reactivate'])
+    id = serializers.IntegerField()
+    parent = serializers.IntegerField(
+        required=False,
+        allow_null=True,
+        help_text="Новий батько для move (null — зробити коренем)"
+    )
+
+    def validate(self, data):
+        if data['op'] == 'move' and 'parent' not in data:
+            raise serializers.ValidationError({'parent': "Для move потрібно вказати parent"})
+        return data
+
+
+class BulkUnitOperationsSerializer(serializers.Serializer):
+    operations = BulkUnitOperationSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.MAX_BULK_UNIT_OPERATIONS
+    )
+
+
+class BulkUnitResultSerializer(serializers.Serializer):
+    applied = serializers.IntegerField()
+    changed = serializers.IntegerField()
+    trees_rebuilt = serializers.ListField(child=serializers.IntegerField())
+
+
+class StructureImportSerializer(serializers.Serializer):
+    file = serializers.FileField(help_text="CSV / JSON / JSON Lines з колонками key, parent_key, name, custom_type")
+    file_format = serializers.ChoiceField(
+        choices=['csv', 'json', 'jsonl'],
+        required=False,
+        help_text="Формат файлу (за замовчуванням — з розширення)"
+    )
+    dry_run = serializers.BooleanField(default=False, help_text="Лише перевірити файл")
+
+    def validate(self, data):
+        if 'file_format' not in data:
+            extension = data['file'].name.rsplit('.', 1)[-1].lower()
+            if extension not in ('csv', 'json', 'jsonl'):
+                raise serializers.ValidationError({'file_format': "Не вдалося визначити формат файлу"})
+            data['file_format'] = extension
+        return data
+
+
+class StructureImportReportSerializer(serializers.Serializer):
+    rows = serializers.IntegerField()
+    trees = serializers.IntegerField()
+    created = serializers.IntegerField()
+    dry_run = serializers.BooleanField()
+    errors = serializers.ListField(child=serializers.DictField())
@@ -0,0 +1,227 @@
+# company/services.py
+"""Масові операції над деревом підрозділів."""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Max, Value, When
+from rest_framework import serializers
+from simple_history.utils import bulk_update_with_history
+
+from .cache import touch_structure
+from .models import StructuralUnit, rebuild_headcounts, update_ancestor_paths
+
+
+class _Forest:
+    """Стан дерев у пам'яті: батьки, діти, активність."""
+
+    def __init__(self, units):
+        self.units = {unit.id: unit for unit in units}
+        self.parent = {unit.id: unit.parent_id for unit in units}
+        self.children = defaultdict(set)
+        for unit_id, parent_id in self.parent.items():
+            if parent_id is not None:
+                self.children[parent_id].add(unit_id)
+
+    def subtree(self, unit_id):
+        """Вузол і всі його нащадки (за поточним станом у пам'яті)."""
+        result = [unit_id]
+        for current in result:
+            result.extend(self.children[current])
+        return result
+
+    def depth(self, unit_id):
+        depth = 0
+        while (unit_id := self.parent[unit_id]) is not None:
+            depth += 1
+        return depth
+
+    def height(self, unit_id):
+        height = 0
+        level = list(self.children[unit_id])
+        while level:
+            height += 1
+            level = [child for current in level for child in self.children[current]]
+        return height
+
+    def is_ancestor(self, ancestor_id, unit_id):
+        while unit_id is not None:
+            if unit_id == ancestor_id:
+                return True
+            unit_id = self.parent[unit_id]
+        return False
+
+    def root(self, unit_id):
+        while (parent_id := self.parent[unit_id]) is not None:
+            unit_id = parent_id
+        return unit_id
+
+    def move(self, unit_id, parent_id):
+        old_parent_id = self.parent[unit_id]
+        if old_parent_id is not None:
+            self.children[old_parent_id].discard(unit_id)
+        if parent_id is not None:
+            self.children[parent_id].add(unit_id)
+        self.parent[unit_id] = parent_id
+        self.units[unit_id].parent_id = parent_id
+
+
+def _validate_move(forest, unit, parent_id):
+    if parent_id is not None:
+        if parent_id not in forest.units:
+            return {'parent': ["Підрозділ не знайдено"]}
+        if not forest.units[parent_id].is_active:
+            return {'parent': ["Не можна додавати до неактивного батька"]}
+        if forest.is_ancestor(unit.id, parent_id):
+            return {'parent': ["Спроба створити циклічний зв'язок"]}
+
+        level = forest.depth(parent_id) + 1 + forest.height(unit.id)
+        if level > settings.MAX_STRUCTURAL_UNIT_DEPTH:
+            return {'parent': [f"Максимальна глибина ієрархії: {settings.MAX_STRUCTURAL_UNIT_DEPTH} рівнів"]}
+
+        return _validate_sibling_name(forest, unit, parent_id)
+    return None
+
+
+def _validate_sibling_name(forest, unit, parent_id):
+    """Ім'я унікальне серед активних дітей parent_id (як у StructuralUnit.clean)."""
+    siblings = (forest.units[child] for child in forest.children[parent_id] if child != unit.id)
+    if any(s.is_active and s.name == unit.name for s in siblings):
+        return {'name': [f"Підрозділ з ім'ям '{unit.name}' вже існує у цього батька"]}
+    return None
+
+
+def apply_bulk_operations(operations, user=None):
+    """
+    Застосовує пакет операцій move / deactivate / reactivate в одній транзакції.
+
+    Операції валідуються та виконуються в пам'яті в порядку надходження. Якщо хоча б одна
+    операція невалідна, нічого не змінюється і піднімається ValidationError з помилками,
+    вирівняними за індексами операцій. Дерева з переміщеннями перебудовуються один раз
+    (partial_rebuild на кожен tree_id), історія пишеться масово.
+    """
+    referenced = {op['id'] for op in operations} | {
+        op['parent'] for op in operations if op.get('parent') is not None
+    }
+    tree_ids = set(
+        StructuralUnit.objects.filter(id__in=referenced).values_list('tree_id', flat=True)
+    )
+
+    with transaction.atomic():
+        forest = _Forest(StructuralUnit.objects.select_for_update().filter(tree_id__in=tree_ids))
+
+        errors = []
+        changed = set()
+        moved = set()
+        for op in operations:
+            unit = forest.units.get(op['id'])
+            if unit is None:
+                errors.append({'id': ["Підрозділ не знайдено"]})
+                continue
+
+            error = None
+            if op['op'] == 'move':
+                error = _validate_move(forest, unit, op['parent'])
+                if not error:
+                    forest.move(unit.id, op['parent'])
+                    changed.add(unit.id)
+                    moved.add(unit.id)
+            elif op['op'] == 'deactivate':
+                for unit_id in forest.subtree(unit.id):
+                    if forest.units[unit_id].is_active:
+                        forest.units[unit_id].is_active = False
+                        changed.add(unit_id)
+            elif op['op'] == 'reactivate':
+                parent_id = forest.parent[unit.id]
+                if parent_id is not None and not forest.units[parent_id].is_active:
+                    error = {'id': ["Не можна активувати підрозділ з неактивним батьком"]}
+                elif parent_id is not None and not unit.is_active:
+                    error = _validate_sibling_name(forest, unit, parent_id)
+                if not error:
+                    for unit_id in forest.subtree(unit.id):
+                        if not forest.units[unit_id].is_active:
+                            forest.units[unit_id].is_active = True
+                            changed.add(unit_id)
+            errors.append(error or {})
+
+        if any(errors):
+            raise serializers.ValidationError({'operations': errors})
+
+        rebuilt = _rebuild_moved_trees(forest, moved)
+
+        bulk_update_with_history(
+            [forest.units[unit_id] for unit_id in changed],
+            StructuralUnit,
+            ['parent', 'is_active'],
+            batch_size=500,
+            default_user=user
+        )
+
+        if rebuilt:
+            rebuilt_units = StructuralUnit.objects.filter(tree_id__in=rebuilt)
+            update_ancestor_paths(rebuilt_units)
+            rebuild_headcounts(rebuilt_units)
+
+    touch_structure()
+    return {'applied': len(operations), 'changed': len(changed), 'trees_rebuilt': sorted(rebuilt)}
+
+
+def _rebuild_moved_trees(forest, moved):
+    """
+    Призначає переміщеним піддеревам tree_id нового кореня та перебудовує
+    lft/rght/level один раз для кожного зачепленого дерева.
+    """
+    if not moved:
+        return set()
+
+    old_tree_ids = {forest.units[unit_id].tree_id for unit_id in moved}
+    next_tree_id = (StructuralUnit.objects.aggregate(Max('tree_id'))['tree_id__max'] or 0) + 1
+
+    # Корені після переміщень: переміщені в корінь отримують нове дерево
+    root_tree_ids = {}
+    for unit_id in forest.units:
+        root_id = forest.root(unit_id)
+        if root_id not in root_tree_ids:
+            if root_id in moved:
+                root_tree_ids[root_id] = next_tree_id
+                next_tree_id += 1
+            else:
+                root_tree_ids[root_id] = forest.units[root_id].tree_id
+
+    # bulk_update не викликає save(), тож lft/rght не зсуваються для кожного вузла окремо
+    to_update = [forest.units[unit_id] for unit_id in moved]
+    for unit_id, unit in forest.units.items():
+        tree_id = root_tree_ids[forest.root(unit_id)]
+        if unit.tree_id != tree_id:
+            unit.tree_id = tree_id
+            if unit_id not in moved:
+                to_update.append(unit)
+    StructuralUnit.objects.bulk_update(to_update, ['tree_id', 'parent'], batch_size=500)
+
+    rebuilt = old_tree_ids | {forest.units[unit_id].tree_id for unit_id in moved}
+    for tree_id in rebuilt:
+        StructuralUnit.objects.partial_rebuild(tree_id)
+
+    # Нові корені отримали tree_id після всіх дерев — ставимо їх на місце за назвою.
+    # Дерева, що зникли (корінь переміщено в інше дерево), у відповідь не потрапляють
+    tree_ids = renumber_trees()
+    return {tree_ids[tree_id] for tree_id in rebuilt if tree_id in tree_ids}
+
+
+def renumber_trees():
+    """
+    Перенумеровує tree_id коренів за назвою — так, як їх розставляє order_insertion_by
+    і StructuralUnit.objects.rebuild(). Змінені дерева оновлюються одним UPDATE.
+    Повертає {старий tree_id: новий} для всіх дерев.
+    """
+    roots = StructuralUnit.objects.filter(parent=None).order_by('name', 'tree_id')
+    tree_ids = {
+        old_tree_id: new_tree_id
+        for new_tree_id, old_tree_id in enumerate(roots.values_list('tree_id', flat=True), start=1)
+    }
+    changed = {old: new for old, new in tree_ids.items() if old != new}
+    if changed:
+        StructuralUnit.objects.filter(tree_id__in=changed).update(
+            tree_id=Case(*(When(tree_id=old, then=Value(new)) for old, new in changed.items()))
+        )
+    return tree_ids
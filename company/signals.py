@@ -0,0 +1,29 @@
+# company/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from mptt.signals import node_moved
+
+from .cache import touch_structure
+from .models import StructuralUnit
+
+
+# Версія змінюється лише після коміту: інакше паралельний запит може закешувати
+# під новою версією дані, прочитані ще до коміту, і вони житимуть до наступної зміни
+
+
+@receiver(post_save, sender=StructuralUnit)
+def invalidate_tree_cache(sender, instance, created, **kwargs):
+    if created and instance.parent_id is None:
+        # Новий корінь зсуває tree_id сусідніх дерев
+        transaction.on_commit(touch_structure)
+    else:
+        tree_id = instance.tree_id
+        transaction.on_commit(lambda: touch_structure(tree_id))
+
+
+@receiver(post_delete, sender=StructuralUnit)
+@receiver(node_moved, sender=StructuralUnit)
+def invalidate_structure_cache(sender, instance, **kwargs):
+    # Переміщення та фізичне видалення змінюють tree_id/lft/rght інших дерев
+    transaction.on_commit(touch_structure)
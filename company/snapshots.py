@@ -0,0 +1,175 @@
+# company/snapshots.py
+"""
+Знімки оргструктури на довільний момент часу з історичних записів.
+
+Стан підрозділів і працівників відновлюється двома запитами (по одному на таблицю історії),
+дерево будується за parent_id у пам'яті. Знімки на моменти, що вже минули, не змінюються,
+тому кешуються (наприклад, кінці місяців, які запитують найчастіше).
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from employees.models import Employee
+from HRM_NEW.history import latest_records
+from .models import StructuralUnit
+
+# Запис історії з'являється в момент коміту транзакції; новіші моменти ще можуть змінитися
+SNAPSHOT_SETTLE_TIME = datetime.timedelta(minutes=5)
+
+UNIT_FIELDS = ('id', 'parent_id', 'name', 'custom_type')
+
+
+def parse_moment(value):
+    """
+    Момент часу з ISO-рядка. Дата без часу означає кінець дня (стан після всіх змін того дня).
+    Повертає None, якщо рядок не розпізнано.
+    """
+    try:
+        if (day := parse_date(value)) is not None:
+            moment = datetime.datetime.combine(day, datetime.time.max)
+        else:
+            moment = parse_datetime(value)
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _load_state(as_of):
+    """
+    Стан на момент as_of: {id: dict підрозділу з headcount}.
+    Враховуються лише активні підрозділи; працівник рахується, якщо на той момент
+    він був прийнятий (date_hired) і ще не звільнений (date_fired).
+    """
+    units = {
+        row['id']: dict(row, direct=0, subtree=0)
+        for row in latest_records(StructuralUnit.history.all(), as_of, UNIT_FIELDS + ('is_active',))
+        if row.pop('is_active')
+    }
+
+    day = timezone.localtime(as_of).date()
+    employees = latest_records(
+        Employee.history.all(), as_of, ('structural_unit_id', 'date_hired', 'date_fired')
+    )
+    for row in employees:
+        unit = units.get(row['structural_unit_id'])
+        if unit is None:
+            continue
+        if row['date_hired'] and row['date_hired'] > day:
+            continue
+        if row['date_fired'] and row['date_fired'] <= day:
+            continue
+        unit['direct'] += 1
+
+    # Підрозділ без активного батька не входить до знімка (як і в поточному дереві)
+    visible = {None: True}
+    for unit_id in units:
+        chain, current = [], unit_id
+        while current not in visible:
+            if current not in units or current in chain:
+                result = False
+                break
+            chain.append(current)
+            current = units[current]['parent_id']
+        else:
+            result = visible[current]
+        visible.update(dict.fromkeys(chain, result))
+
+    units = {unit_id: unit for unit_id, unit in units.items() if visible[unit_id]}
+    for unit in units.values():
+        current = unit
+        while current is not None:
+            current['subtree'] += unit['direct']
+            current = units.get(current['parent_id'])
+    return units
+
+
+def _nest(units):
+    children = {}
+    for unit in sorted(units.values(), key=lambda unit: unit['name']):
+        children.setdefault(unit['parent_id'], []).append(unit)
+
+    def node(unit):
+        return {
+            'id': unit['id'],
+            'name': unit['name'],
+            'custom_type': unit['custom_type'],
+            'headcount': {'direct': unit['direct'], 'subtree': unit['subtree']},
+            'children': [],
+        }
+
+    roots = [node(unit) for unit in children.get(None, [])]
+    stack = list(zip(children.get(None, []), roots))
+    while stack:
+        unit, parent_node = stack.pop()
+        for child in children.get(unit['id'], []):
+            child_node = node(child)
+            parent_node['children'].append(child_node)
+            stack.append((child, child_node))
+    return roots
+
+
+def _cached(key, as_of, build):
+    """Кешує результат build() лише для моментів, що вже не можуть змінитися."""
+    if as_of > timezone.now() - SNAPSHOT_SETTLE_TIME:
+        return build()
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, settings.SNAPSHOT_CACHE_TIMEOUT)
+    return result
+
+
+def get_snapshot(as_of):
+    """Дерево підрозділів з headcount на момент as_of."""
+    def build():
+        units = _load_state(as_of)
+        return {
+            'as_of': as_of.isoformat(),
+            'headcount': sum(unit['direct'] for unit in units.values()),
+            'units': _nest(units),
+        }
+
+    return _cached(f"company:snapshot:{as_of.timestamp()}", as_of, build)
+
+
+def get_snapshot_diff(date_from, date_to):
+    """
+    Структурні зміни між двома моментами: додані та прибрані підрозділи,
+    зміни назви / типу / батька та безпосереднього headcount.
+    """
+    def build():
+        before, after = _load_state(date_from), _load_state(date_to)
+
+        def brief(unit):
+            return {'id': unit['id'], 'name': unit['name'], 'parent_id': unit['parent_id']}
+
+        changed = []
+        for unit_id in sorted(before.keys() & after.keys()):
+            changes = [
+                {'field': field, 'old': before[unit_id][field], 'new': after[unit_id][field]}
+                for field in ('name', 'custom_type', 'parent_id', 'direct')
+                if before[unit_id][field] != after[unit_id][field]
+            ]
+            if changes:
+                changed.append({'id': unit_id, 'name': after[unit_id]['name'], 'changes': changes})
+
+        return {
+            'from': date_from.isoformat(),
+            'to': date_to.isoformat(),
+            'headcount': {
+                'old': sum(unit['direct'] for unit in before.values()),
+                'new': sum(unit['direct'] for unit in after.values()),
+            },
+            'added': [brief(after[unit_id]) for unit_id in sorted(after.keys() - before.keys())],
+            'removed': [brief(before[unit_id]) for unit_id in sorted(before.keys() - after.keys())],
+            'changed': changed,
+        }
+
+    key = f"company:snapshot-diff:{date_from.timestamp()}:{date_to.timestamp()}"
+    return _cached(key, max(date_from, date_to), build)
@@ -1,3 +1,803 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import tempfile
+from concurrent.futures import Future
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from employees.models import Employee, Position
+from HRM_NEW.testing import QueryBudgetMixin, seed_organisation
+from users.models import User
+from . import diagrams
+from .models import StructuralUnit, UnitHeadcount, rebuild_headcounts, update_ancestor_paths
+from .tree import path_entry
+
+
+class StructuralUnitQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Кількість запитів ендпоінтів підрозділів не залежить від розміру даних"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_organisation()
+        cls.root = cls.data['root']
+        cls.leaf = cls.data['leaves'][0]
+
+    def test_list(self):
+        response = self.assertMaxQueries(2, self.client.get, '/api/company/units/', {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), len(self.data['units']))
+
+    def test_list_history_changes(self):
+        response = self.client.get(f'/api/company/units/{self.data["units"][1].id}/')
+        latest = response.data['history'][0]
+        self.assertEqual(latest['changes'][0]['field'], 'name')
+        self.assertEqual(latest['ancestors'][-1]['id'], self.data['units'][1].id)
+
+    def test_retrieve(self):
+        response = self.assertMaxQueries(2, self.client.get, f'/api/company/units/{self.root.id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_children(self):
+        response = self.assertMaxQueries(
+            3, self.client.get, '/api/company/units/children/', {'parent_id': self.root.id}
+        )
+        names = [child['name'] for child in response.data['results']]
+        self.assertEqual(len(names), 4)
+        self.assertEqual(names, sorted(names))
+
+    def test_expand(self):
+        response = self.assertMaxQueries(
+            2, self.client.get, f'/api/company/units/{self.root.id}/expand/', {'depth': 3}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_tree(self):
+        response = self.assertMaxQueries(1, self.client.get, '/api/company/units/tree/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_history(self):
+        response = self.assertMaxQueries(3, self.client.get, f'/api/company/units/{self.leaf.id}/history/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_history_page_size(self):
+        # Розмір сторінки — той самий параметр page_size, що й у решти списків
+        unit = self.data['units'][1]
+        response = self.client.get(f'/api/company/units/{unit.id}/history/', {'page_size': 1})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_employees(self):
+        response = self.assertMaxQueries(
+            2, self.client.get, f'/api/company/units/{self.root.id}/employees/',
+            {'recursive': 'true', 'active': 'true', 'page_size': 500}
+        )
+        active = sum(1 for employee in self.data['employees'] if employee.date_fired is None)
+        self.assertEqual(len(response.data['results']), active)
+        # Плоскі поля EmployeeListSerializer, як у /api/employees/, без вкладеного користувача
+        first = response.data['results'][0]
+        self.assertNotIn('user', first)
+        self.assertTrue(first['email'] and first['structural_unit']['full_name'])
+
+    def test_snapshot(self):
+        response = self.assertMaxQueries(
+            2, self.client.get, '/api/company/units/snapshot/', {'as_of': '2020-01-01'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_search(self):
+        response = self.assertMaxQueries(1, self.client.get, '/api/company/units/search/', {'q': 'група'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_types(self):
+        self.assertMaxQueries(1, self.client.get, '/api/company/units/types/')
+        # Повторний запит обслуговується з кешу довідника
+        self.assertMaxQueries(0, self.client.get, '/api/company/units/types/')
+
+    def test_export(self):
+        self.client.force_authenticate(self.data['admin'])
+        response = self.assertMaxQueries(1, self.client.get, '/api/company/units/export/', {'file_format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+
+
+class StructuralUnitIndexTests(QueryBudgetMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = seed_organisation(departments=2, teams=2, employees_per_team=1)['root']
+
+    def test_active_children(self):
+        # Як у units/children/: курсорна пагінація за іменем
+        queryset = StructuralUnit.objects.filter(parent_id=self.root.id, is_active=True).order_by('name', 'id')
+        self.assertUsesIndex(queryset, 'unit_active_parent_idx')
+
+    def test_active_subtree(self):
+        queryset = StructuralUnit.objects.filter(
+            tree_id=self.root.tree_id, lft__gte=self.root.lft, rght__lte=self.root.rght, is_active=True
+        )
+        self.assertUsesIndex(queryset, 'unit_active_tree_idx')
+
+    def test_active_by_type(self):
+        queryset = StructuralUnit.objects.filter(custom_type='DEPARTMENT', is_active=True)
+        self.assertUsesIndex(queryset, 'unit_active_type_idx')
+
+
+class TreeIntegrityMixin:
+    """Денормалізовані дані дерева збігаються з повним перерахунком"""
+
+    def assertTreeIntegrity(self):
+        """
+        lft/rght/level/tree_id — як після StructuralUnit.objects.rebuild(),
+        ancestor_path і UnitHeadcount — як після update_ancestor_paths / rebuild_headcounts.
+        """
+        def state():
+            return (
+                list(StructuralUnit.objects.order_by('id').values_list(
+                    'id', 'tree_id', 'lft', 'rght', 'level', 'ancestor_path'
+                )),
+                sorted(UnitHeadcount.objects.exclude(direct=0, subtree=0).values_list(
+                    'unit_id', 'direct', 'subtree'
+                )),
+            )
+
+        before = state()
+        StructuralUnit.objects.rebuild()
+        update_ancestor_paths(StructuralUnit.objects.all())
+        rebuild_headcounts()
+        after = state()
+        self.assertEqual(before[0], after[0], "Структура дерева розходиться з rebuild()")
+        self.assertEqual(before[1], after[1], "Лічильники розходяться з rebuild_headcounts()")
+
+    def headcount(self, unit):
+        row = UnitHeadcount.objects.filter(unit_id=unit.id).values_list('direct', 'subtree').first()
+        return row or (0, 0)
+
+
+class DiagramTests(APITestCase):
+    """Рендерер `dot` підмінено: перевіряється кеш, 202 та формат відповідей з помилками"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = seed_organisation(departments=2, teams=1, employees_per_team=1)['root']
+
+    def setUp(self):
+        cache.clear()
+        self.url = f'/api/company/units/{self.root.id}/diagram/'
+
+    def test_cached_diagram(self):
+        cache.set(diagrams.diagram_cache_key(self.root, None, 'svg'), b'<svg>cached</svg>')
+        with (
+            mock.patch.object(diagrams, '_get_executor') as executor,
+            mock.patch('company.views.build_diagram_source') as build,
+            # Лише get_object: підрозділи піддерева не читаються, DOT-джерело не формується
+            self.assertNumQueries(1),
+        ):
+            response = self.client.get(self.url, {'format': 'svg'})
+        executor.assert_not_called()
+        build.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertEqual(response.content, b'<svg>cached</svg>')
+
+    def test_tree_change_invalidates_cache(self):
+        key = diagrams.diagram_cache_key(self.root, None, 'dot')
+        cache.set(key, b'stale')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.root.get_children().first().save()
+        self.assertNotEqual(diagrams.diagram_cache_key(self.root, None, 'dot'), key)
+        response = self.client.get(self.url, {'format': 'dot'})
+        self.assertTrue(response.content.startswith(b'digraph'))
+
+    @override_settings(DIAGRAM_RENDER_WAIT=0)
+    def test_rendering_in_progress(self):
+        future = Future()
+        executor = mock.Mock(submit=mock.Mock(return_value=future))
+        with mock.patch.object(diagrams, '_get_executor', return_value=executor):
+            response = self.client.get(self.url, {'format': 'png'})
+            # Повторний запит під час рендерингу чекає на той самий future
+            self.client.get(self.url, {'format': 'png'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertIn('detail', response.json())
+        executor.submit.assert_called_once()
+
+        # Завершений рендеринг потрапляє в кеш, і наступний запит отримує 200
+        future.set_result(b'PNG')
+        response = self.client.get(self.url, {'format': 'png'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response.content, b'PNG')
+
+    @override_settings(DIAGRAM_RENDER_WAIT=0)
+    def test_render_slots_exhausted(self):
+        # Усі слоти зайняті рендерингами інших воркерів
+        for slot in range(settings.DIAGRAM_RENDER_WORKERS):
+            cache.set(diagrams.RENDER_SLOT_KEY.format(slot), 'other')
+        with mock.patch.object(diagrams, '_get_executor') as executor:
+            response = self.client.get(self.url, {'format': 'svg'})
+        self.assertEqual(response.status_code, 202)
+        executor.assert_not_called()
+
+    def test_render_failure(self):
+        future = Future()
+        future.set_exception(RuntimeError("dot: syntax error"))
+        executor = mock.Mock(submit=mock.Mock(return_value=future))
+        with mock.patch.object(diagrams, '_get_executor', return_value=executor):
+            response = self.client.get(self.url, {'format': 'svg'})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('detail', response.json())
+        # Слот звільнено, помилка не кешується
+        self.assertIsNone(cache.get(diagrams.RENDER_SLOT_KEY.format(0)))
+        self.assertIsNone(cache.get(diagrams.diagram_cache_key(self.root, None, 'svg')))
+
+    def test_invalid_depth(self):
+        response = self.client.get(self.url, {'format': 'svg', 'depth': 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('detail', response.json())
+
+    def test_unknown_unit(self):
+        response = self.client.get('/api/company/units/0/diagram/', {'format': 'svg'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+
+class TreeETagTests(APITestCase):
+    """ETag дерева: 304 для незміненого дерева, нова версія після змін"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first = StructuralUnit.objects.create(name='Перший офіс')
+        cls.first_child = StructuralUnit.objects.create(name='Бухгалтерія', parent=cls.first)
+        cls.second = StructuralUnit.objects.create(name='Другий офіс')
+        cls.second_child = StructuralUnit.objects.create(name='Склад', parent=cls.second)
+
+    def setUp(self):
+        cache.clear()
+        # Новий корінь зсуває tree_id дерев, що йдуть після нього за назвою
+        for unit in (self.first, self.first_child, self.second, self.second_child):
+            unit.refresh_from_db()
+
+    def _get(self, etag=None, **params):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/company/units/tree/', params, **headers)
+
+    def test_tree_content(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        forest = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([root['name'] for root in forest], ['Другий офіс', 'Перший офіс'])
+        self.assertEqual([child['id'] for child in forest[1]['children']], [self.first_child.id])
+
+    def test_not_modified(self):
+        etag = self._get()['ETag']
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_change_invalidates_etag(self):
+        etag = self._get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first_child.name = 'Фінанси'
+            self.first_child.save()
+
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        forest = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(forest[1]['children'][0]['name'], 'Фінанси')
+
+    def test_change_in_other_tree_keeps_etag(self):
+        first_etag = self._get(tree_id=self.first.tree_id)['ETag']
+        second_etag = self._get(tree_id=self.second.tree_id)['ETag']
+        # Перейменування може переставити вузол серед сусідів (order_insertion_by), тож змінюється тип
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second_child.custom_type = 'WAREHOUSE'
+            self.second_child.save()
+
+        self.assertEqual(self._get(first_etag, tree_id=self.first.tree_id).status_code, 304)
+        self.assertEqual(self._get(second_etag, tree_id=self.second.tree_id).status_code, 200)
+
+    def test_version_changes_on_commit(self):
+        etag = self._get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first_child.name = 'Фінанси'
+            self.first_child.save()
+            # До коміту версія стара: відповідь, зібрану з незакомічених рядків, не закешують під новою
+            self.assertEqual(self._get(etag).status_code, 304)
+        self.assertEqual(self._get(etag).status_code, 200)
+
+    def test_delete_invalidates_etag(self):
+        etag = self._get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first_child.delete()
+            self.assertEqual(self._get(etag).status_code, 304)
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 200)
+        forest = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(forest[1]['children'], [])
+
+
+class AncestorPathTests(APITestCase):
+    """ancestor_path лишається рівним шляху за MPTT після перейменувань і переміщень"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_organisation(departments=2, teams=2, employees_per_team=1)
+
+    def assertPathsConsistent(self):
+        for unit in StructuralUnit.objects.all():
+            expected = [path_entry(a.id, a.name, a.custom_type) for a in unit.get_ancestors()]
+            self.assertEqual(unit.ancestor_path, expected, f"Невірний шлях підрозділу {unit.id}")
+
+    def test_seeded_paths(self):
+        self.assertPathsConsistent()
+
+    def test_rename_with_descendants(self):
+        department = StructuralUnit.objects.get(pk=self.data['units'][1].pk)
+        department.name = 'Перейменований департамент'
+        department.custom_type = 'DIVISION'
+        department.save()
+
+        group = department.get_descendants().filter(level=department.level + 2).first()
+        self.assertEqual(group.ancestor_path[1], path_entry(department.id, department.name, 'DIVISION'))
+        self.assertPathsConsistent()
+
+    def test_move_subtree(self):
+        team = StructuralUnit.objects.get(pk=self.data['leaves'][0].pk)
+        target = StructuralUnit.objects.filter(level=1).exclude(pk=team.parent_id).first()
+        team.parent = target
+        team.save()
+
+        team.refresh_from_db()
+        self.assertEqual([entry['id'] for entry in team.ancestor_path], [self.data['root'].id, target.id])
+        group = team.get_children().get()
+        self.assertEqual(group.ancestor_path[-1]['id'], team.id)
+        self.assertEqual(group.ancestor_path[-2]['id'], target.id)
+        self.assertPathsConsistent()
+
+    def test_move_to_root(self):
+        department = StructuralUnit.objects.get(pk=self.data['units'][1].pk)
+        department.parent = None
+        department.save()
+
+        department.refresh_from_db()
+        self.assertEqual(department.ancestor_path, [])
+        self.assertPathsConsistent()
+
+    def test_api_rename(self):
+        department = self.data['units'][1]
+        response = self.client.patch(
+            f'/api/company/units/{department.id}/', {'name': 'Новий департамент'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertPathsConsistent()
+
+
+class BulkUnitOperationsTests(TreeIntegrityMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_organisation(departments=3, teams=2, employees_per_team=2)
+        # Ще один корінь, який за назвою стоїть після всіх інших
+        cls.other_root = StructuralUnit.objects.create(name='Я-філія')
+
+    def setUp(self):
+        self.client.force_authenticate(self.data['admin'])
+        self.root = StructuralUnit.objects.get(pk=self.data['root'].pk)
+        self.departments = list(self.root.get_children())
+
+    def bulk(self, *operations):
+        return self.client.post('/api/company/units/bulk/', {'operations': list(operations)}, format='json')
+
+    def test_requires_admin(self):
+        user = User.objects.create(email='user@example.com', password='!')
+        self.client.force_authenticate(user)
+        response = self.bulk({'op': 'deactivate', 'id': self.root.id})
+        self.assertEqual(response.status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertIn(self.bulk({'op': 'deactivate', 'id': self.root.id}).status_code, (401, 403))
+        self.assertTrue(StructuralUnit.objects.filter(is_active=False).count() == 0)
+
+    def test_move_subtree(self):
+        team = self.departments[0].get_children().first()
+        target = self.departments[1]
+        moved_count = self.headcount(team)[1]
+        source_before, target_before = self.headcount(self.departments[0]), self.headcount(target)
+
+        response = self.bulk({'op': 'move', 'id': team.id, 'parent': target.id})
+        self.assertEqual(response.status_code, 200, response.data)
+
+        team.refresh_from_db()
+        self.assertEqual(team.parent_id, target.id)
+        self.assertEqual([entry['id'] for entry in team.ancestor_path], [self.root.id, target.id])
+        self.assertEqual(self.headcount(self.departments[0])[1], source_before[1] - moved_count)
+        self.assertEqual(self.headcount(target)[1], target_before[1] + moved_count)
+        self.assertEqual(self.headcount(self.root)[1], self.root.headcount.subtree)
+
+        record = team.history.first()
+        self.assertEqual((record.history_type, record.parent_id), ('~', target.id))
+        self.assertEqual(record.history_user, self.data['admin'])
+        self.assertTreeIntegrity()
+
+    def test_move_to_top_level_keeps_root_order(self):
+        department = self.departments[0]
+        response = self.bulk({'op': 'move', 'id': department.id, 'parent': None})
+        self.assertEqual(response.status_code, 200, response.data)
+
+        department.refresh_from_db()
+        self.assertIsNone(department.parent_id)
+        self.assertEqual(department.ancestor_path, [])
+        roots = StructuralUnit.objects.filter(parent=None).order_by('tree_id')
+        self.assertEqual(
+            [root.name for root in roots],
+            sorted([self.root.name, department.name, self.other_root.name])
+        )
+        self.assertEqual([root.tree_id for root in roots], [1, 2, 3])
+        self.assertEqual(sorted(response.data['trees_rebuilt']), sorted({self.root.tree_id, department.tree_id}))
+        self.assertTreeIntegrity()
+
+    def test_move_root_into_other_tree(self):
+        response = self.bulk({'op': 'move', 'id': self.other_root.id, 'parent': self.departments[2].id})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(StructuralUnit.objects.filter(parent=None).count(), 1)
+        self.assertTreeIntegrity()
+
+    def test_deactivate_and_reactivate(self):
+        department = self.departments[1]
+        subtree = list(department.get_descendants(include_self=True).values_list('id', flat=True))
+
+        response = self.bulk({'op': 'deactivate', 'id': department.id})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['changed'], len(subtree))
+        self.assertFalse(StructuralUnit.objects.filter(id__in=subtree, is_active=True).exists())
+        history = StructuralUnit.history.filter(id__in=subtree)
+        self.assertEqual(history.filter(is_active=False).count(), len(subtree))
+
+        # Нащадка не можна активувати, поки батько неактивний
+        response = self.bulk({'op': 'reactivate', 'id': subtree[1]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StructuralUnit.objects.filter(id__in=subtree, is_active=True).exists())
+
+        response = self.bulk({'op': 'reactivate', 'id': department.id})
+        self.assertEqual(response.status_code, 200, response.data)
+
+        self.assertFalse(StructuralUnit.objects.filter(id__in=subtree, is_active=False).exists())
+        self.assertEqual(history.filter(is_active=True, history_type='~').count(), len(subtree))
+        self.assertTreeIntegrity()
+
+    def test_reactivate_rejects_duplicate_sibling_name(self):
+        department = self.departments[1]
+        self.assertEqual(self.bulk({'op': 'deactivate', 'id': department.id}).status_code, 200)
+        # Поки підрозділ неактивний, у батька з'являється активний з тим самим ім'ям
+        StructuralUnit.objects.create(name=department.name, parent=self.root)
+
+        response = self.bulk({'op': 'reactivate', 'id': department.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('name', response.data['operations'][0])
+        self.assertEqual(
+            StructuralUnit.objects.filter(parent=self.root, name=department.name, is_active=True).count(), 1
+        )
+        self.assertTreeIntegrity()
+
+    def test_invalid_operation_changes_nothing(self):
+        team, other_team = self.departments[0].get_children()
+        response = self.bulk(
+            {'op': 'move', 'id': team.id, 'parent': self.departments[1].id},
+            {'op': 'move', 'id': self.departments[0].id, 'parent': other_team.id},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['operations'][0], {})
+        self.assertIn('parent', response.data['operations'][1])
+        team.refresh_from_db()
+        self.assertEqual(team.parent_id, self.departments[0].id)
+        self.assertTreeIntegrity()
+
+
+class StructureImportTests(TreeIntegrityMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='admin@example.com', is_staff=True, password='!')
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, name, content, **params):
+        file = SimpleUploadedFile(name, content)
+        return self.client.post('/api/company/units/import/', {'file': file, **params}, format='multipart')
+
+    def test_csv(self):
+        content = (
+            'key,parent_key,name,custom_type\n'
+            'hq,,Головний офіс,OFFICE\n'
+            'it,hq,ІТ,DEPARTMENT\n'
+            'dev,it,Розробка,\n'
+        ).encode('utf-8-sig')
+        response = self.upload('units.csv', content)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['created'], response.data['trees']), (3, 1))
+
+        dev = StructuralUnit.objects.get(name='Розробка')
+        self.assertEqual([entry['name'] for entry in dev.ancestor_path], ['Головний офіс', 'ІТ'])
+        self.assertEqual(dev.history.count(), 1)
+        self.assertTreeIntegrity()
+
+    def test_new_roots_ordered_by_name(self):
+        existing = StructuralUnit.objects.create(name='Київ')
+        StructuralUnit.objects.create(name='Склад', parent=existing)
+        content = (
+            '{"key": "a", "name": "Англія"}\n'
+            '{"key": "b", "name": "Японія"}\n'
+            '{"key": "c", "parent_key": "a", "name": "Лондон"}\n'
+        ).encode()
+        response = self.upload('units.jsonl', content)
+        self.assertEqual(response.status_code, 200, response.data)
+
+        roots = StructuralUnit.objects.filter(parent=None).order_by('tree_id')
+        self.assertEqual([(root.name, root.tree_id) for root in roots], [('Англія', 1), ('Київ', 2), ('Японія', 3)])
+        self.assertTreeIntegrity()
+
+    def test_siblings_follow_database_collation(self):
+        content = (
+            '{"key": "hq", "name": "Офіс"}\n'
+            '{"key": "a", "parent_key": "hq", "name": "Архів"}\n'
+            '{"key": "b", "parent_key": "hq", "name": "бухгалтерія"}\n'
+            '{"key": "c", "parent_key": "hq", "name": "Каса"}\n'
+        ).encode()
+        # Порядок у пам'яті, що розходиться з колацією БД (як регістр чи кирилиця в не-C колації)
+        with mock.patch('company.importer._name_key', lambda node: [-ord(char) for char in node.name]):
+            response = self.upload('units.jsonl', content)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertTreeIntegrity()
+
+        # Наступна вставка MPTT ставить вузол серед імпортованих сусідів за тією ж колацією
+        hq = StructuralUnit.objects.get(name='Офіс')
+        StructuralUnit.objects.create(name='Бюро', parent=hq)
+        self.assertTreeIntegrity()
+
+    def test_dry_run(self):
+        response = self.upload('units.jsonl', b'{"key": "a", "name": "A"}\n', dry_run='true')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertFalse(StructuralUnit.objects.exists())
+
+    def test_malformed_json_lines(self):
+        content = b'{"key": "a", "name": "A"}\n{"key": "b",\n\n["c"]\n'
+        response = self.upload('units.jsonl', content)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['line'] for error in response.data['errors']], [2, 4])
+        self.assertFalse(StructuralUnit.objects.exists())
+
+    def test_json_array_of_non_objects(self):
+        response = self.upload('units.json', b'[{"key": "a", "name": "A"}, "b", 3]')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['line'] for error in response.data['errors']], [2, 3])
+
+    def test_invalid_json_document(self):
+        for content in (b'{"key": "a"', b'{"key": "a", "name": "A"}'):
+            response = self.upload('units.json', content)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(len(response.data['errors']), 1)
+
+    def test_non_utf8(self):
+        content = 'key,parent_key,name,custom_type\na,,Офіс,\nb,a,Відділ,\n'.encode('cp1251')
+        response = self.upload('units.csv', content)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['line'] for error in response.data['errors']], [2, 3])
+
+        response = self.upload('units.json', '[{"key": "a", "name": "Офіс"}]'.encode('cp1251'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(User.objects.create(email='user@example.com', password='!'))
+        response = self.upload('units.jsonl', b'{"key": "a", "name": "A"}\n')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(StructuralUnit.objects.exists())
+
+    def test_command_reports_unreadable_rows(self):
+        with tempfile.NamedTemporaryFile(suffix='.jsonl') as file:
+            file.write(b'{"key": "a", "name": "A"}\nnot json\n')
+            file.flush()
+            with self.assertRaises(CommandError):
+                call_command('import_structure', file.name, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(StructuralUnit.objects.exists())
+
+
+class HeadcountTests(TreeIntegrityMixin, APITestCase):
+    """Інкрементальні лічильники UnitHeadcount збігаються з перерахунком після кожної зміни"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_organisation(departments=2, teams=2, employees_per_team=2)
+
+    def setUp(self):
+        self.root = StructuralUnit.objects.get(pk=self.data['root'].pk)
+        self.department, self.other_department = self.root.get_children()
+        self.team = self.department.get_children().first()
+        self.group = self.team.get_children().get()
+
+    def counts(self, *units):
+        return [self.headcount(unit) for unit in units]
+
+    def hire(self, unit, **fields):
+        user = User.objects.create(email=f"new{User.objects.count()}@example.com", password='!')
+        return Employee.objects.create(user=user, structural_unit=unit, position=self.data['positions'][0], **fields)
+
+    def test_seeded_counts(self):
+        active = sum(1 for employee in self.data['employees'] if employee.date_fired is None)
+        self.assertEqual(self.headcount(self.root), (0, active))
+        self.assertTreeIntegrity()
+
+    def test_hire(self):
+        before = self.counts(self.group, self.team, self.root)
+        self.hire(self.group)
+        self.hire(self.group, date_fired=datetime.date(2024, 1, 1))  # Уже звільнений не рахується
+        self.assertEqual(self.counts(self.group, self.team, self.root), [
+            (before[0][0] + 1, before[0][1] + 1),
+            (before[1][0], before[1][1] + 1),
+            (0, before[2][1] + 1),
+        ])
+        self.assertTreeIntegrity()
+
+    def test_fire_and_rehire(self):
+        employee = Employee.objects.filter(structural_unit=self.group, date_fired=None).first()
+        before = self.counts(self.group, self.root)
+
+        employee.date_fired = datetime.date(2024, 1, 1)
+        employee.save()
+        self.assertEqual(self.counts(self.group, self.root), [
+            (before[0][0] - 1, before[0][1] - 1), (0, before[1][1] - 1)
+        ])
+
+        employee.date_fired = None
+        employee.save()
+        self.assertEqual(self.counts(self.group, self.root), before)
+        self.assertTreeIntegrity()
+
+    def test_transfer(self):
+        employee = Employee.objects.filter(structural_unit=self.group, date_fired=None).first()
+        target = self.other_department.get_children().first()
+        before = self.counts(self.department, target, self.other_department, self.root)
+
+        employee.structural_unit = target
+        employee.save()
+        self.assertEqual(self.counts(self.department, target, self.other_department, self.root), [
+            (before[0][0], before[0][1] - 1),
+            (before[1][0] + 1, before[1][1] + 1),
+            (before[2][0], before[2][1] + 1),
+            before[3],
+        ])
+        self.assertTreeIntegrity()
+
+    def test_delete_employee(self):
+        employee = Employee.objects.filter(structural_unit=self.group, date_fired=None).first()
+        before = self.counts(self.group, self.root)
+        employee.delete()
+        self.assertEqual(self.counts(self.group, self.root), [
+            (before[0][0] - 1, before[0][1] - 1), (0, before[1][1] - 1)
+        ])
+        self.assertTreeIntegrity()
+
+    def test_move_unit(self):
+        moved = self.headcount(self.group)[1]
+        before = self.counts(self.team, self.other_department, self.root)
+
+        self.group.parent = self.other_department
+        self.group.save()
+        self.assertEqual(self.counts(self.team, self.other_department, self.root), [
+            (before[0][0], before[0][1] - moved),
+            (before[1][0], before[1][1] + moved),
+            before[2],
+        ])
+        self.assertTreeIntegrity()
+
+    def test_move_subtree_to_top_level(self):
+        moved = self.headcount(self.department)
+        before = self.headcount(self.root)
+
+        self.department.parent = None
+        self.department.save()
+        self.assertEqual(self.headcount(self.root), (before[0], before[1] - moved[1]))
+        self.assertEqual(self.headcount(self.department), moved)
+        self.assertTreeIntegrity()
+
+    def test_rebuild_fixes_drift(self):
+        UnitHeadcount.objects.filter(unit_id=self.root.id).update(subtree=0)
+        UnitHeadcount.objects.filter(unit_id=self.group.id).delete()
+        rebuild_headcounts()
+        self.test_seeded_counts()
+
+
+
+class SnapshotTests(APITestCase):
+    """Знімки та різниця між ними відновлюються з історії на задані моменти"""
+
+    @classmethod
+    def setUpTestData(cls):
+        def happened_at(day):
+            # Записи історії щойно створених змін переносяться в минуле
+            moment = timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)))
+            for model in (StructuralUnit, Employee):
+                model.history.filter(history_date__gt=moment).update(history_date=moment)
+
+        position = Position.objects.create(name='Інженер')
+
+        def hire(unit, day):
+            user = User.objects.create(email=f"hired{User.objects.count()}@example.com", password='!')
+            return Employee.objects.create(user=user, structural_unit=unit, position=position, date_hired=day)
+
+        cls.office = StructuralUnit.objects.create(name='Офіс', custom_type='OFFICE')
+        cls.it = StructuralUnit.objects.create(name='ІТ', parent=cls.office)
+        hire(cls.it, datetime.date(2024, 1, 1))
+        happened_at(datetime.date(2024, 1, 10))
+
+        cls.it.name = 'Технології'
+        cls.it.save()
+        cls.sales = StructuralUnit.objects.create(name='Продажі', parent=cls.office)
+        hire(cls.sales, datetime.date(2024, 3, 1))
+        hire(cls.sales, datetime.date(2024, 5, 1))  # Прийнятий пізніше за момент знімка
+        happened_at(datetime.date(2024, 3, 10))
+
+    def snapshot(self, as_of):
+        response = self.client.get('/api/company/units/snapshot/', {'as_of': as_of})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_snapshot_before_changes(self):
+        data = self.snapshot('2024-02-01')
+        self.assertEqual(data['headcount'], 1)
+        self.assertEqual(data['units'], [{
+            'id': self.office.id,
+            'name': 'Офіс',
+            'custom_type': 'OFFICE',
+            'headcount': {'direct': 0, 'subtree': 1},
+            'children': [{
+                'id': self.it.id,
+                'name': 'ІТ',
+                'custom_type': '',
+                'headcount': {'direct': 1, 'subtree': 1},
+                'children': [],
+            }],
+        }])
+
+    def test_snapshot_after_changes(self):
+        data = self.snapshot('2024-04-01')
+        self.assertEqual(data['headcount'], 2)
+        office = data['units'][0]
+        self.assertEqual(office['headcount'], {'direct': 0, 'subtree': 2})
+        self.assertEqual(
+            [(child['name'], child['headcount']['direct']) for child in office['children']],
+            [('Продажі', 1), ('Технології', 1)]
+        )
+
+    def test_snapshot_before_structure_existed(self):
+        data = self.snapshot('2023-12-31')
+        self.assertEqual((data['headcount'], data['units']), (0, []))
+
+    def test_snapshot_diff(self):
+        response = self.client.get('/api/company/units/snapshot-diff/', {'from': '2024-02-01', 'to': '2024-06-01'})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['headcount'], {'old': 1, 'new': 3})
+        self.assertEqual(
+            response.data['added'],
+            [{'id': self.sales.id, 'name': 'Продажі', 'parent_id': self.office.id}]
+        )
+        self.assertEqual(response.data['removed'], [])
+        self.assertEqual(response.data['changed'], [{
+            'id': self.it.id,
+            'name': 'Технології',
+            'changes': [{'field': 'name', 'old': 'ІТ', 'new': 'Технології'}],
+        }])
+
+    def test_invalid_moments(self):
+        self.assertEqual(self.client.get('/api/company/units/snapshot/', {'as_of': 'вчора'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/company/units/snapshot/', {'as_of': '2024-02-30'}).status_code, 400)
+        for params in ({}, {'from': 'x'}, {'from': '2024-01-01', 'to': '2024-13-01'}):
+            response = self.client.get('/api/company/units/snapshot-diff/', params)
+            self.assertEqual(response.status_code, 400, params)
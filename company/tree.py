@@ -0,0 +1,64 @@
+# company/tree.py
+"""Побудова вкладених дерев підрозділів з плоских MPTT-вибірок."""
+
+TREE_FIELDS = ('id', 'name', 'custom_type', 'tree_id', 'lft', 'rght', 'level')
+
+
+def build_forest(rows, root_level=0, extra_fields=()):
+    """
+    Перетворює рядки (dict з TREE_FIELDS), впорядковані за (tree_id, lft), у вкладені вузли.
+    extra_fields — додаткові ключі рядка, що копіюються у вузол.
+
+    Вкладеність визначається за lft/rght/level без звернень до parent:
+    вузол, у якого у вибірці немає безпосереднього предка (наприклад, предок неактивний),
+    пропускається разом з усім піддеревом.
+    """
+    roots = []
+    stack = []  # (tree_id, rght, level, node)
+
+    for row in rows:
+        while stack and (stack[-1][0] != row['tree_id'] or stack[-1][1] < row['lft']):
+            stack.pop()
+
+        node = {
+            'id': row['id'],
+            'name': row['name'],
+            'custom_type': row['custom_type'],
+            'level': row['level'],
+            **{field: row[field] for field in extra_fields},
+            'children': [],
+        }
+        if stack:
+            if stack[-1][2] != row['level'] - 1:
+                continue
+            stack[-1][3]['children'].append(node)
+        elif row['level'] == root_level:
+            roots.append(node)
+        else:
+            continue
+
+        stack.append((row['tree_id'], row['rght'], row['level'], node))
+
+    return roots
+
+
+def path_entry(unit_id, name, custom_type):
+    """Елемент матеріалізованого шляху (хлібних крихт) підрозділу."""
+    return {'id': unit_id, 'name': name, 'type': custom_type}
+
+
+def compute_ancestor_paths(rows, known=None):
+    """
+    Обчислює шляхи предків для рядків (id, parent_id, name, custom_type),
+    впорядкованих так, що батько йде раніше за дітей (tree_id, lft).
+
+    known — відомі повні шляхи (включно з самим вузлом) для батьків поза вибіркою.
+    Повертає {id: ancestor_path}.
+    """
+    full_paths = dict(known or {})
+    paths = {}
+    for unit_id, parent_id, name, custom_type in rows:
+        path = full_paths.get(parent_id, []) if parent_id is not None else []
+        paths[unit_id] = path
+        full_paths[unit_id] = path + [path_entry(unit_id, name, custom_type)]
+    return paths
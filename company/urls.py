@@ -9,5 +9,6 @@ urlpatterns = [
     path('', include(router.urls)),
     path('units/<int:pk>/diagram/', StructuralUnitViewSet.as_view({'get': 'diagram'}), name='unit-diagram'),
     path('units/<int:pk>/history/', StructuralUnitViewSet.as_view({'get': 'history'}), name='unit-history'),
+    path('units/<int:pk>/employees/', StructuralUnitViewSet.as_view({'get': 'employees'}), name='unit-employees'),
     path('units/children/', StructuralUnitViewSet.as_view({'get': 'children'}), name='unit-children'),  # Додано нове поле для отримання дітей
 ]
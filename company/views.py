@@ -1,69 +1,199 @@
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
-from .models import StructuralUnit
-from .serializers import StructuralUnitSerializer
-from graphviz import Digraph
-from django.http import HttpResponse
+from .cache import get_structure_version, get_tree_version
+from .models import StructuralUnit, with_children_count
+from .serializers import (
+    StructuralUnitSerializer,
+    HistorySerializer,
+    BulkUnitOperationsSerializer,
+    BulkUnitResultSerializer,
+    StructureImportSerializer,
+    StructureImportReportSerializer,
+    UnitSearchResultSerializer,
+)
+from .importer import import_structure, read_rows
+from .services import apply_bulk_operations
+from .reference import unit_types
+from .search import search_units
+from .snapshots import get_snapshot, get_snapshot_diff, parse_moment
+from .diagrams import DiagramRenderError, build_diagram_source, diagram_cache_key, get_diagram
+from .renderers import SVGRenderer, PNGRenderer, DOTRenderer
+from .tree import TREE_FIELDS, build_forest
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
+from HRM_NEW.exports import EXPORT_FORMATS, export_response
+from HRM_NEW.history import diff_consecutive, get_previous_record
+from HRM_NEW.pagination import HistoryCursorPagination, RankedCursorPagination
+from employees.models import Employee
+from employees.serializers import EmployeeListSerializer
 
 
 class StructuralUnitViewSet(viewsets.ModelViewSet):
     serializer_class = StructuralUnitSerializer
     queryset = StructuralUnit.objects.filter(is_active=True)
     permission_classes = [AllowAny]
+    ordering = 'id'
 
     def get_queryset(self):
         queryset = super().get_queryset()
         if unit_type := self.request.query_params.get('type'):
-            queryset = queryset.filter(custom_type=unit_type)
-        return queryset.prefetch_related('children')
+            # Невідомий тип відсікається за кешем довідника, без запиту до БД
+            if unit_type in unit_types.get():
+                queryset = queryset.filter(custom_type=unit_type)
+            else:
+                queryset = queryset.none()
+        return with_children_count(queryset).select_related('headcount')
 
     @extend_schema(
         summary='Отримати історію змін',
-        parameters=[OpenApiParameter(
-            name='limit',
-            type=int,
-            description='Кількість останніх записів',
-            required=False
-        )]
+        parameters=[
+            OpenApiParameter(
+                name='page_size',
+                type=int,
+                description='Кількість записів на сторінці',
+                required=False
+            ),
+            OpenApiParameter(
+                name='cursor',
+                type=str,
+                description='Курсор наступної/попередньої сторінки',
+                required=False
+            ),
+        ],
+        responses={200: HistorySerializer(many=True)}
     )
     @action(detail=True, methods=['get'])
     def history(self, request, pk=None):
         unit = self.get_object()
-        history = unit.history.all().order_by('-history_date')
-        if limit := request.query_params.get('limit'):
-            history = history[:int(limit)]
-        serializer = self.get_serializer(history, many=True)
-        return Response(serializer.data)
+        history = unit.history.select_related('history_user')
+
+        paginator = HistoryCursorPagination()
+        records = paginator.paginate_queryset(history, request, view=self)
+
+        previous = get_previous_record(unit.history.all(), records[-1]) if records else None
+        serializer = HistorySerializer(
+            records,
+            many=True,
+            context={'request': request, 'unit': unit, 'changes': diff_consecutive(records, previous)}
+        )
+        return paginator.get_paginated_response(serializer.data)
 
     @extend_schema(
         summary='Згенерувати діаграму',
-        responses={200: OpenApiTypes.BINARY}
+        parameters=[
+            OpenApiParameter(
+                name='format',
+                type=str,
+                enum=['svg', 'png', 'dot'],
+                description='Формат діаграми (за замовчуванням svg)',
+                required=False
+            ),
+            OpenApiParameter(
+                name='depth',
+                type=int,
+                description='Кількість рівнів нащадків (за замовчуванням усі)',
+                required=False
+            ),
+        ],
+        responses={200: OpenApiTypes.BINARY, 202: None, 500: None}
     )
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get'], renderer_classes=[SVGRenderer, PNGRenderer, DOTRenderer])
     def diagram(self, request, pk=None):
         unit = self.get_object()
-        graph = Digraph(format='svg', graph_attr={'rankdir': 'TB'})
-
-        def add_nodes(node):
-            color = 'lightgrey' if not node.is_active else 'white'
-            graph.node(
-                str(node.id),
-                f"{node.name}\n({node.custom_type or 'Без типу'})",
-                style='filled',
-                fillcolor=color
+
+        depth = request.query_params.get('depth') or None
+        if depth is not None:
+            if not depth.isdigit():
+                return Response({"detail": "depth має бути невід'ємним цілим числом"}, status=400)
+            depth = int(depth)
+
+        def build_source():
+            units = unit.get_descendants(include_self=True).filter(is_active=True)
+            if depth is not None:
+                units = units.filter(level__lte=unit.level + depth)
+            return build_diagram_source(
+                units.values_list('id', 'parent_id', 'name', 'custom_type', 'is_active')
             )
-            for child in node.get_children().filter(is_active=True):
-                add_nodes(child)
-                graph.edge(str(node.id), str(child.id))
 
-        add_nodes(unit)
-        svg_data = graph.pipe()
-        return HttpResponse(svg_data, content_type='image/svg+xml')
+        fmt = request.accepted_renderer.format
+        try:
+            data = get_diagram(diagram_cache_key(unit, depth, fmt), fmt, build_source)
+        except DiagramRenderError:
+            return Response({"detail": "Не вдалося згенерувати діаграму"}, status=500)
+        if data is None:
+            return Response(
+                {"detail": "Діаграма генерується, повторіть запит пізніше"},
+                status=202,
+                headers={'Retry-After': '2'}
+            )
+        return Response(data)
+
+    @extend_schema(
+        summary='Працівники підрозділу',
+        description='З recursive=true повертає працівників усього піддерева '
+                    '(один запит за діапазоном lft/rght у межах tree_id).',
+        parameters=[
+            OpenApiParameter(
+                name='recursive',
+                type=bool,
+                description='Включати працівників дочірніх підрозділів',
+                required=False
+            ),
+            OpenApiParameter(
+                name='position',
+                type=int,
+                description='ID посади',
+                required=False
+            ),
+            OpenApiParameter(
+                name='active',
+                type=bool,
+                description='true — лише працюючі, false — лише звільнені (за замовчуванням усі)',
+                required=False
+            ),
+        ],
+        responses={200: EmployeeListSerializer(many=True)}
+    )
+    @action(detail=True, methods=['get'])
+    def employees(self, request, pk=None):
+        unit = self.get_object()
+        params = request.query_params
+
+        employees = Employee.objects.for_list()
+        if params.get('recursive', '').lower() in ('true', '1'):
+            employees = employees.filter(
+                structural_unit__tree_id=unit.tree_id,
+                structural_unit__lft__gte=unit.lft,
+                structural_unit__rght__lte=unit.rght
+            )
+        else:
+            employees = employees.filter(structural_unit=unit)
+
+        if position := params.get('position'):
+            if not position.isdigit():
+                return Response({"detail": "position має бути ID посади"}, status=400)
+            employees = employees.filter(position_id=int(position))
+
+        active = params.get('active', '').lower()
+        if active in ('true', '1'):
+            employees = employees.active()
+        elif active in ('false', '0'):
+            employees = employees.filter(date_fired__isnull=False)
+
+        page = self.paginate_queryset(employees)
+        serializer = EmployeeListSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
 
     @extend_schema(
         summary='Отримати дітей певного підрозділу',
@@ -74,7 +204,8 @@ class StructuralUnitViewSet(viewsets.ModelViewSet):
             required=True
         )]
     )
-    @action(detail=False, methods=['get'], url_path='children')
+    # Діти — в порядку дерева (за іменем); імена активних дітей унікальні, id лише для стабільності курсора
+    @action(detail=False, methods=['get'], url_path='children', ordering=('name', 'id'))
     def children(self, request):
         parent_id = request.query_params.get('parent_id')
         if not parent_id:
@@ -85,9 +216,233 @@ class StructuralUnitViewSet(viewsets.ModelViewSet):
         except StructuralUnit.DoesNotExist:
             return Response({"detail": "Підрозділ не знайдено"}, status=404)
 
-        children = parent.children.filter(is_active=True)
-        serializer = self.get_serializer(children, many=True)
-        return Response(serializer.data)
+        children = with_children_count(parent.children.filter(is_active=True)).select_related('headcount')
+        page = self.paginate_queryset(children)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        summary='Розгорнути піддерево на кілька рівнів',
+        description='Повертає підрозділ і його активних нащадків на depth рівнів нижче одним запитом. '
+                    'Кожен вузол має children_count (активні діти) та has_more — '
+                    'чи є діти, які не увійшли у відповідь.',
+        parameters=[OpenApiParameter(
+            name='depth',
+            type=int,
+            description='Кількість рівнів (за замовчуванням 1, не більше MAX_EXPAND_DEPTH)',
+            required=False
+        )],
+        responses={200: OpenApiTypes.OBJECT}
+    )
+    @action(detail=True, methods=['get'])
+    def expand(self, request, pk=None):
+        depth = request.query_params.get('depth', '1')
+        if not depth.isdigit():
+            return Response({"detail": "depth має бути невід'ємним цілим числом"}, status=400)
+        depth = min(int(depth), settings.MAX_EXPAND_DEPTH)
+
+        unit = self.get_object()
+        units = with_children_count(
+            unit.get_descendants(include_self=True).filter(is_active=True, level__lte=unit.level + depth)
+        ).order_by('lft')
+
+        nodes = build_forest(
+            (
+                dict(row, has_more=row['level'] == unit.level + depth and row['children_count'] > 0)
+                for row in units.values(*TREE_FIELDS, 'children_count')
+            ),
+            root_level=unit.level,
+            extra_fields=('children_count', 'has_more')
+        )
+        return Response(nodes[0] if nodes else {})
+
+    @extend_schema(
+        summary='Отримати повне дерево підрозділів',
+        description='Повертає всі активні дерева (або одне за tree_id) з вкладеними дітьми. '
+                    'Підтримує If-None-Match: незмінене дерево повертає 304 без тіла.',
+        parameters=[OpenApiParameter(
+            name='tree_id',
+            type=int,
+            description='ID дерева (за замовчуванням усі дерева)',
+            required=False
+        )],
+        responses={200: OpenApiTypes.OBJECT, 304: None}
+    )
+    @action(detail=False, methods=['get'], url_path='tree')
+    def tree(self, request):
+        units = StructuralUnit.objects.filter(is_active=True)
+
+        tree_id = request.query_params.get('tree_id')
+        if tree_id:
+            if not tree_id.isdigit():
+                return Response({"detail": "tree_id має бути цілим числом"}, status=400)
+            units = units.filter(tree_id=tree_id)
+            version = get_tree_version(tree_id)
+        else:
+            version = get_structure_version()
+
+        etag = quote_etag(f"{tree_id or 'all'}-{version}")
+        last_modified = version // 1_000_000_000
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            # 304 має повторювати ETag, щоб кеш клієнта оновив збережену відповідь
+            not_modified['ETag'] = etag
+            not_modified['Last-Modified'] = http_date(last_modified)
+            return not_modified
+
+        forest = build_forest(units.order_by('tree_id', 'lft').values(*TREE_FIELDS))
+
+        def stream():
+            yield '['
+            for index, root in enumerate(forest):
+                yield (',' if index else '') + json.dumps(root, ensure_ascii=False)
+            yield ']'
+
+        response = StreamingHttpResponse(stream(), content_type='application/json')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    @extend_schema(
+        summary='Типи підрозділів',
+        description='Усі типи (custom_type) активних підрозділів. Відповідь з кешу довідника.',
+        responses={200: OpenApiTypes.OBJECT}
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def types(self, request):
+        return Response(unit_types.get())
+
+    @extend_schema(
+        summary='Пошук підрозділів',
+        description='Активні підрозділи, назва яких містить усі слова запиту; '
+                    'точні збіги та збіги на початку назви — першими.',
+        parameters=[OpenApiParameter(name='q', type=str, description='Пошуковий запит', required=True)],
+        responses={200: UnitSearchResultSerializer(many=True)}
+    )
+    @action(detail=False, methods=['get'], pagination_class=RankedCursorPagination)
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if len(query) < settings.SEARCH_MIN_QUERY_LENGTH:
+            return Response(
+                {"detail": f"Запит має містити щонайменше {settings.SEARCH_MIN_QUERY_LENGTH} символи"},
+                status=400
+            )
+        units = search_units(query).only('id', 'name', 'custom_type', 'ancestor_path')
+        page = self.paginate_queryset(units)
+        serializer = UnitSearchResultSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        summary='Оргструктура на момент часу',
+        description='Відновлює дерево активних підрозділів з headcount на вказаний момент '
+                    'з історичних записів. Знімки на минулі дати кешуються.',
+        parameters=[OpenApiParameter(
+            name='as_of',
+            type=str,
+            description='Дата або дата-час ISO 8601 (дата без часу — кінець дня; за замовчуванням зараз)',
+            required=False
+        )],
+        responses={200: OpenApiTypes.OBJECT}
+    )
+    @action(detail=False, methods=['get'], url_path='snapshot')
+    def snapshot(self, request):
+        as_of = timezone.now()
+        if value := request.query_params.get('as_of'):
+            as_of = parse_moment(value)
+            if as_of is None:
+                return Response({"detail": "as_of має бути датою або датою-часом ISO 8601"}, status=400)
+        return Response(get_snapshot(as_of))
+
+    @extend_schema(
+        summary='Зміни оргструктури між двома моментами',
+        description='Додані та прибрані підрозділи, зміни назви, типу, батька та headcount.',
+        parameters=[
+            OpenApiParameter(
+                name='from',
+                type=str,
+                description='Початковий момент (дата або дата-час ISO 8601)',
+                required=True
+            ),
+            OpenApiParameter(
+                name='to',
+                type=str,
+                description='Кінцевий момент (за замовчуванням зараз)',
+                required=False
+            ),
+        ],
+        responses={200: OpenApiTypes.OBJECT}
+    )
+    @action(detail=False, methods=['get'], url_path='snapshot-diff')
+    def snapshot_diff(self, request):
+        value_from = request.query_params.get('from')
+        if not value_from:
+            return Response({"detail": "Не вказано from"}, status=400)
+        value_to = request.query_params.get('to')
+
+        date_from = parse_moment(value_from)
+        date_to = parse_moment(value_to) if value_to else timezone.now()
+        if date_from is None or date_to is None:
+            return Response({"detail": "from і to мають бути датами або датами-часом ISO 8601"}, status=400)
+        return Response(get_snapshot_diff(date_from, date_to))
+
+    @extend_schema(
+        summary='Експорт усіх підрозділів',
+        description='Потоково віддає всі підрозділи (включно з неактивними) у CSV або JSON Lines.',
+        parameters=[OpenApiParameter(
+            name='file_format',
+            type=str,
+            enum=list(EXPORT_FORMATS),
+            description='csv (за замовчуванням) або jsonl',
+            required=False
+        )],
+        responses={200: OpenApiTypes.BINARY}
+    )
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response({"detail": f"file_format має бути одним з: {', '.join(EXPORT_FORMATS)}"}, status=400)
+        return export_response('units', file_format)
+
+    @extend_schema(
+        summary='Масові операції над підрозділами',
+        description='Переміщення, деактивація та реактивація багатьох підрозділів в одній транзакції. '
+                    'Якщо хоча б одна операція невалідна, жодна не застосовується.',
+        request=BulkUnitOperationsSerializer,
+        responses={200: BulkUnitResultSerializer}
+    )
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        serializer = BulkUnitOperationsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = apply_bulk_operations(serializer.validated_data['operations'], user=request.user)
+        return Response(result)
+
+    @extend_schema(
+        summary='Імпорт оргструктури з файлу',
+        description='Створює підрозділи з CSV / JSON / JSON Lines (key, parent_key, name, custom_type). '
+                    'Файл повністю перевіряється до запису; з dry_run=true лише перевіряється.',
+        request={'multipart/form-data': StructureImportSerializer},
+        responses={200: StructureImportReportSerializer, 400: StructureImportReportSerializer}
+    )
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        parser_classes=[MultiPartParser],
+        permission_classes=[IsAdminUser]
+    )
+    def import_units(self, request):
+        serializer = StructureImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        report = import_structure(
+            read_rows(data['file'], data['file_format']),
+            dry_run=data['dry_run'],
+            user=request.user
+        )
+        return Response(report, status=400 if report['errors'] else 200)
 
     def perform_create(self, serializer):
         try:
@@ -0,0 +1,171 @@
+# employees/analytics.py
+"""
+Аналітика персоналу: щомісячні headcount, прийоми, звільнення та плинність.
+
+Потрібні колонки працівників вибираються одним запитом, далі ряди для всіх місяців
+і груп рахуються векторно в NumPy (bincount по індексу група * місяці + місяць).
+Результат кешується до кінця дня: дашборди не перераховують його при кожному запиті.
+"""
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from company.models import StructuralUnit
+from .models import Employee, Position
+
+GROUP_BY_CHOICES = ('position', 'unit')
+
+# Місяць прийому без дати — «завжди», звільнення без дати — «ніколи»
+_ALWAYS = 0
+_NEVER = np.iinfo(np.int64).max
+
+
+def month_index(day) -> int:
+    return day.year * 12 + day.month - 1
+
+
+def month_label(index) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def parse_month(value):
+    """'YYYY-MM' -> індекс місяця або None."""
+    try:
+        return month_index(datetime.datetime.strptime(value, '%Y-%m'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_months(dates, missing):
+    """Масив дат (з None) -> індекси місяців; None -> missing."""
+    months = np.array(dates, dtype='datetime64[M]')
+    # datetime64[M] рахує місяці від 1970-01
+    result = months.astype(np.int64) + 1970 * 12
+    result[np.isnat(months)] = missing
+    return result
+
+
+def monthly_series(hired, fired, groups, group_count, start, months):
+    """
+    Ряди для кожної групи. hired / fired — індекси місяців прийому та звільнення,
+    groups — номер групи кожного працівника (0..group_count-1).
+
+    headcount — кількість на кінець місяця (звільнений у місяці вже не рахується),
+    attrition_rate — звільнення / середній headcount (початок і кінець місяця).
+    """
+    def counts(index):
+        relative = index - start
+        before = np.bincount(groups[relative < 0], minlength=group_count)
+        inside = (relative >= 0) & (relative < months)
+        per_month = np.bincount(
+            groups[inside] * months + relative[inside],
+            minlength=group_count * months
+        ).reshape(group_count, months)
+        return before, per_month
+
+    hired_before, hires = counts(hired)
+    fired_before, exits = counts(fired)
+
+    opening = (hired_before - fired_before)[:, None]
+    headcount = opening + np.cumsum(hires - exits, axis=1)
+    previous = np.concatenate([opening, headcount[:, :-1]], axis=1)
+    average = (previous + headcount) / 2
+    attrition = np.divide(exits, average, out=np.zeros(average.shape), where=average > 0)
+
+    return [
+        {
+            'headcount': headcount[group].tolist(),
+            'hires': hires[group].tolist(),
+            'exits': exits[group].tolist(),
+            'attrition_rate': np.round(attrition[group], 4).tolist(),
+        }
+        for group in range(group_count)
+    ]
+
+
+def _unit_groups(unit, tree_ids, lfts):
+    """
+    Групи за піддеревами дітей unit (або коренів, якщо unit не вказано), включно з неактивними:
+    історичні ряди мають враховувати і розформовані підрозділи.
+    Працівники самого unit утворюють окрему групу з його id.
+    """
+    children = StructuralUnit.objects.filter(parent=unit) if unit else StructuralUnit.objects.filter(parent__isnull=True)
+    children = list(children.order_by('tree_id', 'lft').values_list('id', 'name', 'tree_id', 'lft', 'rght'))
+
+    # Ключ tree_id * width + lft упорядковує вузли всіх дерев в одну шкалу
+    width = max([row[4] for row in children] + [int(lfts.max(initial=0))]) + 1
+    starts = np.array([tree_id * width + lft for _, _, tree_id, lft, _ in children], dtype=np.int64)
+    ends = np.array([tree_id * width + rght for _, _, tree_id, _, rght in children], dtype=np.int64)
+    keys = tree_ids * width + lfts
+
+    position = np.searchsorted(starts, keys, side='right') - 1
+    inside = position >= 0
+    if children:
+        inside &= keys <= ends[np.maximum(position, 0)]
+    groups = [{'id': unit_id, 'name': name} for unit_id, name, *_ in children]
+    if unit:
+        groups.append({'id': unit.id, 'name': unit.name})
+    # Працівники поза піддеревами дітей — у групі самого unit (остання)
+    return np.where(inside, position, len(groups) - 1), groups
+
+
+def workforce_analytics(start, end, unit=None, position=None, group_by=None):
+    """Ряди по місяцях від start до end (індекси місяців включно)."""
+    employees = Employee.objects.order_by()
+    if unit:
+        employees = employees.filter(
+            structural_unit__tree_id=unit.tree_id,
+            structural_unit__lft__gte=unit.lft,
+            structural_unit__rght__lte=unit.rght
+        )
+    if position:
+        employees = employees.filter(position_id=position)
+
+    rows = list(employees.values_list(
+        'date_hired', 'date_fired', 'position_id', 'structural_unit__tree_id', 'structural_unit__lft'
+    ))
+    columns = list(zip(*rows)) or [[], [], [], [], []]
+    hired = _to_months(columns[0], _ALWAYS)
+    fired = _to_months(columns[1], _NEVER)
+    months = end - start + 1
+
+    total = monthly_series(hired, fired, np.zeros(len(rows), dtype=np.int64), 1, start, months)[0]
+    result = {
+        'start': month_label(start),
+        'end': month_label(end),
+        'months': [month_label(index) for index in range(start, end + 1)],
+        'total': total,
+    }
+
+    if group_by == 'position':
+        position_ids = np.array(columns[2], dtype=np.int64)
+        keys, groups = np.unique(position_ids, return_inverse=True)
+        names = dict(Position.objects.filter(id__in=keys.tolist()).values_list('id', 'name'))
+        labels = [{'id': key, 'name': names.get(key)} for key in keys.tolist()]
+    elif group_by == 'unit':
+        groups, labels = _unit_groups(
+            unit,
+            np.array(columns[3], dtype=np.int64),
+            np.array(columns[4], dtype=np.int64)
+        )
+    else:
+        return result
+
+    series = monthly_series(hired, fired, groups.astype(np.int64), len(labels), start, months)
+    result['groups'] = [dict(label, **values) for label, values in zip(labels, series)]
+    return result
+
+
+def get_workforce_analytics(start, end, unit=None, position=None, group_by=None):
+    """workforce_analytics, збережена в кеші до кінця поточного дня."""
+    today = datetime.date.today()
+    key = f"employees:analytics:{today}:{start}:{end}:{unit.id if unit else ''}:{position or ''}:{group_by or ''}"
+    result = cache.get(key)
+    if result is None:
+        result = workforce_analytics(start, end, unit=unit, position=position, group_by=group_by)
+        midnight = datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time.min)
+        timeout = max(int((midnight - datetime.datetime.now()).total_seconds()), 1)
+        cache.set(key, result, min(timeout, settings.ANALYTICS_CACHE_TIMEOUT))
+    return result
@@ -0,0 +1,24 @@
+# employees/exports.py
+from .models import Employee
+
+EMPLOYEE_COLUMNS = (
+    'id', 'user_id', 'email', 'first_name', 'last_name',
+    'structural_unit_id', 'structural_unit', 'position_id', 'position',
+    'date_hired', 'date_fired',
+)
+
+
+def employee_rows(chunk_size):
+    """Усі працівники в порядку id; підрозділ — повний шлях 'Компанія > Відділ'."""
+    rows = Employee.objects.order_by('pk').values_list(
+        'id', 'user_id', 'user__email', 'user__first_name', 'user__last_name',
+        'structural_unit_id', 'structural_unit__ancestor_path', 'structural_unit__name',
+        'position_id', 'position__name', 'date_hired', 'date_fired',
+    ).iterator(chunk_size=chunk_size)
+
+    def generate():
+        for *user, unit_id, path, unit_name, position_id, position, date_hired, date_fired in rows:
+            unit = ' > '.join([ancestor['name'] for ancestor in path] + [unit_name])
+            yield (*user, unit_id, unit, position_id, position, date_hired, date_fired)
+
+    return EMPLOYEE_COLUMNS, generate()
@@ -0,0 +1,102 @@
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+
+from company.models import StructuralUnit
+from employees.models import Employee, Position
+from employees.search import refresh_search_documents
+from employees.views import EmployeeViewSet
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Вимірює кількість запитів і пропускну здатність списку працівників, а також час пошуку "
+        "на згенерованих даних (усі зміни відкочуються)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employees',
+            type=int,
+            nargs='+',
+            default=[10_000, 100_000],
+            help="Розміри наборів працівників"
+        )
+        parser.add_argument('--depth', type=int, default=8, help="Глибина дерева підрозділів")
+        parser.add_argument('--page-size', type=int, default=settings.MAX_PAGE_SIZE, help="Розмір сторінки")
+
+    def handle(self, *args, **options):
+        for total in options['employees']:
+            with transaction.atomic():
+                self._seed(total, options['depth'])
+                self._measure(total, options['page_size'])
+                transaction.set_rollback(True)
+
+    def _seed(self, total, depth):
+        units = []
+        parent = None
+        for level in range(depth):
+            parent = StructuralUnit.objects.create(name=f"bench-{level}", parent=parent)
+            units.append(parent)
+        positions = Position.objects.bulk_create(Position(name=f"bench-{i}") for i in range(20))
+
+        password = make_password(None)
+        users = User.objects.bulk_create(
+            (User(email=f"bench-{i}@example.com", password=password, first_name='Bench', last_name=str(i))
+             for i in range(total)),
+            batch_size=2000
+        )
+        Employee.objects.bulk_create(
+            (Employee(user=user, structural_unit=units[i % depth], position=positions[i % len(positions)])
+             for i, user in enumerate(users)),
+            batch_size=2000
+        )
+        refresh_search_documents(Employee.objects.all())
+
+    def _measure(self, total, page_size):
+        view = EmployeeViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+        params = {'page_size': page_size}
+
+        pages = rows = 0
+        queries = []
+        started = time.perf_counter()
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            while True:
+                with CaptureQueriesContext(connection) as context:
+                    response = view(factory.get('/api/employees/', params))
+                    response.render()
+                queries.append(len(context))
+                pages += 1
+                if response.status_code != 200:
+                    raise CommandError(f"Список повернув {response.status_code}: {response.data}")
+                rows += len(response.data['results'])
+                if not response.data['next']:
+                    break
+                params = {'page_size': page_size, 'cursor': parse_qs(urlsplit(response.data['next']).query)['cursor'][0]}
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{total} працівників: {pages} сторінок по {page_size}, "
+            f"запитів на сторінку: {min(queries)}–{max(queries)}, "
+            f"{rows / elapsed:.0f} рядків/с ({elapsed:.2f} с)"
+        )
+
+        search = EmployeeViewSet.as_view({'get': 'search'})
+        timings = []
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for query in ('bench 42', str(total // 2), 'bench-7@example', 'bench-3'):
+                started = time.perf_counter()
+                response = search(factory.get('/api/employees/search/', {'q': query}))
+                response.render()
+                timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f"  пошук: {min(timings):.0f}–{max(timings):.0f} мс на запит (перша сторінка)"
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from employees.models import Employee
+from employees.search import refresh_search_documents
+
+
+class Command(BaseCommand):
+    help = "Перераховує пошукові документи (search_document) усіх працівників"
+
+    def handle(self, *args, **options):
+        updated = refresh_search_documents(Employee.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Оновлено документів: {updated}"))
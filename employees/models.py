@@ -12,17 +12,62 @@ class Position(models.Model):
         return self.name
 
 
+# Поля, потрібні EmployeeListSerializer
+EMPLOYEE_LIST_FIELDS = (
+    'id', 'date_hired', 'date_fired',
+    'user__id', 'user__email', 'user__first_name', 'user__last_name',
+    'structural_unit__id', 'structural_unit__name', 'structural_unit__ancestor_path',
+    'position__id', 'position__name',
+)
+
+
+class EmployeeQuerySet(models.QuerySet):
+    def active(self):
+        """Працівники, яких не звільнено"""
+        return self.filter(date_fired__isnull=True)
+
+    def for_list(self):
+        """Зв'язки одним запитом і лише поля EmployeeListSerializer"""
+        return self.select_related('user', 'structural_unit', 'position').only(*EMPLOYEE_LIST_FIELDS)
+
+
 class Employee(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='employee_profile')
     structural_unit = models.ForeignKey(StructuralUnit, on_delete=models.CASCADE, related_name='employees_su')
     position = models.ForeignKey(Position, on_delete=models.CASCADE)
     date_hired = models.DateField(null=True, blank=True)
     date_fired = models.DateField(null=True, blank=True)
+    # Ім'я, email, посада та шлях підрозділу в нижньому регістрі (див. employees/search.py)
+    search_document = models.TextField(blank=True, default='', editable=False)
 
-    history = HistoricalRecords()
+    history = HistoricalRecords(excluded_fields=['search_document'])
+
+    objects = EmployeeQuerySet.as_manager()
 
     class Meta:
         ordering = ['user__last_name']
+        indexes = [
+            # Активні працівники підрозділу: списки, лічильники, аналітика
+            models.Index(
+                fields=['structural_unit', 'position'],
+                condition=models.Q(date_fired__isnull=True),
+                name='employee_active_unit_idx'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Стан, з якого рахуються зміни лічильників UnitHeadcount (див. employees/signals.py)
+        instance._loaded_headcount_state = instance.headcount_state()
+        return instance
+
+    @property
+    def is_active(self):
+        return self.date_fired is None
+
+    def headcount_state(self):
+        return self.__dict__.get('structural_unit_id'), self.__dict__.get('date_fired') is None
 
     def __str__(self):
         return self.user
@@ -0,0 +1,11 @@
+# employees/reference.py
+from HRM_NEW.reference import ReferenceCache
+from .models import Position
+
+
+def _load_positions():
+    return {position.pk: position for position in Position.objects.all()}
+
+
+# {id: Position}; екземпляри спільні для всіх запитів процесу — лише для читання
+positions = ReferenceCache('employees:positions:version', _load_positions)
@@ -0,0 +1,73 @@
+# employees/search.py
+"""
+Пошук працівників за ім'ям, прізвищем, email, посадою та шляхом підрозділу.
+
+Усі ці поля зведено в денормалізований Employee.search_document (нижній регістр),
+який оновлюється сигналами (employees/signals.py) та масовими операціями.
+"""
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Lower
+
+from HRM_NEW.search import ensure_trigram_index, normalize, split_terms
+from .models import Employee
+
+SEARCH_INDEX_NAME = 'employees_search_document_trgm'
+
+
+def build_search_document(employee) -> str:
+    """Документ з уже завантажених user, position і structural_unit (без запитів до ancestor)."""
+    user = employee.user
+    names = [ancestor['name'] for ancestor in employee.structural_unit.get_path(include_self=True)]
+    return normalize(' '.join([
+        user.first_name or '',
+        user.last_name or '',
+        user.email,
+        employee.position.name,
+        *names,
+    ]))
+
+
+def refresh_search_documents(employees) -> int:
+    """Перераховує search_document для вибірки працівників і записує лише змінені."""
+    changed = []
+    queryset = employees.select_related('user', 'position', 'structural_unit').order_by()
+    for employee in queryset.iterator(chunk_size=2000):
+        document = build_search_document(employee)
+        if employee.search_document != document:
+            employee.search_document = document
+            changed.append(employee)
+    Employee.objects.bulk_update(changed, ['search_document'], batch_size=1000)
+    return len(changed)
+
+
+def search_employees(query, queryset=None):
+    """
+    Працівники, документ яких містить усі терми запиту, з анотацією rank:
+    збіг прізвища важить більше за збіг імені чи email, решта (посада, підрозділ) — 1.
+    """
+    terms = split_terms(query)
+    queryset = Employee.objects.all() if queryset is None else queryset
+    if not terms:
+        return queryset.none()
+
+    rank = Value(0)
+    for term in terms:
+        queryset = queryset.filter(search_document__contains=term)
+        rank = rank + Case(
+            When(last_name_lower=term, then=Value(8)),
+            When(last_name_lower__startswith=term, then=Value(4)),
+            When(first_name_lower__startswith=term, then=Value(3)),
+            When(email_lower__startswith=term, then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField()
+        )
+    return queryset.alias(
+        last_name_lower=Lower('user__last_name'),
+        first_name_lower=Lower('user__first_name'),
+        email_lower=Lower('user__email'),
+    ).annotate(rank=rank)
+
+
+def create_search_index(sender, using, **kwargs):
+    """post_migrate: trigram-індекс для LIKE-пошуку по search_document (PostgreSQL)."""
+    ensure_trigram_index(using, SEARCH_INDEX_NAME, Employee._meta.db_table, 'search_document')
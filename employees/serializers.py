@@ -1,9 +1,14 @@
+from django.conf import settings
+from django.db import models
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from company.models import StructuralUnit
+from HRM_NEW.reference import ReferenceRelatedField
 from .models import Position, Employee
+from .reference import positions
 from users.models import User
+from users.last_login import pending_last_logins
 from users.serializers import UserSerializer
 
 
@@ -13,10 +18,26 @@ class PositionSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
 
 
+class StructuralUnitRefSerializer(serializers.Serializer):
+    """Підрозділ працівника: id та повний шлях назв"""
+    id = serializers.IntegerField()
+    full_name = serializers.CharField()
+
+
+class EmployeeFullListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Незаписані входи користувачів усієї сторінки — одним зверненням до кешу, а не на кожен рядок
+        employees = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.child.pending_logins = pending_last_logins([employee.user_id for employee in employees])
+        return super().to_representation(employees)
+
+
 class EmployeeSerializer(serializers.ModelSerializer):
     user_id = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), source='user', write_only=True)
     structural_unit_id = serializers.PrimaryKeyRelatedField(queryset=StructuralUnit.objects.all(), source='structural_unit', write_only=True)
-    position_id = serializers.PrimaryKeyRelatedField(queryset=Position.objects.all(), source='position', write_only=True)
+    position_id = ReferenceRelatedField(
+        positions, queryset=Position.objects.all(), source='position', write_only=True
+    )
 
     user = serializers.SerializerMethodField()
     structural_unit = serializers.SerializerMethodField()
@@ -32,23 +53,149 @@ class EmployeeSerializer(serializers.ModelSerializer):
             'position', 'position_id',
             'date_hired', 'date_fired'
         ]
+        list_serializer_class = EmployeeFullListSerializer
 
     @extend_schema_field(UserSerializer)
     def get_user(self, obj):
-        return UserSerializer(obj.user).data
+        context = {**self.context, 'pending_logins': getattr(self, 'pending_logins', None)}
+        return UserSerializer(obj.user, context=context).data
 
+    @extend_schema_field(StructuralUnitRefSerializer)
     def get_structural_unit(self, obj):
         """
         Return dict with full path of structural unit and its ID,
         e.g., {'id': 5, 'full_name': 'Company > Department > Team'}
         """
         unit = obj.structural_unit
-        names = []
-        current = unit
-        while current:
-            names.insert(0, current.name)
-            current = current.parent
+        names = [ancestor['name'] for ancestor in unit.get_path(include_self=True)]
+        return {
+            'id': unit.id,
+            'full_name': ' > '.join(names)
+        }
+
+
+class EmployeeListSerializer(serializers.ModelSerializer):
+    """
+    Легкий серіалізатор для списків: лише плоскі поля з уже завантажених зв'язків
+    (user, structural_unit, position), без вкладених серіалізаторів і запитів на рядок.
+    """
+    email = serializers.EmailField(source='user.email', read_only=True)
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    structural_unit = serializers.SerializerMethodField()
+    position = PositionSerializer(read_only=True)
+
+    class Meta:
+        model = Employee
+        fields = [
+            'id', 'user_id', 'email', 'first_name', 'last_name',
+            'structural_unit', 'position',
+            'date_hired', 'date_fired'
+        ]
+        read_only_fields = fields
+
+    @extend_schema_field(StructuralUnitRefSerializer)
+    def get_structural_unit(self, obj):
+        unit = obj.structural_unit
+        names = [ancestor['name'] for ancestor in unit.ancestor_path] + [unit.name]
         return {
             'id': unit.id,
             'full_name': ' > '.join(names)
         }
+
+
+class EmployeeOperationSerializer(serializers.Serializer):
+    """
+    Форма однієї операції масового запиту. Лише типи та обов'язкові поля —
+    існування користувачів, підрозділів і посад перевіряється для всього пакета разом.
+    """
+    op = serializers.ChoiceField(choices=['create', 'update', 'transfer'])
+    id = serializers.IntegerField(required=False, help_text="ID працівника (update / transfer)")
+    user_id = serializers.IntegerField(required=False, help_text="ID користувача (create)")
+    structural_unit_id = serializers.IntegerField(required=False)
+    position_id = serializers.IntegerField(required=False)
+    date_hired = serializers.DateField(required=False, allow_null=True)
+    date_fired = serializers.DateField(required=False, allow_null=True)
+
+    REQUIRED = {
+        'create': ('user_id', 'structural_unit_id', 'position_id'),
+        'update': ('id',),
+        'transfer': ('id', 'structural_unit_id'),
+    }
+
+    def validate(self, data):
+        missing = {
+            field: "Обов'язкове поле для цієї операції"
+            for field in self.REQUIRED[data['op']]
+            if field not in data
+        }
+        if missing:
+            raise serializers.ValidationError(missing)
+        if data['op'] == 'create' and 'id' in data:
+            raise serializers.ValidationError({'id': "Для create id не вказується"})
+        return data
+
+
+class EmployeeBulkSerializer(serializers.Serializer):
+    operations = EmployeeOperationSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.MAX_BULK_EMPLOYEE_OPERATIONS
+    )
+
+
+class EmployeeBulkResultSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    updated = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    results = serializers.ListField(child=serializers.DictField())
+
+
+class EmployeeHistorySerializer(serializers.ModelSerializer):
+    """
+    Запис стрічки змін. Зміни та назви пов'язаних об'єктів обчислюються заздалегідь
+    для всієї сторінки (employees/timeline.py) і передаються в контексті.
+    """
+    history_user = serializers.SerializerMethodField()
+    event_type = serializers.SerializerMethodField()
+    employee = serializers.SerializerMethodField()
+    changes = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Employee.history.model
+        fields = ['history_id', 'history_date', 'history_user', 'event_type', 'employee', 'changes']
+
+    def get_history_user(self, obj) -> str:
+        return obj.history_user.get_username() if obj.history_user else "Система"
+
+    def get_event_type(self, obj) -> str:
+        return {
+            '+': 'created',
+            '~': 'updated',
+            '-': 'deleted'
+        }.get(obj.history_type, 'unknown')
+
+    def _reference(self, field, value):
+        if value is None:
+            return None
+        return {'id': value, 'name': self.context['names'][field].get(value)}
+
+    @extend_schema_field(serializers.DictField())
+    def get_employee(self, obj):
+        return {
+            'id': obj.id,
+            'user': self._reference('user', obj.user_id),
+            'structural_unit': self._reference('structural_unit', obj.structural_unit_id),
+            'position': self._reference('position', obj.position_id),
+        }
+
+    @extend_schema_field(serializers.ListField())
+    def get_changes(self, obj) -> list:
+        return [
+            {
+                'field': change['field'],
+                'old': self._reference(change['field'], change['old']),
+                'new': self._reference(change['field'], change['new']),
+            } if change['field'] in self.context['names'] else change
+            for change in self.context['changes'].get(obj.history_id, [])
+        ]
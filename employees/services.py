@@ -0,0 +1,122 @@
+# employees/services.py
+"""Масові операції над працівниками."""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+
+from company.models import StructuralUnit, apply_headcount_deltas
+from users.models import User
+from .models import Employee, Position
+from .search import refresh_search_documents
+from .serializers import EmployeeOperationSerializer
+
+UPDATABLE_FIELDS = ('structural_unit_id', 'position_id', 'date_hired', 'date_fired')
+
+
+def apply_employee_operations(operations, user=None):
+    """
+    Застосовує пакет операцій create / update / transfer в одній транзакції.
+
+    Усі користувачі, підрозділи, посади та працівники пакета завантажуються кількома IN-запитами.
+    Невалідні операції пропускаються: results вирівняні за індексами операцій і містять
+    {'id', 'status'} для застосованих та {'status': 'error', 'errors'} для решти.
+    Історія пишеться масово, лічильники підрозділів оновлюються одним проходом.
+    """
+    results = [None] * len(operations)
+    valid = []
+    for index, operation in enumerate(operations):
+        serializer = EmployeeOperationSerializer(data=operation)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {'status': 'error', 'errors': serializer.errors}
+
+    def collect(field):
+        return {data[field] for _, data in valid if data.get(field) is not None}
+
+    with transaction.atomic():
+        employees = Employee.objects.select_for_update().in_bulk(collect('id'))
+        unit_ids = set(
+            StructuralUnit.objects.filter(id__in=collect('structural_unit_id'), is_active=True)
+            .values_list('id', flat=True)
+        )
+        position_ids = set(Position.objects.filter(id__in=collect('position_id')).values_list('id', flat=True))
+        user_ids = collect('user_id')
+        existing_user_ids = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+        employed_user_ids = set(
+            Employee.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)
+        )
+        user_id_counts = Counter(data['user_id'] for _, data in valid if data['op'] == 'create')
+
+        to_create = []
+        to_update = {}
+        headcount = defaultdict(int)
+        for index, data in valid:
+            errors = {}
+            if data.get('structural_unit_id') is not None and data['structural_unit_id'] not in unit_ids:
+                errors['structural_unit_id'] = ["Активний підрозділ не знайдено"]
+            if data.get('position_id') is not None and data['position_id'] not in position_ids:
+                errors['position_id'] = ["Посаду не знайдено"]
+
+            if data['op'] == 'create':
+                if data['user_id'] not in existing_user_ids:
+                    errors['user_id'] = ["Користувача не знайдено"]
+                elif data['user_id'] in employed_user_ids or user_id_counts[data['user_id']] > 1:
+                    errors['user_id'] = ["Користувач уже є працівником"]
+                employee = Employee(user_id=data['user_id'])
+            else:
+                employee = employees.get(data['id'])
+                if employee is None:
+                    errors['id'] = ["Працівника не знайдено"]
+
+            if not errors:
+                values = {field: data.get(field, getattr(employee, field)) for field in UPDATABLE_FIELDS}
+                if values['date_hired'] and values['date_fired'] and values['date_fired'] < values['date_hired']:
+                    errors['date_fired'] = ["Дата звільнення не може бути раніше дати прийому"]
+
+            if errors:
+                results[index] = {'status': 'error', 'errors': errors}
+                continue
+
+            old_state = employee.headcount_state() if employee.pk else (None, False)
+            for field, value in values.items():
+                setattr(employee, field, value)
+            new_state = employee.headcount_state()
+            for unit_id, active, delta in (*old_state, -1), (*new_state, 1):
+                if active and unit_id:
+                    headcount[unit_id] += delta
+
+            if employee.pk:
+                to_update[employee.pk] = employee
+                results[index] = {'id': employee.pk, 'status': 'updated'}
+            else:
+                to_create.append((index, employee))
+
+        created = bulk_create_with_history(
+            [employee for _, employee in to_create],
+            Employee,
+            batch_size=500,
+            default_user=user
+        )
+        for (index, _), employee in zip(to_create, created):
+            results[index] = {'id': employee.pk, 'status': 'created'}
+
+        bulk_update_with_history(
+            list(to_update.values()),
+            Employee,
+            list(UPDATABLE_FIELDS),
+            batch_size=500,
+            default_user=user
+        )
+        apply_headcount_deltas(headcount)
+        refresh_search_documents(
+            Employee.objects.filter(pk__in=[employee.pk for employee in created] + list(to_update))
+        )
+
+    return {
+        'created': len(created),
+        'updated': len(to_update),
+        'failed': sum(result['status'] == 'error' for result in results),
+        'results': results,
+    }
@@ -0,0 +1,67 @@
+# employees/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from company.models import adjust_headcount, unit_paths_changed
+from users.models import User
+from .models import Employee, Position
+from .reference import positions
+from .search import build_search_document, refresh_search_documents
+
+SEARCHABLE_USER_FIELDS = {'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save, sender=Employee)
+def update_headcount_on_save(sender, instance, created, **kwargs):
+    """Найм, звільнення та переведення змінюють лічильники старого і нового підрозділів"""
+    old_unit_id, old_active = (None, False) if created else getattr(
+        instance, '_loaded_headcount_state', (None, False)
+    )
+    new_unit_id, new_active = instance.headcount_state()
+    if (old_unit_id, old_active) == (new_unit_id, new_active):
+        return
+
+    with transaction.atomic():
+        if old_active and old_unit_id:
+            adjust_headcount(old_unit_id, -1)
+        if new_active and new_unit_id:
+            adjust_headcount(new_unit_id, 1)
+    instance._loaded_headcount_state = (new_unit_id, new_active)
+
+
+@receiver(post_delete, sender=Employee)
+def update_headcount_on_delete(sender, instance, **kwargs):
+    unit_id, active = getattr(instance, '_loaded_headcount_state', instance.headcount_state())
+    if active and unit_id:
+        adjust_headcount(unit_id, -1)
+
+
+@receiver(pre_save, sender=Employee)
+def update_search_document(sender, instance, **kwargs):
+    instance.search_document = build_search_document(instance)
+
+
+@receiver(post_save, sender=User)
+def refresh_user_search_documents(sender, instance, created, update_fields=None, **kwargs):
+    # Вхід у систему оновлює лише last_login — документ не змінюється
+    if created or (update_fields and not SEARCHABLE_USER_FIELDS & set(update_fields)):
+        return
+    refresh_search_documents(Employee.objects.filter(user=instance))
+
+
+@receiver(post_save, sender=Position)
+def refresh_position_search_documents(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(Employee.objects.filter(position=instance))
+
+
+@receiver(unit_paths_changed)
+def refresh_unit_search_documents(sender, unit_ids, **kwargs):
+    refresh_search_documents(Employee.objects.filter(structural_unit_id__in=unit_ids))
+
+
+@receiver(post_save, sender=Position)
+@receiver(post_delete, sender=Position)
+def invalidate_positions(sender, **kwargs):
+    positions.invalidate()
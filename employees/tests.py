@@ -1,3 +1,203 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from company.models import StructuralUnit
+from HRM_NEW.testing import QueryBudgetMixin, seed_organisation
+from users.models import User
+from .models import Employee, Position
+
+
+class EmployeeQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Кількість запитів ендпоінтів працівників не залежить від розміру сторінки"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_organisation()
+        cls.employee = cls.data['employees'][0]
+
+    def test_list(self):
+        response = self.assertMaxQueries(1, self.client.get, '/api/employees/employees/', {'page_size': 500})
+        self.assertEqual(len(response.data['results']), len(self.data['employees']))
+
+    def test_retrieve(self):
+        response = self.assertMaxQueries(1, self.client.get, f'/api/employees/employees/{self.employee.id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_search(self):
+        response = self.assertMaxQueries(1, self.client.get, '/api/employees/employees/search/', {'q': 'прізвище1'})
+        self.assertTrue(response.data['results'])
+
+    def test_timeline(self):
+        response = self.assertMaxQueries(
+            5, self.client.get, f'/api/employees/employees/{self.employee.id}/timeline/'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_recent_changes(self):
+        response = self.assertMaxQueries(
+            5, self.client.get, '/api/employees/employees/recent-changes/', {'page_size': 100}
+        )
+        self.assertEqual(len(response.data['results']), 100)
+
+    def test_analytics(self):
+        params = {'start': '2022-01', 'end': '2023-12', 'group_by': 'unit'}
+        response = self.assertMaxQueries(2, self.client.get, '/api/employees/employees/analytics/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertMaxQueries(0, self.client.get, '/api/employees/employees/analytics/', params)
+
+    def test_export(self):
+        self.client.force_authenticate(self.data['admin'])
+        response = self.assertMaxQueries(
+            1, self.client.get, '/api/employees/employees/export/', {'file_format': 'jsonl'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk(self):
+        source, target = self.data['leaves'][0], self.data['leaves'][-1]
+        operations = [
+            {'op': 'transfer', 'id': employee.id, 'structural_unit_id': target.id}
+            for employee in self.data['employees'] if employee.structural_unit_id == source.id
+        ]
+        self.client.force_authenticate(self.data['admin'])
+        # Кількість запитів не залежить від кількості операцій у пакеті
+        for batch in (operations[:1], operations[1:]):
+            response = self.assertMaxQueries(
+                17, self.client.post, '/api/employees/employees/bulk/', {'operations': batch}, format='json'
+            )
+            self.assertEqual(response.status_code, 200, response.data)
+
+    def test_bulk_requires_admin(self):
+        operation = {'op': 'transfer', 'id': self.employee.id, 'structural_unit_id': self.data['leaves'][0].id}
+        response = self.client.post('/api/employees/employees/bulk/', {'operations': [operation]}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.client.force_authenticate(self.employee.user)
+        response = self.client.post('/api/employees/employees/bulk/', {'operations': [operation]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_bulk_rejects_malformed_operations(self):
+        self.client.force_authenticate(self.data['admin'])
+        operations = [
+            {'op': 'transfer', 'id': self.employee.id, 'structural_unit_id': self.data['leaves'][0].id},
+            {'op': 'fire', 'id': self.employee.id},
+        ]
+        response = self.client.post('/api/employees/employees/bulk/', {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['operations'][0], {})
+        self.assertIn('op', response.data['operations'][1])
+
+    def test_positions(self):
+        response = self.assertMaxQueries(1, self.client.get, '/api/employees/positions/')
+        self.assertEqual(response.status_code, 200)
+
+
+class EmployeeIndexTests(QueryBudgetMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = seed_organisation(departments=1, teams=1, employees_per_team=2)['leaves'][0]
+
+    def test_active_employees_of_unit(self):
+        queryset = Employee.objects.active().filter(structural_unit=self.unit).order_by()
+        self.assertUsesIndex(queryset, 'employee_active_unit_idx')
+
+
+class WorkforceAnalyticsTests(APITestCase):
+    """Значення рядів за 2024-01..2024-03 для невеликого набору працівників, порахованих вручну"""
+
+    URL = '/api/employees/employees/analytics/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = StructuralUnit.objects.create(name='Компанія')
+        cls.development = StructuralUnit.objects.create(name='Розробка', parent=cls.company)
+        cls.sales = StructuralUnit.objects.create(name='Продажі', parent=cls.company)
+        cls.engineer = Position.objects.create(name='Інженер')
+        cls.manager = Position.objects.create(name='Менеджер')
+
+        def hire(index, unit, position, hired, fired=None):
+            user = User.objects.create(email=f"analytics{index}@example.com", password='!')
+            Employee.objects.create(
+                user=user, structural_unit=unit, position=position, date_hired=hired, date_fired=fired
+            )
+
+        hire(1, cls.development, cls.engineer, datetime.date(2023, 12, 15))
+        hire(2, cls.development, cls.engineer, datetime.date(2024, 1, 10), datetime.date(2024, 3, 5))
+        hire(3, cls.sales, cls.manager, datetime.date(2024, 2, 1))
+        # Без дати прийому — працює від початку періоду
+        hire(4, cls.company, cls.manager, None, datetime.date(2024, 2, 20))
+
+    def setUp(self):
+        cache.clear()
+
+    def analytics(self, **params):
+        response = self.client.get(self.URL, {'start': '2024-01', 'end': '2024-03', **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def series(self, data):
+        return {key: data[key] for key in ('headcount', 'hires', 'exits', 'attrition_rate')}
+
+    def test_total(self):
+        data = self.analytics()
+        self.assertEqual(data['months'], ['2024-01', '2024-02', '2024-03'])
+        self.assertEqual(self.series(data['total']), {
+            'headcount': [3, 3, 2],
+            'hires': [1, 1, 0],
+            'exits': [0, 1, 1],
+            'attrition_rate': [0.0, 0.3333, 0.4],
+        })
+        self.assertNotIn('groups', data)
+
+    def test_group_by_unit(self):
+        data = self.analytics(unit=self.company.id, group_by='unit')
+        self.assertEqual(
+            {group['name']: self.series(group) for group in data['groups']},
+            {
+                'Продажі': {
+                    'headcount': [0, 1, 1], 'hires': [0, 1, 0], 'exits': [0, 0, 0],
+                    'attrition_rate': [0.0, 0.0, 0.0],
+                },
+                'Розробка': {
+                    'headcount': [2, 2, 1], 'hires': [1, 0, 0], 'exits': [0, 0, 1],
+                    'attrition_rate': [0.0, 0.0, 0.6667],
+                },
+                # Працівники самого підрозділу — окрема група
+                'Компанія': {
+                    'headcount': [1, 0, 0], 'hires': [0, 0, 0], 'exits': [0, 1, 0],
+                    'attrition_rate': [0.0, 2.0, 0.0],
+                },
+            }
+        )
+        self.assertEqual(data['total']['headcount'], [3, 3, 2])
+
+    def test_unit_subtree(self):
+        data = self.analytics(unit=self.development.id)
+        self.assertEqual(data['total']['headcount'], [2, 2, 1])
+
+    def test_group_by_position(self):
+        data = self.analytics(group_by='position')
+        self.assertEqual(
+            [(group['id'], group['name'], group['headcount'], group['exits']) for group in data['groups']],
+            [
+                (self.engineer.id, 'Інженер', [2, 2, 1], [0, 0, 1]),
+                (self.manager.id, 'Менеджер', [1, 1, 1], [0, 1, 0]),
+            ]
+        )
+
+    def test_position_filter(self):
+        data = self.analytics(position=self.manager.id)
+        self.assertEqual(self.series(data['total']), {
+            'headcount': [1, 1, 1], 'hires': [0, 1, 0], 'exits': [0, 1, 0], 'attrition_rate': [0.0, 1.0, 0.0],
+        })
+
+    def test_invalid_parameters(self):
+        for params in (
+            {'start': '2024-03', 'end': '2024-01'},
+            {'start': '2024-13'},
+            {'group_by': 'salary'},
+            {'position': 'x'},
+        ):
+            response = self.client.get(self.URL, params)
+            self.assertEqual(response.status_code, 400, params)
+        self.assertEqual(self.client.get(self.URL, {'unit': 0}).status_code, 404)
@@ -0,0 +1,47 @@
+# employees/timeline.py
+"""Стрічка змін працівників з історичних записів simple_history."""
+from company.models import StructuralUnit
+from HRM_NEW.history import diff_records
+from users.models import User
+from .models import Employee, Position
+
+REFERENCE_FIELDS = ('user', 'structural_unit', 'position')
+
+
+def _user_name(first_name, last_name, email):
+    return ' '.join(filter(None, [first_name, last_name])) or email
+
+
+def resolve_names(records, changes):
+    """
+    Назви всіх згаданих у сторінці користувачів, підрозділів і посад — по одному запиту на таблицю.
+    Повертає {field: {id: name}}; підрозділи — повним шляхом.
+    """
+    ids = {field: set() for field in REFERENCE_FIELDS}
+    for record in records:
+        for field in REFERENCE_FIELDS:
+            ids[field].add(getattr(record, f'{field}_id'))
+        for change in changes[record.history_id]:
+            if change['field'] in ids:
+                ids[change['field']].update((change['old'], change['new']))
+    ids = {field: values - {None} for field, values in ids.items()}
+
+    units = StructuralUnit.objects.filter(id__in=ids['structural_unit']).values_list('id', 'name', 'ancestor_path')
+    return {
+        'user': {
+            user_id: _user_name(*names)
+            for user_id, *names in User.objects.filter(id__in=ids['user'])
+            .values_list('id', 'first_name', 'last_name', 'email')
+        },
+        'structural_unit': {
+            unit_id: ' > '.join([ancestor['name'] for ancestor in path] + [name])
+            for unit_id, name, path in units
+        },
+        'position': dict(Position.objects.filter(id__in=ids['position']).values_list('id', 'name')),
+    }
+
+
+def timeline_context(records):
+    """Контекст для EmployeeHistorySerializer: зміни та назви для всієї сторінки."""
+    changes = diff_records(records, Employee.history.all())
+    return {'changes': changes, 'names': resolve_names(records, changes)}
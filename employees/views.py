@@ -1,23 +1,38 @@
+from datetime import date
+
+from django.conf import settings
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, AllowAny
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, AllowAny, IsAdminUser
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db import IntegrityError, DatabaseError
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 
+from company.models import StructuralUnit
+from .analytics import GROUP_BY_CHOICES, get_workforce_analytics, month_index, parse_month
 from .models import Position, Employee
 from .serializers import (
     PositionSerializer,
-    EmployeeSerializer
-
+    EmployeeSerializer,
+    EmployeeListSerializer,
+    EmployeeBulkSerializer,
+    EmployeeBulkResultSerializer,
+    EmployeeHistorySerializer
 )
+from .search import search_employees
+from .services import apply_employee_operations
+from .timeline import timeline_context
+from HRM_NEW.exports import EXPORT_FORMATS, export_response
+from HRM_NEW.history import with_previous_id
+from HRM_NEW.pagination import HistoryCursorPagination, RankedCursorPagination
 
 import logging
 
 logger = logging.getLogger(__name__)
 
-
 @extend_schema_view(
     create=extend_schema(
         summary="Create a new position",
@@ -32,6 +47,7 @@ logger = logging.getLogger(__name__)
 class PositionViewSet(viewsets.ModelViewSet):
     queryset = Position.objects.all()
     serializer_class = PositionSerializer
+    ordering = 'name'
     permission_classes = [AllowAny]
 
     def create(self, request, *args, **kwargs):
@@ -84,8 +100,20 @@ class PositionViewSet(viewsets.ModelViewSet):
 class EmployeeViewSet(viewsets.ModelViewSet):
     queryset = Employee.objects.select_related('user', 'structural_unit', 'position')
     serializer_class = EmployeeSerializer
+    ordering = 'id'
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'search'):
+            queryset = queryset.for_list()
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'search'):
+            return EmployeeListSerializer
+        return super().get_serializer_class()
+
     def create(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
@@ -110,6 +138,137 @@ class EmployeeViewSet(viewsets.ModelViewSet):
             return Response({"error": "Unexpected error", "details": str(e)},
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @extend_schema(
+        summary="Search employees",
+        description="Searches first and last name, email, position and unit path. "
+                    "Every word of the query must match; results are ordered by relevance.",
+        parameters=[OpenApiParameter(name='q', type=str, description="Search query", required=True)],
+        responses={200: EmployeeListSerializer(many=True)},
+    )
+    @action(detail=False, methods=['get'], pagination_class=RankedCursorPagination)
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if len(query) < settings.SEARCH_MIN_QUERY_LENGTH:
+            return Response(
+                {"detail": f"q must be at least {settings.SEARCH_MIN_QUERY_LENGTH} characters"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        page = self.paginate_queryset(search_employees(query, self.get_queryset()))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        summary="Employee change timeline",
+        description="Field-level changes of one employee, newest first, with unit and position names.",
+        parameters=[
+            OpenApiParameter(name='page_size', type=int, description="Records per page"),
+            OpenApiParameter(name='cursor', type=str, description="Next/previous page cursor"),
+        ],
+        responses={200: EmployeeHistorySerializer(many=True)},
+    )
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        employee = self.get_object()
+        return self._history_page(request, Employee.history.filter(id=employee.pk))
+
+    @extend_schema(
+        summary="Recent employee changes",
+        description="Org-wide feed of employee changes, newest first.",
+        parameters=[
+            OpenApiParameter(name='page_size', type=int, description="Records per page"),
+            OpenApiParameter(name='cursor', type=str, description="Next/previous page cursor"),
+        ],
+        responses={200: EmployeeHistorySerializer(many=True)},
+    )
+    @action(detail=False, methods=['get'], url_path='recent-changes')
+    def recent_changes(self, request):
+        return self._history_page(request, Employee.history.all())
+
+    def _history_page(self, request, history):
+        paginator = HistoryCursorPagination()
+        records = paginator.paginate_queryset(
+            with_previous_id(history.select_related('history_user')), request, view=self
+        )
+        serializer = EmployeeHistorySerializer(records, many=True, context=timeline_context(records))
+        return paginator.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        summary="Workforce analytics",
+        description="Monthly headcount (end of month), hires, exits and attrition rate for the whole "
+                    "company or a unit subtree, optionally split by position or by child unit. "
+                    "Results are cached until the end of the day.",
+        parameters=[
+            OpenApiParameter(name='start', type=str, description="First month, YYYY-MM (default: 11 months ago)"),
+            OpenApiParameter(name='end', type=str, description="Last month, YYYY-MM (default: current month)"),
+            OpenApiParameter(name='unit', type=int, description="Unit ID: only its subtree"),
+            OpenApiParameter(name='position', type=int, description="Position ID"),
+            OpenApiParameter(name='group_by', type=str, enum=list(GROUP_BY_CHOICES), description="Split series"),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def analytics(self, request):
+        params = request.query_params
+        current = month_index(date.today())
+        start = parse_month(params['start']) if 'start' in params else current - 11
+        end = parse_month(params['end']) if 'end' in params else current
+        if start is None or end is None or start > end:
+            return Response({"detail": "start and end must be YYYY-MM with start <= end"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if end - start + 1 > settings.ANALYTICS_MAX_MONTHS:
+            return Response({"detail": f"Period is limited to {settings.ANALYTICS_MAX_MONTHS} months"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = params.get('group_by') or None
+        if group_by is not None and group_by not in GROUP_BY_CHOICES:
+            return Response({"detail": f"group_by must be one of: {', '.join(GROUP_BY_CHOICES)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        unit = None
+        if unit_id := params.get('unit'):
+            unit = StructuralUnit.objects.filter(pk=unit_id).first() if unit_id.isdigit() else None
+            if unit is None:
+                return Response({"detail": "Unit not found"}, status=status.HTTP_404_NOT_FOUND)
+        position = params.get('position')
+        if position is not None and not position.isdigit():
+            return Response({"detail": "position must be a position ID"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(get_workforce_analytics(
+            start, end, unit=unit, position=int(position) if position else None, group_by=group_by
+        ))
+
+    @extend_schema(
+        summary="Export all employees",
+        description="Streams every employee as CSV or JSON Lines without loading the table into memory.",
+        parameters=[OpenApiParameter(
+            name='file_format', type=str, enum=list(EXPORT_FORMATS), description="csv (default) or jsonl"
+        )],
+        responses={200: OpenApiTypes.BINARY},
+    )
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response({"detail": f"file_format must be one of: {', '.join(EXPORT_FORMATS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return export_response('employees', file_format)
+
+    @extend_schema(
+        summary="Bulk create, update and transfer employees",
+        description="Applies create / update / transfer operations in one transaction. Admin only. "
+                    "Malformed operations reject the whole request with per-item errors; operations "
+                    "referring to missing or conflicting objects are skipped and reported per item, "
+                    "valid ones are applied.",
+        request=EmployeeBulkSerializer,
+        responses={200: EmployeeBulkResultSerializer},
+    )
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        serializer = EmployeeBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = apply_employee_operations(serializer.validated_data['operations'], user=request.user)
+        return Response(result)
+
     def destroy(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
@@ -0,0 +1,20 @@
+# gunicorn.conf.py
+# Запуск: gunicorn -c gunicorn.conf.py HRM_NEW.wsgi
+import gc
+import os
+
+bind = "0.0.0.0:8000"
+workers = int(os.getenv('WEB_CONCURRENCY', 2 * (os.cpu_count() or 1) + 1))
+# Під цей ліміт розраховано PROVISION_SYNC_USERS
+timeout = 30
+
+# Додаток (і Django) завантажується один раз у майстер-процесі, воркери отримують його через fork
+preload_app = True
+
+
+def when_ready(server):
+    # Модель spaCy та токенізатор — до fork, щоб воркери ділили їх copy-on-write
+    from ai_assistant.openai_service import warm_up
+    warm_up()
+    # Завантажені об'єкти не чіпає збирач сміття, тож їхні сторінки пам'яті не копіюються у воркерах
+    gc.freeze()
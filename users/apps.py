@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from django.contrib.auth.signals import user_logged_in
+        from . import schema, signals  # noqa: F401
+        # last_login пишеться пакетами (users/last_login.py), а не окремим UPDATE на кожен вхід
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
@@ -0,0 +1,63 @@
+# users/authentication.py
+"""
+JWT-автентифікація з коротким кешем користувачів.
+
+Стандартний JWTAuthentication читає рядок users_user на кожен запит. Тут користувач,
+знайдений за user_id з токена, кладеться у спільний кеш на AUTH_USER_CACHE_TIMEOUT секунд,
+тож запит з дійсним access-токеном не звертається до БД. Записи видаляються при збереженні
+чи видаленні користувача та зміні його груп і прав (users/signals.py), тому деактивація
+і зміна пароля діють одразу. Зміни через QuerySet.update() сигналів не надсилають —
+для них запис застаріє щонайбільше через AUTH_USER_CACHE_TIMEOUT.
+
+Без спільного кешу (REDIS_URL) інвалідація не дійде до інших процесів, тому кеш
+вмикається налаштуванням AUTH_USER_CACHE; без нього поведінка як у JWTAuthentication.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_CACHE_KEY = 'users:auth:{}'
+
+
+def user_cache_key(user_id) -> str:
+    return USER_CACHE_KEY.format(user_id)
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, що бере користувача з кешу; перевірки ті самі, що й у simplejwt."""
+
+    def get_user(self, validated_token):
+        if not settings.AUTH_USER_CACHE:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            # add, а не set: не перезаписуємо запис, який щойно поклав інший воркер
+            cache.add(key, user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
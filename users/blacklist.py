@@ -0,0 +1,160 @@
+# users/blacklist.py
+"""
+Фільтр Блума відкликаних refresh-токенів у пам'яті процесу.
+
+Перевірка check_blacklist звертається до БД лише тоді, коли фільтр каже «можливо в чорному
+списку» — для чинних токенів це ~1% запитів. Фільтр не має хибнонегативних відповідей,
+поки він синхронізований, тому синхронізація влаштована так:
+
+* після коміту кожного нового BlacklistedToken його jti на BLACKLIST_RECENT_TIMEOUT секунд
+  записується у спільний кеш (BLACKLIST_RECENT_KEY) — перевірка бачить його одразу, тим самим
+  get_many, що й лічильники, тож фільтр не треба синхронізувати після кожної ротації токена;
+* той самий коміт збільшує лічильник BLACKLIST_WRITES_KEY (cache.incr); процес дочитує
+  записи, лише коли лічильник виріс на BLACKLIST_SYNC_THRESHOLD відносно останньої синхронізації:
+  з id > останнього прочитаного та id-«пропуски» — номери нижче останнього, яких ще не було
+  видно: вони можуть належати транзакціям, що закомітяться пізніше (id видаються при вставці);
+* після очищення прострочених токенів (purge_tokens) змінюється BLACKLIST_PURGE_KEY,
+  і фільтр будується заново, щоб видалені записи не підвищували частку хибних спрацювань;
+* незалежно від лічильника фільтр повністю перебудовується щонайменше раз
+  на BLACKLIST_FILTER_MAX_AGE секунд — так зникають пропуски від відкочених транзакцій,
+  а записи з BLACKLIST_RECENT_KEY потрапляють у фільтр раніше, ніж їхні ключі зникнуть.
+
+Без спільного кешу (REDIS_URL) інші процеси не бачать лічильника, тому фільтр вмикається
+налаштуванням TOKEN_BLACKLIST_FILTER.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+BLACKLIST_WRITES_KEY = 'users:blacklist:writes'
+BLACKLIST_PURGE_KEY = 'users:blacklist:purge'
+BLACKLIST_RECENT_KEY = 'users:blacklist:jti:{}'
+BLACKLIST_SYNC_OVERLAP = 1000  # Скільки останніх id при повній перебудові перевіряється на пропуски
+BLACKLIST_FILTER_MAX_AGE = 60  # Секунд між повними перебудовами фільтра
+BLACKLIST_SYNC_THRESHOLD = 1000  # Після скількох нових записів фільтр дочитується раніше повної перебудови
+# Ключ нового запису живе довше за інтервал перебудови, тож фільтр устигає його підхопити
+BLACKLIST_RECENT_TIMEOUT = 2 * BLACKLIST_FILTER_MAX_AGE
+BLACKLIST_FALSE_POSITIVE_RATE = 0.01
+
+
+class BloomFilter:
+    def __init__(self, capacity, false_positive_rate=BLACKLIST_FALSE_POSITIVE_RATE):
+        self.capacity = max(capacity, 1024)
+        self.size = math.ceil(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class BlacklistFilter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._last_id = 0
+        self._gaps = set()  # id нижче _last_id, яких ще немає серед прочитаних
+        self._seen = (None, None)  # (лічильник записів, покоління очищення) на момент синхронізації
+        self._rebuilt_at = 0.0
+
+    def might_contain(self, jti) -> bool:
+        """False — токена точно немає в чорному списку; True — потрібна перевірка в БД."""
+        recent_key = BLACKLIST_RECENT_KEY.format(jti)
+        state = cache.get_many([BLACKLIST_WRITES_KEY, BLACKLIST_PURGE_KEY, recent_key])
+        if recent_key in state:
+            return True
+        seen = (state.get(BLACKLIST_WRITES_KEY), state.get(BLACKLIST_PURGE_KEY))
+        if self._filter is None or self._is_stale(seen):
+            self._sync(seen)
+        return jti in self._filter
+
+    def _is_stale(self, seen):
+        writes, purge = seen
+        seen_writes, seen_purge = self._seen
+        if purge != seen_purge or time.monotonic() - self._rebuilt_at > BLACKLIST_FILTER_MAX_AGE:
+            return True
+        if writes == seen_writes:
+            return False
+        # Лічильник зник з кешу чи почався заново — дочитуємо; інакше чекаємо на поріг
+        return writes is None or seen_writes is None or not 0 < writes - seen_writes < BLACKLIST_SYNC_THRESHOLD
+
+    def _sync(self, seen):
+        with self._lock:
+            rebuild = (
+                self._filter is None
+                or seen[1] != self._seen[1]
+                or time.monotonic() - self._rebuilt_at > BLACKLIST_FILTER_MAX_AGE
+            )
+            if not rebuild:
+                rows = self._load(Q(id__gt=self._last_id) | Q(id__in=self._gaps))
+                rebuild = self._filter.count + len(rows) > self._filter.capacity
+
+            if rebuild:
+                rows = self._load(Q())
+                bloom = BloomFilter(capacity=2 * len(rows))
+                ids = {row_id for row_id, _ in rows}
+                last_id = max(ids, default=0)
+                # Вікно останніх id: транзакції, які ще не закомітилися на момент перебудови
+                gaps = set(range(max(last_id - BLACKLIST_SYNC_OVERLAP, 0) + 1, last_id)) - ids
+            else:
+                bloom = self._filter
+                ids = {row_id for row_id, _ in rows}
+                last_id = max(ids | {self._last_id})
+                gaps = (self._gaps | set(range(self._last_id + 1, last_id))) - ids
+
+            for _, jti in rows:
+                bloom.add(jti)
+
+            self._filter = bloom
+            self._last_id = last_id
+            self._gaps = gaps
+            self._seen = seen
+            if rebuild:
+                self._rebuilt_at = time.monotonic()
+
+    @staticmethod
+    def _load(condition):
+        return list(
+            BlacklistedToken.objects.filter(condition)
+            .order_by('id')
+            .values_list('id', 'token__jti')
+        )
+
+
+def _bump(key, initial):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Ключ зник з кешу: нове значення не повинно збігтися з тим, що бачили процеси раніше
+        if not cache.add(key, initial, timeout=None):
+            cache.incr(key)
+
+
+def notify_blacklisted(jti):
+    """Викликається після коміту нового запису чорного списку."""
+    cache.set(BLACKLIST_RECENT_KEY.format(jti), True, timeout=BLACKLIST_RECENT_TIMEOUT)
+    _bump(BLACKLIST_WRITES_KEY, time.time_ns())
+
+
+def notify_purged():
+    """Викликається після видалення записів: фільтри процесів перебудуються."""
+    cache.set(BLACKLIST_PURGE_KEY, time.time_ns(), timeout=None)
+
+
+blacklist_filter = BlacklistFilter()
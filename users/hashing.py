@@ -0,0 +1,52 @@
+# users/hashing.py
+"""
+Паралельне хешування паролів.
+
+PBKDF2 навмисно повільний (сотні мілісекунд на пароль), тож масове створення користувачів
+(команда provision_users і фонові завдання API) розподіляє хешування між процесами.
+Невеликі пакети, що створюються в самому запиті, хешуються у воркері: пул не запускається
+заради кількох паролів. Модуль не імпортує моделей, щоб його можна було
+завантажити в дочірньому процесі без django.setup().
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _hash_chunk(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        return _executor
+
+
+def hash_passwords(passwords, parallel=False):
+    """
+    Хеші у тому самому порядку; для None — непридатний пароль (без звернення до пулу).
+    З parallel=True хешування розподіляється між PASSWORD_HASH_WORKERS процесами.
+    """
+    passwords = list(passwords)
+    hashed = [make_password(None) if password is None else None for password in passwords]
+    pending = [index for index, password in enumerate(passwords) if password is not None]
+    if not parallel or len(pending) < 2:
+        for index in pending:
+            hashed[index] = make_password(passwords[index])
+        return hashed
+
+    chunk_size = max(1, len(pending) // (settings.PASSWORD_HASH_WORKERS * 4))
+    chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+    results = _get_executor().map(_hash_chunk, [[passwords[index] for index in chunk] for chunk in chunks])
+    for chunk, chunk_hashes in zip(chunks, results):
+        for index, password_hash in zip(chunk, chunk_hashes):
+            hashed[index] = password_hash
+    return hashed
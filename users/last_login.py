@@ -0,0 +1,93 @@
+# users/last_login.py
+"""
+Відкладений запис last_login.
+
+Вхід не пише в users_user: момент входу кладеться в буфер процесу та у спільний кеш
+(щоб UserSerializer в будь-якому процесі показував актуальне значення), а фоновий потік
+кожні LAST_LOGIN_FLUSH_INTERVAL секунд записує весь буфер одним пакетним UPDATE.
+При завершенні процесу (atexit) буфер записується примусово.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+LAST_LOGIN_KEY = 'users:last_login:{}'
+
+_pending = {}
+_lock = threading.Lock()
+_flusher = None
+
+
+def record_login(user_id, moment):
+    """Запам'ятовує вхід користувача; у БД він потрапить з найближчим скиданням буфера."""
+    with _lock:
+        if moment < _pending.get(user_id, moment):
+            return
+        _pending[user_id] = moment
+    cache.set(LAST_LOGIN_KEY.format(user_id), moment, timeout=settings.LAST_LOGIN_FLUSH_INTERVAL * 10)
+    _ensure_flusher()
+
+
+def pending_last_logins(user_ids) -> dict:
+    """{user_id: момент входу}, ще не записаний у БД (з усіх процесів)."""
+    keys = {LAST_LOGIN_KEY.format(user_id): user_id for user_id in user_ids}
+    return {keys[key]: moment for key, moment in cache.get_many(keys).items()}
+
+
+def flush():
+    """Записує буфер у БД одним bulk_update; повертає кількість користувачів."""
+    global _pending
+    with _lock:
+        pending, _pending = _pending, {}
+    if not pending:
+        return 0
+    # Greatest: запис з іншого процесу міг уже встановити пізніший момент
+    users = [
+        User(pk=user_id, last_login=Greatest(Coalesce('last_login', Value(moment)), Value(moment)))
+        for user_id, moment in pending.items()
+    ]
+    try:
+        User.objects.bulk_update(users, ['last_login'], batch_size=1000)
+    except Exception:
+        # Повертаємо незаписане в буфер, не перезаписуючи новіші входи
+        with _lock:
+            for user_id, moment in pending.items():
+                _pending[user_id] = max(moment, _pending.get(user_id, moment))
+        raise
+    return len(users)
+
+
+def _run():
+    while True:
+        time.sleep(settings.LAST_LOGIN_FLUSH_INTERVAL)
+        close_old_connections()
+        try:
+            flush()
+        except Exception as e:
+            logger.error("Error flushing last_login: %s", str(e))
+        finally:
+            connection.close()
+
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_run, name='last-login-flusher', daemon=True)
+            _flusher.start()
+
+
+atexit.register(flush)
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication import CachedJWTAuthentication, invalidate_cached_user
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Порівнює пропускну здатність і кількість запитів JWTAuthentication та CachedJWTAuthentication "
+        "(тестові користувачі створюються в транзакції, яка відкочується)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20_000, help="Кількість автентифікацій")
+        parser.add_argument('--users', type=int, default=100, help="Скільки різних користувачів надсилають запити")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                User(email=f"bench-auth-{i}@example.com", password='!') for i in range(options['users'])
+            )
+            factory = APIRequestFactory()
+            requests = [
+                factory.get('/', HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+                for user in users
+            ]
+            for user in users:
+                invalidate_cached_user(user.pk)
+
+            # Кеш користувачів вмикається примусово: без REDIS_URL він вимкнений (AUTH_USER_CACHE)
+            with override_settings(AUTH_USER_CACHE=True):
+                for authenticator in (JWTAuthentication(), CachedJWTAuthentication()):
+                    self._measure(authenticator, requests, options['requests'])
+            transaction.set_rollback(True)
+        for user in users:
+            invalidate_cached_user(user.pk)
+
+    def _measure(self, authenticator, requests, total):
+        queries = 0
+
+        def count_queries(execute, *args):
+            nonlocal queries
+            queries += 1
+            return execute(*args)
+
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            for i in range(total):
+                authenticator.authenticate(requests[i % len(requests)])
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{type(authenticator).__name__}: {total / elapsed:.0f} автентифікацій/с, "
+            f"запитів до БД: {queries} на {total} ({queries / total:.3f} на запит)"
+        )
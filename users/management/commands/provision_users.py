@@ -0,0 +1,63 @@
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from company.importer import IMPORT_FORMATS, RowError, read_rows
+from users.provisioning import ProvisionConflict, provision_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Створює користувачів з працівниками з CSV / JSON / JSON Lines "
+        "(колонки: email, first_name, last_name, password, structural_unit_id, position_id, date_hired)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Шлях до файлу")
+        parser.add_argument(
+            '--format',
+            dest='file_format',
+            choices=IMPORT_FORMATS,
+            help="Формат файлу (за замовчуванням — з розширення)"
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help="Рядків в одній транзакції")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['file_format'] or path.suffix.lstrip('.').lower()
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError(f"Невідомий формат файлу: {file_format}")
+
+        created = failed = 0
+        rows = []
+        with path.open('rb') as stream:
+            for line, row in read_rows(stream, file_format):
+                if isinstance(row, RowError):
+                    failed += 1
+                    self.stderr.write(f"Рядок {line}: {row}")
+                else:
+                    rows.append((line, row))
+
+        started = time.perf_counter()
+        for start in range(0, len(rows), options['batch_size']):
+            batch = rows[start:start + options['batch_size']]
+            # Порожні комірки CSV — відсутні значення
+            try:
+                report = provision_users([
+                    {key: value for key, value in row.items() if value not in ('', None)}
+                    for _, row in batch
+                ], parallel_hashing=True)
+            except ProvisionConflict as e:
+                # Пакет відкочено цілком; помилки рядків — у звіті
+                report = e.report
+            created += report['created']
+            failed += report['failed']
+            for (line, _), result in zip(batch, report['results']):
+                if result['status'] == 'error':
+                    self.stderr.write(f"Рядок {line}: {json.dumps(result['errors'], ensure_ascii=False)}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Створено {created} користувачів, з помилками: {failed} ({time.perf_counter() - started:.1f} с)"
+        ))
@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from users.blacklist import notify_purged
+
+
+class Command(BaseCommand):
+    help = (
+        "Видаляє прострочені токени з outstanding і blacklist пакетами, кожен у власній транзакції. "
+        "З --every працює безперервно з заданим інтервалом"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TOKEN_PURGE_BATCH_SIZE,
+            help="Скільки токенів видаляється за одну транзакцію"
+        )
+        parser.add_argument('--every', type=int, help="Повторювати кожні N секунд")
+
+    def handle(self, *args, **options):
+        while True:
+            self.purge(options['batch_size'])
+            if not options['every']:
+                return
+            time.sleep(options['every'])
+
+    def purge(self, batch_size):
+        moment = timezone.now()
+        purged = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    OutstandingToken.objects.filter(expires_at__lte=moment)
+                    .order_by()
+                    .values_list('id', flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                OutstandingToken.objects.filter(id__in=ids).delete()
+            purged += len(ids)
+
+        if purged:
+            notify_purged()
+        self.stdout.write(f"Видалено прострочених токенів: {purged}")
@@ -0,0 +1,205 @@
+# users/provisioning.py
+"""
+Масове створення користувачів разом із записами працівників.
+
+Великі пакети з API виконуються фоновим завданням: потік процесу (по одному завданню за раз)
+хешує паролі в пулі процесів, а стан завдання зберігається у спільному кеші,
+тож його можна запитати через будь-який воркер.
+"""
+import logging
+import threading
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, connection, transaction
+
+from company.models import StructuralUnit
+from employees.models import Position
+from employees.services import apply_employee_operations
+from .hashing import hash_passwords
+from .models import User
+from .serializers import ProvisionUserSerializer
+
+logger = logging.getLogger(__name__)
+
+PROVISION_JOB_KEY = 'users:provision:job:{}'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ProvisionConflict(Exception):
+    """
+    Пакет відкочено: між перевіркою рядків і записом дані змінив паралельний запит.
+    report — звіт provision_users з помилкою для кожного рядка.
+    """
+
+    def __init__(self, report):
+        super().__init__("Пакет відкочено через паралельну зміну даних")
+        self.report = report
+
+
+def provision_users(rows, user=None, parallel_hashing=False):
+    """
+    Створює користувачів і їхніх працівників одним пакетом.
+
+    Рядки перевіряються заздалегідь: формат, унікальність email (в пакеті та в БД — одним запитом),
+    існування підрозділів і посад. Паролі хешуються поза транзакцією (з parallel_hashing —
+    у пулі процесів, див. users/hashing.py), після чого користувачі створюються через bulk_create, а працівники — через
+    apply_employee_operations (історія, лічильники підрозділів, пошукові документи).
+    results вирівняні за індексами рядків: {'id', 'employee_id', 'status'} або {'status': 'error', 'errors'}.
+    Якщо запис не вдався через паралельну зміну (email уже зайнято, підрозділ деактивовано),
+    пакет відкочується і виникає ProvisionConflict.
+    """
+    results = [None] * len(rows)
+    valid = []
+    for index, row in enumerate(rows):
+        serializer = ProvisionUserSerializer(data=row)
+        if serializer.is_valid():
+            data = serializer.validated_data
+            data['email'] = User.objects.normalize_email(data['email'].strip())
+            valid.append((index, data))
+        else:
+            results[index] = {'status': 'error', 'errors': serializer.errors}
+
+    emails = Counter(data['email'] for _, data in valid)
+    taken = set(User.objects.filter(email__in=list(emails)).values_list('email', flat=True))
+    unit_ids = set(
+        StructuralUnit.objects.filter(id__in={data['structural_unit_id'] for _, data in valid}, is_active=True)
+        .values_list('id', flat=True)
+    )
+    position_ids = set(
+        Position.objects.filter(id__in={data['position_id'] for _, data in valid}).values_list('id', flat=True)
+    )
+
+    accepted = []
+    for index, data in valid:
+        errors = {}
+        if data['email'] in taken:
+            errors['email'] = ["Користувач з таким email уже існує"]
+        elif emails[data['email']] > 1:
+            errors['email'] = ["Email повторюється в пакеті"]
+        if data['structural_unit_id'] not in unit_ids:
+            errors['structural_unit_id'] = ["Активний підрозділ не знайдено"]
+        if data['position_id'] not in position_ids:
+            errors['position_id'] = ["Посаду не знайдено"]
+        if errors:
+            results[index] = {'status': 'error', 'errors': errors}
+        else:
+            accepted.append((index, data))
+
+    passwords = hash_passwords((data.get('password') or None for _, data in accepted), parallel=parallel_hashing)
+
+    try:
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                [
+                    User(
+                        email=data['email'],
+                        first_name=data.get('first_name', ''),
+                        last_name=data.get('last_name', ''),
+                        password=password
+                    )
+                    for (_, data), password in zip(accepted, passwords)
+                ],
+                batch_size=1000
+            )
+            employees = apply_employee_operations(
+                [
+                    {
+                        'op': 'create',
+                        'user_id': created.pk,
+                        'structural_unit_id': data['structural_unit_id'],
+                        'position_id': data['position_id'],
+                        'date_hired': data.get('date_hired'),
+                    }
+                    for (_, data), created in zip(accepted, users)
+                ],
+                user=user
+            )
+            if employees['failed']:
+                # Рядки перевірено вище, тож помилка тут означає гонку з паралельною зміною — відкочуємо все
+                raise ProvisionConflict(_conflict_report(results, accepted, {
+                    index: result['errors']
+                    for (index, _), result in zip(accepted, employees['results'])
+                    if result['status'] == 'error'
+                }))
+    except IntegrityError:
+        # Email зайняв паралельний запит уже після перевірки
+        taken = set(
+            User.objects.filter(email__in=[data['email'] for _, data in accepted]).values_list('email', flat=True)
+        )
+        raise ProvisionConflict(_conflict_report(results, accepted, {
+            index: {'email': ["Користувач з таким email уже існує"]}
+            for index, data in accepted
+            if data['email'] in taken
+        }))
+
+    for (index, _), created, employee in zip(accepted, users, employees['results']):
+        results[index] = {'id': created.pk, 'employee_id': employee['id'], 'status': 'created'}
+
+    return {
+        'created': len(users),
+        'failed': sum(result['status'] == 'error' for result in results),
+        'results': results,
+    }
+
+
+def _conflict_report(results, accepted, errors):
+    """Звіт відкоченого пакета: жоден рядок не створено, errors — {індекс рядка: помилки}."""
+    results = list(results)
+    for index, _ in accepted:
+        results[index] = {
+            'status': 'error',
+            'errors': errors.get(index) or {
+                'non_field_errors': ["Не створено: пакет відкочено через помилки інших рядків"]
+            },
+        }
+    return {'created': 0, 'failed': len(results), 'results': results}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Одне завдання за раз: кожне й так займає весь пул хешування
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='provision-users')
+        return _executor
+
+
+def start_provisioning_job(rows, user=None) -> str:
+    """Ставить пакет у чергу фонового завдання; повертає id завдання."""
+    job_id = uuid.uuid4().hex
+    cache.set(PROVISION_JOB_KEY.format(job_id), {'id': job_id, 'status': 'pending'}, settings.PROVISION_JOB_TIMEOUT)
+    _get_executor().submit(_run_in_thread, job_id, rows, user)
+    return job_id
+
+
+def get_provisioning_job(job_id):
+    """{'id', 'status': pending / running / done / failed, 'result'?, 'detail'?} або None."""
+    return cache.get(PROVISION_JOB_KEY.format(job_id))
+
+
+def run_provisioning_job(job_id, rows, user=None):
+    """Виконує завдання й записує його стан; звіт із помилками рядків зберігається і для відкоченого пакета."""
+    key = PROVISION_JOB_KEY.format(job_id)
+    cache.set(key, {'id': job_id, 'status': 'running'}, settings.PROVISION_JOB_TIMEOUT)
+    try:
+        state = {'id': job_id, 'status': 'done', 'result': provision_users(rows, user, parallel_hashing=True)}
+    except ProvisionConflict as e:
+        state = {'id': job_id, 'status': 'failed', 'detail': str(e), 'result': e.report}
+    except Exception as e:
+        logger.error("Provisioning job %s failed: %s", job_id, str(e))
+        state = {'id': job_id, 'status': 'failed', 'detail': "Внутрішня помилка; пакет відкочено"}
+    cache.set(key, state, settings.PROVISION_JOB_TIMEOUT)
+
+
+def _run_in_thread(job_id, rows, user):
+    close_old_connections()
+    try:
+        run_provisioning_job(job_id, rows, user)
+    finally:
+        connection.close()
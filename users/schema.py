@@ -0,0 +1,7 @@
+# users/schema.py
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """CachedJWTAuthentication у схемі OpenAPI — той самий jwtAuth (Bearer), що й JWTAuthentication"""
+    target_class = 'users.authentication.CachedJWTAuthentication'
@@ -1,13 +1,42 @@
+from django.conf import settings
+from django.db import models
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from .last_login import pending_last_logins
 from .models import User
+from .tokens import FilteredRefreshToken
 from django.contrib.auth import authenticate
 
 
+class UserListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Незаписані входи всієї сторінки — одним зверненням до кешу
+        users = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.child.pending_logins = pending_last_logins([user.pk for user in users])
+        return super().to_representation(users)
+
+
 class UserSerializer(serializers.ModelSerializer):
+    last_login = serializers.SerializerMethodField()
+
     class Meta:
         model = User
         fields = ['id', 'email', 'first_name', 'last_name', 'status',
                   'is_email_confirmed', 'created_at', 'updated_at', 'last_login']
+        list_serializer_class = UserListSerializer
+
+    @extend_schema_field(serializers.DateTimeField(allow_null=True))
+    def get_last_login(self, obj):
+        # Вхід може ще чекати в буфері users/last_login.py. Для сторінки значення завантажуються
+        # заздалегідь: UserListSerializer або context['pending_logins'] від вкладаючого серіалізатора
+        pending = getattr(self, 'pending_logins', None)
+        if pending is None:
+            pending = self.context.get('pending_logins')
+        if pending is None:
+            pending = pending_last_logins([obj.pk])
+        moments = [moment for moment in (obj.last_login, pending.get(obj.pk)) if moment]
+        return serializers.DateTimeField().to_representation(max(moments)) if moments else None
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -36,3 +65,50 @@ class LoginSerializer(serializers.Serializer):
 
 class LogoutSerializer(serializers.Serializer):
     detail = serializers.CharField(read_only=True)
+
+
+class FilteredTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = FilteredRefreshToken
+
+
+class ProvisionUserSerializer(serializers.Serializer):
+    """Один рядок масового створення: користувач і його запис працівника"""
+    email = serializers.EmailField()
+    first_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    last_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    password = serializers.CharField(
+        write_only=True,
+        required=False,
+        allow_blank=True,
+        help_text="Без пароля користувач отримує непридатний пароль"
+    )
+    structural_unit_id = serializers.IntegerField()
+    position_id = serializers.IntegerField()
+    date_hired = serializers.DateField(required=False, allow_null=True)
+
+
+class ProvisionBulkSerializer(serializers.Serializer):
+    users = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.MAX_BULK_PROVISION_USERS,
+        error_messages={
+            'max_length': "Не більше {max_length} користувачів за запит; "
+                          "більші пакети створюються командою provision_users"
+        },
+        help_text="Рядки з полями ProvisionUserSerializer"
+    )
+
+
+class ProvisionResultSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    results = serializers.ListField(child=serializers.DictField())
+
+
+class ProvisionJobSerializer(serializers.Serializer):
+    """Стан фонового завдання масового створення"""
+    id = serializers.CharField()
+    status = serializers.ChoiceField(choices=['pending', 'running', 'done', 'failed'])
+    result = ProvisionResultSerializer(required=False, help_text="Звіт по рядках (done, а також failed через конфлікт)")
+    detail = serializers.CharField(required=False)
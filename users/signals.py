@@ -0,0 +1,52 @@
+# users/signals.py
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .authentication import invalidate_cached_user
+from .blacklist import notify_blacklisted
+from .last_login import record_login
+from .models import User
+
+
+def _invalidate(user_id):
+    # Другий раз — після коміту: паралельний запит міг встигнути закешувати старий рядок
+    invalidate_cached_user(user_id)
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_on_change(sender, instance, **kwargs):
+    """Деактивація, зміна пароля чи прав мають діяти одразу, а не після закінчення TTL"""
+    _invalidate(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_on_permissions_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # Очищення з боку групи чи права: після нього вже не відомо, кого це стосувалося
+        for user_id in instance.user_set.values_list('pk', flat=True):
+            _invalidate(user_id)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        for user_id in (pk_set or ()) if reverse else (instance.pk,):
+            _invalidate(user_id)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def notify_blacklist_filters(sender, instance, created, **kwargs):
+    """Фільтри Блума інших процесів дочитують чорний список, коли запис уже видно в БД"""
+    if created:
+        jti = instance.token.jti
+        transaction.on_commit(lambda: notify_blacklisted(jti))
+
+
+@receiver(user_logged_in)
+def buffer_last_login(sender, user, **kwargs):
+    """Вхід через сесію (адмінка) теж іде через буфер замість update_last_login з django.contrib.auth"""
+    user.last_login = timezone.now()
+    record_login(user.pk, user.last_login)
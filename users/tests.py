@@ -1,3 +1,350 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from company.models import StructuralUnit
+from employees.models import Employee
+from employees.serializers import EmployeeSerializer
+from HRM_NEW.testing import QueryBudgetMixin, seed_organisation
+from . import last_login
+from .authentication import user_cache_key
+from . import blacklist
+from .blacklist import BLACKLIST_RECENT_KEY, BloomFilter, blacklist_filter, notify_blacklisted
+from .models import User
+from .provisioning import run_provisioning_job
+from .tokens import FilteredRefreshToken
+
+
+class UserQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(email=f"user{i}@example.com", first_name=f"Ім'я{i}", password='!') for i in range(120)
+        )
+        cls.user = User.objects.first()
+
+    def test_list(self):
+        response = self.assertMaxQueries(1, self.client.get, '/api/users/profile/', {'page_size': 200})
+        self.assertEqual(len(response.data['results']), 120)
+
+    def test_retrieve(self):
+        response = self.assertMaxQueries(1, self.client.get, f'/api/users/profile/{self.user.id}/')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(AUTH_USER_CACHE=True)
+class CachedJWTAuthenticationTests(QueryBudgetMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='jwt@example.com', password='secret-password')
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def test_repeated_requests_skip_user_query(self):
+        self.assertMaxQueries(2, self.client.get, '/api/ai/chat/sessions/')
+        response = self.assertMaxQueries(1, self.client.get, '/api/ai/chat/sessions/')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(AUTH_USER_CACHE=False)
+    def test_disabled_without_shared_cache(self):
+        self.client.get('/api/ai/chat/sessions/')
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        # Кожен запит читає користувача з БД
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/ai/chat/sessions/')
+        self.assertTrue(any('users_user' in query['sql'] for query in queries))
+
+    def test_deactivation_applies_immediately(self):
+        self.assertEqual(self.client.get('/api/ai/chat/sessions/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/ai/chat/sessions/').status_code, 401)
+
+    def test_password_change_refreshes_cached_user(self):
+        self.client.get('/api/ai/chat/sessions/')
+        self.user.set_password('another-password')
+        self.user.save()
+        cached = cache.get(user_cache_key(self.user.pk))
+        self.assertIsNone(cached)
+        self.client.get('/api/ai/chat/sessions/')
+        self.assertEqual(cache.get(user_cache_key(self.user.pk)).password, self.user.password)
+
+    def test_schema_declares_jwt_scheme(self):
+        response = self.client.get('/api/schema/', {'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        schema = response.json()
+        self.assertEqual(
+            schema['components']['securitySchemes']['jwtAuth'],
+            {'type': 'http', 'scheme': 'bearer', 'bearerFormat': 'JWT'}
+        )
+        self.assertIn({'jwtAuth': []}, schema['paths']['/api/ai/chat/sessions/']['get']['security'])
+
+
+@override_settings(TOKEN_BLACKLIST_FILTER=True)
+class TokenBlacklistTests(QueryBudgetMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='refresh@example.com', password='secret-password')
+
+    def setUp(self):
+        super().setUp()
+        blacklist_filter.__init__()
+
+    def refresh(self, token):
+        return self.client.post('/api/users/token/refresh/', {'refresh': str(token)}, format='json')
+
+    def test_refresh_rotates_and_blacklists(self):
+        token = FilteredRefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+        self.assertEqual(self.refresh(response.data['refresh']).status_code, 200)
+
+    def test_check_skips_database_for_valid_tokens(self):
+        tokens = [FilteredRefreshToken.for_user(self.user) for _ in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            tokens[0].blacklist()
+        FilteredRefreshToken(str(tokens[1]))  # перша перевірка будує фільтр
+        self.assertMaxQueries(0, FilteredRefreshToken, str(tokens[2]))
+        with self.assertRaises(TokenError):
+            FilteredRefreshToken(str(tokens[0]))
+
+    def test_rotations_do_not_resync_filter(self):
+        tokens = [FilteredRefreshToken.for_user(self.user) for _ in range(4)]
+        with self.captureOnCommitCallbacks(execute=True):
+            tokens[0].blacklist()
+        FilteredRefreshToken(str(tokens[3]))  # перша перевірка будує фільтр
+        with self.captureOnCommitCallbacks(execute=True):
+            tokens[1].blacklist()
+            tokens[2].blacklist()
+        # Лічильник змінився, але нижче порога: перевірки йдуть без запитів до БД,
+        # а щойно відкликані токени видно через їхні ключі в кеші
+        self.assertMaxQueries(0, FilteredRefreshToken, str(tokens[3]))
+        self.assertMaxQueries(0, blacklist_filter.might_contain, tokens[1]['jti'])
+        self.assertTrue(blacklist_filter.might_contain(tokens[2]['jti']))
+        with self.assertRaises(TokenError):
+            FilteredRefreshToken(str(tokens[1]))
+
+    @mock.patch.object(blacklist, 'BLACKLIST_SYNC_THRESHOLD', 1)
+    def test_late_commit_below_synced_id_is_loaded(self):
+        first, late = FilteredRefreshToken.for_user(self.user), FilteredRefreshToken.for_user(self.user)
+        BlacklistedToken.objects.create(id=1, token=OutstandingToken.objects.get(jti=first['jti']))
+        self.assertTrue(blacklist_filter.might_contain(first['jti']))
+
+        # Транзакція отримала id 2, але поки вона відкрита, комітяться ще 150 записів
+        others = [FilteredRefreshToken.for_user(self.user) for _ in range(150)]
+        BlacklistedToken.objects.bulk_create(
+            BlacklistedToken(id=row_id, token=OutstandingToken.objects.get(jti=token['jti']))
+            for row_id, token in enumerate(others, start=3)
+        )
+        notify_blacklisted(others[-1]['jti'])
+        cache.delete(BLACKLIST_RECENT_KEY.format(others[-1]['jti']))
+        self.assertTrue(blacklist_filter.might_contain(others[-1]['jti']))
+        self.assertFalse(blacklist_filter.might_contain(late['jti']))
+
+        # Ключ у кеші вже зник — запис має знайтися серед пропусків при синхронізації
+        BlacklistedToken.objects.create(id=2, token=OutstandingToken.objects.get(jti=late['jti']))
+        notify_blacklisted(late['jti'])
+        cache.delete(BLACKLIST_RECENT_KEY.format(late['jti']))
+        self.assertTrue(blacklist_filter.might_contain(late['jti']))
+        with self.assertRaises(TokenError):
+            FilteredRefreshToken(str(late))
+
+    def test_purge_removes_expired_tokens(self):
+        expired = FilteredRefreshToken.for_user(self.user)
+        valid = FilteredRefreshToken.for_user(self.user)
+        expired.blacklist()
+        valid.blacklist()
+        OutstandingToken.objects.filter(jti=expired['jti']).update(expires_at=timezone.now())
+        call_command('purge_tokens', batch_size=1, stdout=StringIO())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [valid['jti']])
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(capacity=2000)
+        values = [f"jti-{i}" for i in range(2000)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class LastLoginBufferTests(QueryBudgetMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='login@example.com', password='secret-password')
+
+    def tearDown(self):
+        last_login.flush()
+        super().tearDown()
+
+    def test_login_does_not_write_user_row(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/api/users/login/', {'email': 'login@example.com', 'password': 'secret-password'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in context.captured_queries if query['sql'].startswith('UPDATE "users_user"')])
+        self.assertIsNotNone(response.data['user']['last_login'])
+
+        # Профіль показує вхід ще до запису в БД
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+        profile = self.client.get(f'/api/users/profile/{self.user.id}/')
+        self.assertEqual(profile.data['last_login'], response.data['user']['last_login'])
+
+    def test_flush_writes_latest_login_in_one_batch(self):
+        others = User.objects.bulk_create(User(email=f"batch{i}@example.com", password='!') for i in range(20))
+        moment = timezone.now()
+        for i, user in enumerate(others):
+            last_login.record_login(user.pk, moment - timedelta(minutes=i))
+        last_login.record_login(others[0].pk, moment - timedelta(days=1))
+
+        self.assertMaxQueries(1, last_login.flush)
+        self.assertEqual(User.objects.get(pk=others[0].pk).last_login, moment)
+        self.assertEqual(User.objects.filter(last_login__isnull=False).count(), 20)
+
+    def test_nested_users_prefill_pending_logins_once(self):
+        employees = seed_organisation(departments=1, teams=2, employees_per_team=2)['employees']
+        moment = timezone.now()
+        last_login.record_login(employees[0].user_id, moment)
+
+        queryset = Employee.objects.select_related('user', 'structural_unit', 'position').order_by('id')
+        with mock.patch('employees.serializers.pending_last_logins', wraps=last_login.pending_last_logins) as page, \
+                mock.patch('users.serializers.pending_last_logins') as per_row:
+            data = EmployeeSerializer(queryset, many=True).data
+        page.assert_called_once()
+        per_row.assert_not_called()
+        self.assertEqual(len(data), len(employees))
+        logins = {row['user']['id']: row['user']['last_login'] for row in data}
+        self.assertEqual(logins[employees[0].user_id], serializers.DateTimeField().to_representation(moment))
+        self.assertIsNone(logins[employees[1].user_id])
+
+
+class BulkProvisionTests(QueryBudgetMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_organisation(departments=1, teams=1, employees_per_team=1)
+        cls.unit = cls.data['leaves'][0]
+        cls.position = cls.data['positions'][0]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.data['admin'])
+        # Фонове завдання виконується одразу в тестовій транзакції, пул хешування — потоки замість процесів
+        jobs = mock.patch('users.provisioning._get_executor')
+        jobs.start().return_value.submit.side_effect = lambda run, *args: run_provisioning_job(*args)
+        self.addCleanup(jobs.stop)
+        self.hash_pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(self.hash_pool.shutdown)
+        hashing = mock.patch('users.hashing._get_executor', return_value=self.hash_pool)
+        self.get_hash_pool = hashing.start()
+        self.addCleanup(hashing.stop)
+
+    def row(self, i, **overrides):
+        return {
+            'email': f"new{i}@Example.COM",
+            'first_name': f"Новий{i}",
+            'password': f"password-{i}",
+            'structural_unit_id': self.unit.id,
+            'position_id': self.position.id,
+            **overrides,
+        }
+
+    def test_creates_users_with_employees(self):
+        before = self.unit.headcount.direct
+        rows = [self.row(i) for i in range(30)]
+        rows += [
+            self.row(0),
+            self.row(99, email='employee0@example.com'),
+            self.row(100, position_id=0),
+            {'email': 'broken'},
+        ]
+        response = self.assertMaxQueries(
+            30, self.client.post, '/api/users/bulk/', {'users': rows}, format='json'
+        )
+        self.assertEqual(response.status_code, 202, response.data)
+        self.get_hash_pool.assert_called()
+
+        job = self.client.get(response['Location']).data
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual((job['result']['created'], job['result']['failed']), (29, 5))
+        self.assertEqual(job['result']['results'][0]['status'], 'error')
+        self.assertIn('position_id', job['result']['results'][32]['errors'])
+
+        created = User.objects.get(email='new5@example.com')
+        self.assertTrue(created.check_password('password-5'))
+        self.assertEqual(created.employee_profile.structural_unit_id, self.unit.id)
+        self.assertIn('новий5', created.employee_profile.search_document)
+        self.unit.headcount.refresh_from_db()
+        self.assertEqual(self.unit.headcount.direct, before + 29)
+
+    def test_small_batch_in_request(self):
+        rows = [self.row(i) for i in range(3)]
+        response = self.client.post('/api/users/bulk/', {'users': rows}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 3)
+        self.get_hash_pool.assert_not_called()
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get('/api/users/bulk/missing/').status_code, 404)
+
+    def test_email_taken_concurrently(self):
+        def hash_and_race(passwords, parallel=False):
+            # Паралельний запит створює користувача між перевіркою email і вставкою
+            User.objects.create(email='new1@example.com', password='!')
+            return ['!'] * len(list(passwords))
+
+        rows = [self.row(0), self.row(1), {'email': 'broken'}]
+        with mock.patch('users.provisioning.hash_passwords', side_effect=hash_and_race):
+            response = self.client.post('/api/users/bulk/', {'users': rows}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.data['created'], response.data['failed']), (0, 3))
+        results = response.data['results']
+        self.assertIn('non_field_errors', results[0]['errors'])
+        self.assertIn('email', results[1]['errors'])
+        self.assertIn('structural_unit_id', results[2]['errors'])
+        self.assertFalse(User.objects.filter(email='new0@example.com').exists())
+
+    def test_unit_deactivated_concurrently(self):
+        def hash_and_race(passwords, parallel=False):
+            StructuralUnit.objects.filter(id=self.unit.id).update(is_active=False)
+            return ['!'] * len(list(passwords))
+
+        rows = [self.row(i) for i in range(settings.PROVISION_SYNC_USERS + 1)]
+        with mock.patch('users.provisioning.hash_passwords', side_effect=hash_and_race):
+            response = self.client.post('/api/users/bulk/', {'users': rows}, format='json')
+        job = self.client.get(response['Location']).data
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['result']['created'], 0)
+        self.assertIn('structural_unit_id', job['result']['results'][0]['errors'])
+        self.assertFalse(User.objects.filter(email='new0@example.com').exists())
+
+    def test_rejects_batch_over_limit(self):
+        rows = [self.row(i) for i in range(settings.MAX_BULK_PROVISION_USERS + 1)]
+        response = self.client.post('/api/users/bulk/', {'users': rows}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('provision_users', str(response.data['users']))
+        self.assertFalse(User.objects.filter(email='new0@example.com').exists())
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post('/api/users/bulk/', {'users': [self.row(1)]}, format='json').status_code, 401)
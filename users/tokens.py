@@ -0,0 +1,15 @@
+# users/tokens.py
+from django.conf import settings
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .blacklist import blacklist_filter
+
+
+class FilteredRefreshToken(RefreshToken):
+    """RefreshToken, що звертається до чорного списку в БД лише після спрацювання фільтра Блума"""
+
+    def check_blacklist(self):
+        if settings.TOKEN_BLACKLIST_FILTER and not blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            return
+        super().check_blacklist()
@@ -1,10 +1,22 @@
 from django.urls import path
-from .views import RegisterView, LoginView, UserListView, UserDetailView, LogoutView
+from .views import (
+    RegisterView,
+    LoginView,
+    UserListView,
+    UserDetailView,
+    LogoutView,
+    RefreshView,
+    BulkProvisionView,
+    BulkProvisionJobView,
+)
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
+    path('bulk/', BulkProvisionView.as_view(), name='bulk-provision'),
+    path('bulk/<str:job_id>/', BulkProvisionJobView.as_view(), name='bulk-provision-job'),
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('token/refresh/', RefreshView.as_view(), name='token-refresh'),
     path('profile/', UserListView.as_view(), name='profile'),
     path('profile/<int:id>/', UserDetailView.as_view(), name='user-detail'),
 ]
@@ -1,17 +1,33 @@
+from django.conf import settings
+from django.urls import reverse
 from django.utils.timezone import now
+from drf_spectacular.utils import extend_schema
 from rest_framework import generics, status, viewsets
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from .last_login import record_login
+from .provisioning import ProvisionConflict, get_provisioning_job, provision_users, start_provisioning_job
+from .tokens import FilteredRefreshToken
 
 from .models import User
-from .serializers import RegisterSerializer, LoginSerializer, UserSerializer, LogoutSerializer
+from .serializers import (
+    RegisterSerializer,
+    LoginSerializer,
+    UserSerializer,
+    LogoutSerializer,
+    FilteredTokenRefreshSerializer,
+    ProvisionBulkSerializer,
+    ProvisionResultSerializer,
+    ProvisionJobSerializer,
+)
 
 
 def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = FilteredRefreshToken.for_user(user)
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
@@ -24,6 +40,51 @@ class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
 
 
+class BulkProvisionView(generics.GenericAPIView):
+    """
+    Масове створення користувачів з працівниками; помилки повертаються по кожному рядку.
+    Пакети до PROVISION_SYNC_USERS рядків створюються в запиті, більші — фоновим завданням:
+    відповідь 202 з адресою стану завдання в Location.
+    """
+    serializer_class = ProvisionBulkSerializer
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        request=ProvisionBulkSerializer,
+        responses={200: ProvisionResultSerializer, 202: ProvisionJobSerializer, 409: ProvisionResultSerializer}
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data['users']
+
+        if len(rows) > settings.PROVISION_SYNC_USERS:
+            job_id = start_provisioning_job(rows, user=request.user)
+            return Response(
+                get_provisioning_job(job_id),
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Location': reverse('bulk-provision-job', args=[job_id]), 'Retry-After': '5'}
+            )
+
+        try:
+            result = provision_users(rows, user=request.user)
+        except ProvisionConflict as e:
+            return Response(e.report, status=status.HTTP_409_CONFLICT)
+        return Response(result)
+
+
+class BulkProvisionJobView(APIView):
+    """Стан фонового завдання масового створення користувачів"""
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses={200: ProvisionJobSerializer})
+    def get(self, request, job_id):
+        job = get_provisioning_job(job_id)
+        if job is None:
+            return Response({"detail": "Завдання не знайдено"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job)
+
+
 class LoginView(generics.GenericAPIView):
     serializer_class = LoginSerializer
     permission_classes = [AllowAny]
@@ -33,9 +94,9 @@ class LoginView(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data
         token = get_tokens_for_user(user)
-        # Update last login time
+        # last_login пишеться в БД пакетами у фоні (users/last_login.py)
         user.last_login = now()
-        user.save(update_fields=['last_login'])
+        record_login(user.pk, user.last_login)
         return Response({
             "token": token,
             "user": UserSerializer(user).data
@@ -49,7 +110,7 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
+            token = FilteredRefreshToken(refresh_token)
             token.blacklist()
             return Response({"detail": "Successfully logged out."}, status=status.HTTP_205_RESET_CONTENT)
         except KeyError:
@@ -58,9 +119,15 @@ class LogoutView(APIView):
             return Response({"error": "Invalid or expired token."}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class RefreshView(TokenRefreshView):
+    """Оновлення access-токена; відкликані refresh-токени відсіюються фільтром Блума (users/blacklist.py)"""
+    serializer_class = FilteredTokenRefreshSerializer
+
+
 class UserListView(generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    ordering = 'id'
     # permission_classes = [IsAuthenticated]
     permission_classes = [AllowAny]
 